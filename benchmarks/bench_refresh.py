@@ -0,0 +1,226 @@
+"""Benchmark the Cybro integration against a simulated scgi server.
+
+Sets up one config entry per simulated plc with all platforms, lets the
+coordinators poll for a while and reports:
+- refresh latency (p50, p95, max) of the coordinator refreshes
+- cpu time per refresh cycle of the home assistant process
+- memory allocated per entity during setup
+- state writes done and skipped per cycle
+
+The fake scgi server runs in its own process, so its cpu time is not
+counted. Run it from the repository root, eg:
+
+    python -m benchmarks.bench_refresh --plcs 10 --vars 1000
+
+or replay a capture of real plcs 10 times faster than captured:
+
+    python -m benchmarks.bench_refresh --replay capture.jsonl.gz --speed 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from multiprocessing.connection import Connection
+from typing import Any
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_ADDRESS
+from homeassistant.const import CONF_HOST
+from homeassistant.const import CONF_PORT
+from homeassistant.core import CoreState
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import area_registry as ar
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import DATA_ENTITY_SOURCE
+
+from .fake_scgi import FakeScgiServer
+from .replay_scgi import ReplayScgiServer
+
+COMPONENT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "custom_components",
+    "cybro",
+)
+
+
+def _run_server(args: argparse.Namespace, conn: Connection) -> None:
+    """Run the fake scgi server until the parent asks for its stats."""
+
+    async def serve() -> None:
+        if args.replay:
+            server = ReplayScgiServer(args.replay, args.speed, loop=True)
+        else:
+            server = FakeScgiServer(
+                args.plcs, args.vars, args.nad, args.volatility, args.entity_ratio
+            )
+        conn.send((await server.async_start(), server.nads))
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, conn.recv)
+        conn.send(
+            {
+                "requests": server.requests,
+                "request_vars": server.request_vars,
+                "bytes_sent": server.bytes_sent,
+            }
+        )
+        await server.async_stop()
+
+    asyncio.run(serve())
+
+
+async def async_setup_hass(config_dir: str) -> HomeAssistant:
+    """Return a minimal running home assistant instance."""
+    hass = HomeAssistant()
+    hass.config.config_dir = config_dir
+    hass.config.skip_pip = True
+    hass.state = CoreState.running
+    hass.data.setdefault(DATA_ENTITY_SOURCE, {})
+    os.makedirs(os.path.join(config_dir, "custom_components"))
+    os.symlink(COMPONENT_DIR, os.path.join(config_dir, "custom_components", "cybro"))
+    await asyncio.gather(ar.async_load(hass), dr.async_load(hass), er.async_load(hass))
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    return hass
+
+
+def _percentile(values: list[float], percent: int) -> float:
+    """Return the percentile of a list of values."""
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+async def async_run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the benchmark, return the results."""
+    conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(
+        target=_run_server, args=(args, child_conn), daemon=True
+    )
+    server.start()
+    port, nads = conn.recv()
+
+    hass = await async_setup_hass(tempfile.mkdtemp())
+    tracemalloc.start()
+    setup_start = time.perf_counter()
+    entries = []
+    for nad in nads:
+        entry = config_entries.ConfigEntry(
+            version=1,
+            domain="cybro",
+            title=f"c{nad}",
+            data={CONF_HOST: "127.0.0.1", CONF_PORT: port, CONF_ADDRESS: nad},
+            source=config_entries.SOURCE_USER,
+        )
+        entries.append(entry)
+        hass.async_create_task(hass.config_entries.async_add(entry))
+    await hass.async_block_till_done()
+    setup_time = time.perf_counter() - setup_start
+    setup_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    coordinators = list(hass.data["cybro"].values())
+    entities = len(hass.states.async_all())
+    latencies: list[float] = []
+
+    def timed(refresh: Any) -> Any:
+        async def wrapper(*args: Any, **kwargs: Any) -> None:
+            start = time.perf_counter()
+            await refresh(*args, **kwargs)
+            latencies.append(time.perf_counter() - start)
+
+        return wrapper
+
+    for coordinator in coordinators:
+        coordinator._async_refresh = timed(coordinator._async_refresh)
+    writes_start = sum(coordinator.state_writes for coordinator in coordinators)
+    skipped_start = sum(
+        coordinator.state_writes_skipped for coordinator in coordinators
+    )
+
+    cpu_start = time.process_time()
+    await asyncio.sleep(args.duration)
+    cpu_time = time.process_time() - cpu_start
+
+    writes = sum(coordinator.state_writes for coordinator in coordinators)
+    skipped = sum(coordinator.state_writes_skipped for coordinator in coordinators)
+    for entry in entries:
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_stop(force=True)
+    conn.send("stats")
+    server_stats = conn.recv()
+    server.join()
+
+    cycles = max(len(latencies) / max(len(coordinators), 1), 1)
+    return {
+        "plcs": len(nads),
+        "vars_per_plc": None if args.replay else args.vars,
+        "replay": args.replay,
+        "entities": entities,
+        "setup_s": setup_time,
+        "cycles": len(latencies) / max(len(coordinators), 1),
+        "refresh_latency_ms": {
+            "p50": _percentile(latencies, 50) * 1000,
+            "p95": _percentile(latencies, 95) * 1000,
+            "max": max(latencies, default=0.0) * 1000,
+        },
+        "cpu_ms_per_cycle": cpu_time / cycles * 1000,
+        "memory_kib_per_entity": setup_memory / max(entities, 1) / 1024,
+        "state_writes_per_cycle": (writes - writes_start) / cycles,
+        "state_writes_skipped_per_cycle": (skipped - skipped_start) / cycles,
+        "server": server_stats,
+    }
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Cybro integration against a simulated scgi server."
+    )
+    parser.add_argument("--plcs", type=int, default=10, help="simulated plcs")
+    parser.add_argument("--vars", type=int, default=1000, help="vars per plc")
+    parser.add_argument("--nad", type=int, default=1000, help="first plc address")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to poll")
+    parser.add_argument(
+        "--volatility",
+        type=float,
+        default=0.1,
+        help="probability of a var changing on each read",
+    )
+    parser.add_argument(
+        "--entity-ratio",
+        type=float,
+        default=0.5,
+        help="share of the plc vars mapped to entities",
+    )
+    parser.add_argument(
+        "--replay", help="replay this capture instead of simulating plcs"
+    )
+    parser.add_argument("--speed", type=float, default=1.0, help="speed of the replay")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(async_run(args))
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    # a run without entities, refreshes or requests measured nothing
+    if results["entities"] == 0:
+        sys.exit("No entities were set up, the results are not valid")
+    if results["cycles"] == 0 or results["server"]["requests"] == 0:
+        sys.exit("No refreshes were recorded, the results are not valid")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Local stand-in for the Cybro scgi server used by the benchmarks."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+from collections.abc import Iterable
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+SERVER_VARS = {
+    "sys.scgi_port_status": "active",
+    "sys.server_uptime": "1",
+    "sys.scgi_request_pending": "0",
+    "sys.scgi_request_count": "0",
+    "sys.push_port_status": "active",
+    "sys.push_count": "0",
+    "sys.push_ack_errors": "0",
+    "sys.push_list_count": "0",
+    "sys.cache_request": "0",
+    "sys.cache_valid": "0",
+    "sys.server_version": "3.1.3",
+    "sys.udp_rx_count": "0",
+    "sys.udp_tx_count": "0",
+    "sys.datalogger_status": "active",
+}
+
+# vars holding a single bit, they only toggle between 0 and 1
+BIT_VAR_MARKERS = ("_qx", "scan_overrun", "retentive_fail", "general_error")
+
+# vars every simulated plc has, they cover the diagnostic, power meter
+# and weather station entities
+PLC_FIXED_VARS = (
+    "scan_time",
+    "scan_time_max",
+    "cybro_uptime",
+    "operating_hours",
+    "scan_frequency",
+    "scan_overrun",
+    "retentive_fail",
+    "general_error",
+    "cybro_power_supply",
+    "power_meter_power",
+    "power_meter_voltage",
+    "power_meter_current",
+    "power_meter_energy",
+    "weather_temperature",
+    "weather_humidity",
+    "weather_wind_speed",
+    "weather_wind_direction",
+    "weather_pressure",
+)
+
+
+def plc_var_names(count: int, entity_ratio: float = 0.5) -> list[str]:
+    """Return count plc var names, about entity_ratio of them map to entities.
+
+    The entity vars alternate between lights, temperatures and humidities,
+    the rest are plain program vars without an entity.
+    """
+    names = list(PLC_FIXED_VARS[:count])
+    entity_vars = int(max(count - len(names), 0) * entity_ratio)
+    for index in range(entity_vars):
+        group, pos = divmod(index, 3)
+        if pos == 0:
+            names.append(f"lc{group // 8:02}_qx{group % 8:02}")
+        elif pos == 1:
+            names.append(f"th{group:03}_temperature")
+        else:
+            names.append(f"th{group:03}_humidity")
+    names.extend(f"var{index:05}" for index in range(count - len(names)))
+    return names
+
+
+def render_response(items: Iterable[tuple[str, str]]) -> str:
+    """Return the scgi response xml of (name, value) pairs."""
+    out = ["<data>"]
+    for name, value in items:
+        out.append(
+            f"<var><name>{escape(name)}</name>"
+            f"<value>{escape(value)}</value>"
+            "<description></description></var>"
+        )
+    out.append("</data>")
+    return "".join(out)
+
+
+def alc_file(names: list[str]) -> str:
+    """Return an allocation file listing the given var names.
+
+    Bit vars are bits, all other vars 16 bit ints at consecutive addresses.
+    """
+    lines = ["Cybro allocation file", ""]
+    address = 0
+    for index, name in enumerate(names):
+        var_type, size = ("bit", 1) if is_bit_var(name) else ("int", 2)
+        fields = f"{index:04X} {address:06X} 1 0 {size} global"
+        lines.append(f"{fields:37}{var_type:6}{name} ")
+        address += size
+    return "\n".join(lines)
+
+
+def is_bit_var(name: str) -> bool:
+    """Return True if a var holds a single bit."""
+    return any(marker in name for marker in BIT_VAR_MARKERS)
+
+
+class FakeScgiServer:
+    """Answers scgi reads and writes for N simulated plcs with M vars each.
+
+    On every read a var changes its value with the probability volatility,
+    so the integration sees a realistic stream of changes.
+    """
+
+    def __init__(
+        self,
+        plcs: int = 1,
+        plc_vars: int = 100,
+        first_nad: int = 1000,
+        volatility: float = 0.1,
+        entity_ratio: float = 0.5,
+        seed: int = 0,
+    ) -> None:
+        """Initialize the fake server."""
+        self.nads = [first_nad + index for index in range(plcs)]
+        self.volatility = volatility
+        self.values: dict[str, str] = dict(SERVER_VARS)
+        self.static: set[str] = set(SERVER_VARS)
+        self.bits: set[str] = set()
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.request_vars = 0
+        self.bytes_sent = 0
+        names = plc_var_names(plc_vars, entity_ratio)
+        for nad in self.nads:
+            plc_sys = {
+                "sys.ip_port": "127.0.0.1:8442",
+                "sys.timestamp": "2022-01-01 00:00:00",
+                "sys.plc_program_status": "ok",
+                "sys.response_time": "5",
+                "sys.bytes_transferred": "0",
+                "sys.comm_error_count": "0",
+                "sys.alc_file": alc_file(names),
+            }
+            for name, value in plc_sys.items():
+                self.values[f"c{nad}.{name}"] = value
+                self.static.add(f"c{nad}.{name}")
+            for name in names:
+                self.values[f"c{nad}.{name}"] = "0"
+                if is_bit_var(name):
+                    self.bits.add(f"c{nad}.{name}")
+
+    def _read(self, name: str) -> str:
+        """Return the value of a var, randomly change it first."""
+        if (value := self.values.get(name)) is None:
+            return "?"
+        if name not in self.static and self.random.random() < self.volatility:
+            if name in self.bits:
+                value = "0" if value == "1" else "1"
+            else:
+                value = str(self.random.randint(0, 1000))
+            self.values[name] = value
+        return value
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Handle a scgi request."""
+        self.requests += 1
+        items = []
+        for part in request.query_string.split("&"):
+            if not part:
+                continue
+            name, _, value = part.partition("=")
+            if value and name in self.values:
+                self.values[name] = value
+            self.request_vars += 1
+            items.append((name, self._read(name)))
+        text = render_response(items)
+        self.bytes_sent += len(text)
+        return web.Response(text=text, content_type="text/xml")
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving, return the listening port."""
+        # allow long request lines, a read of all vars is a single get
+        app = web.Application(handler_args={"max_line_size": 2**24})
+        app.router.add_get("/", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]
+
+    async def async_stop(self) -> None:
+        """Stop serving."""
+        await self._runner.cleanup()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    """Serve until cancelled."""
+    server = FakeScgiServer(
+        args.plcs, args.vars, args.nad, args.volatility, args.entity_ratio
+    )
+    port = await server.async_start(args.host, args.port)
+    print(f"serving {args.plcs} plcs x {args.vars} vars on {args.host}:{port}")
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    """Run the fake scgi server standalone."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--plcs", type=int, default=1)
+    parser.add_argument("--vars", type=int, default=100)
+    parser.add_argument("--nad", type=int, default=1000)
+    parser.add_argument("--volatility", type=float, default=0.1)
+    parser.add_argument("--entity-ratio", type=float, default=0.5)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
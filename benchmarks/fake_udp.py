@@ -0,0 +1,142 @@
+"""Local stand-in for Cybro plcs speaking the native udp protocol.
+
+Answers random reads and writes for the simulated plcs of a fake scgi
+server, with the same var values. The plcs report the address of the
+stand-in as their sys.ip_port, so the draft udp client in udp.py can read
+and write their vars here, eg:
+
+    python -m benchmarks.fake_udp --plcs 2 --vars 200 --port 4000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import struct
+
+from .fake_scgi import FakeScgiServer
+from .udp import AllocatedVar
+from .udp import COMMAND_RANDOM_READ
+from .udp import COMMAND_RANDOM_WRITE
+from .udp import decode_frame
+from .udp import decode_random_access
+from .udp import decode_values
+from .udp import DIRECTION_REQUEST
+from .udp import DIRECTION_RESPONSE
+from .udp import encode_frame
+from .udp import encode_values
+from .udp import parse_allocation
+from cybro import CybroError
+
+
+class FakeUdpPlcs(asyncio.DatagramProtocol):
+    """Answers native udp requests for the plcs of a fake scgi server."""
+
+    def __init__(self, server: FakeScgiServer) -> None:
+        """Initialize the stand-in with the vars of the fake server."""
+        self.server = server
+        self.requests = 0
+        self.request_vars = 0
+        self.bytes_sent = 0
+        # var name and allocation by nad and address
+        self.addresses: dict[int, dict[int, tuple[str, AllocatedVar]]] = {}
+        for nad in server.nads:
+            allocation = parse_allocation(server.values[f"c{nad}.sys.alc_file"], nad)
+            self.addresses[nad] = {
+                var.address: (name, var) for name, var in allocation.items()
+            }
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Store the transport."""
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Answer a random read or write."""
+        try:
+            frame = decode_frame(data)
+            command, addresses, values = decode_random_access(frame.data)
+            plc_vars = [
+                self.addresses[frame.to_nad][address] for address, _ in addresses
+            ]
+        except (CybroError, KeyError, struct.error):
+            return
+        if frame.direction != DIRECTION_REQUEST:
+            return
+        self.requests += 1
+        self.request_vars += len(plc_vars)
+        variables = [var for _, var in plc_vars]
+        response = bytes([command])
+        if command == COMMAND_RANDOM_WRITE:
+            for (name, _), value in zip(plc_vars, decode_values(variables, values)):
+                self.server.values[name] = value
+        elif command == COMMAND_RANDOM_READ:
+            response += encode_values(
+                variables, [self.server._read(name) for name, _ in plc_vars]
+            )
+        else:
+            return
+        answer = encode_frame(
+            frame.to_nad,
+            frame.from_nad,
+            DIRECTION_RESPONSE,
+            frame.transaction,
+            response,
+        )
+        self.bytes_sent += len(answer)
+        assert self.transport is not None
+        self.transport.sendto(answer, addr)
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving, point the sys.ip_port of the plcs here.
+
+        Returns the listening port.
+        """
+        await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: self, local_addr=(host, port)
+        )
+        assert self.transport is not None
+        port = self.transport.get_extra_info("sockname")[1]
+        for nad in self.server.nads:
+            self.server.values[f"c{nad}.sys.ip_port"] = f"{host}:{port}"
+        return port
+
+    async def async_stop(self) -> None:
+        """Stop serving."""
+        if self.transport is not None:
+            self.transport.close()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    """Serve until cancelled."""
+    server = FakeScgiServer(
+        args.plcs, args.vars, args.nad, args.volatility, args.entity_ratio
+    )
+    plcs = FakeUdpPlcs(server)
+    udp_port = await plcs.async_start(args.host, args.udp_port)
+    port = await server.async_start(args.host, args.port)
+    print(
+        f"serving {args.plcs} plcs x {args.vars} vars on {args.host}:{port},"
+        f" udp on port {udp_port}"
+    )
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    """Run the fake scgi server with the udp stand-in standalone."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--udp-port", type=int, default=8442)
+    parser.add_argument("--plcs", type=int, default=1)
+    parser.add_argument("--vars", type=int, default=100)
+    parser.add_argument("--nad", type=int, default=1000)
+    parser.add_argument("--volatility", type=float, default=0.1)
+    parser.add_argument("--entity-ratio", type=float, default=0.5)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Replay of scgi traffic captured with the cybro.capture service.
+
+The replay server answers requests like a scgi server whose var values
+follow the captured responses, at the captured pace or faster, eg:
+
+    python -m benchmarks.replay_scgi cybro_capture.jsonl.gz --speed 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import re
+import statistics
+import time
+
+from aiohttp import web
+from custom_components.cybro.capture import read_capture
+
+from .fake_scgi import FakeScgiServer
+
+PLC_VAR_RE = re.compile(r"^c(\d+)\.")
+
+
+class ReplayScgiServer(FakeScgiServer):
+    """Answers scgi requests with the var values of a capture.
+
+    All vars start with their first captured value, afterwards every
+    captured response is applied at its offset divided by speed. Responses
+    are delayed by the median captured request duration divided by speed.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False) -> None:
+        """Initialize the replay server."""
+        header, records = read_capture(path)
+        self.header = header
+        self.speed = speed
+        self.loop = loop
+        self.requests = 0
+        self.request_vars = 0
+        self.bytes_sent = 0
+        self.values: dict[str, str] = {}
+        self.events = [
+            (offset, response)
+            for offset, _, _, response, _ in records
+            if response is not None
+        ]
+        for _, response in reversed(self.events):
+            self.values.update(response)
+        self.duration = self.events[-1][0] if self.events else 0.0
+        self.latency = (
+            statistics.median(record[1] for record in records) if records else 0.0
+        )
+        self.nads = sorted(
+            {int(match[1]) for name in self.values if (match := PLC_VAR_RE.match(name))}
+        )
+        self._next = 0
+        self._start: float | None = None
+
+    def _advance(self) -> None:
+        """Apply the captured responses up to the replay time."""
+        if self._start is None:
+            self._start = time.monotonic()
+        offset = (time.monotonic() - self._start) * self.speed
+        if self.loop and offset > self.duration > 0:
+            self._start = time.monotonic()
+            self._next = 0
+            offset = 0.0
+        while self._next < len(self.events) and self.events[self._next][0] <= offset:
+            self.values.update(self.events[self._next][1])
+            self._next += 1
+
+    def _read(self, name: str) -> str:
+        """Return the replayed value of a var."""
+        return self.values.get(name, "?")
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Handle a scgi request after the captured request duration."""
+        self._advance()
+        if self.latency > 0:
+            await asyncio.sleep(self.latency / self.speed)
+        return await super().handle(request)
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    """Serve until cancelled."""
+    server = ReplayScgiServer(args.capture, args.speed, args.loop)
+    port = await server.async_start(args.host, args.port)
+    print(
+        f"replaying {server.duration:.0f} s of {args.capture} for plcs "
+        f"{server.nads} at {args.speed}x on {args.host}:{port}"
+    )
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    """Run the replay server standalone."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("capture", help="capture file to replay")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="replay speed, eg 10 for 10x"
+    )
+    parser.add_argument(
+        "--loop", action="store_true", help="restart at the end of the capture"
+    )
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
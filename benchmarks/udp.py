@@ -0,0 +1,436 @@
+"""Native Cybro communication protocol over udp.
+
+Reads and writes the vars of a plc directly with a binary random memory
+access request per frame, without the scgi server. The var addresses come
+from the allocation file of the plc program.
+
+The frame layout and command codes below follow the public description
+of the Cybro communication protocol. They are not verified against a real
+plc, so this codec is kept with the benchmarks and not used by the
+integration until it is.
+"""
+from __future__ import annotations
+
+import asyncio
+import struct
+from collections.abc import Iterable
+from time import monotonic
+from typing import Any
+from typing import NamedTuple
+
+import async_timeout
+from custom_components.cybro.const import LOGGER
+from custom_components.cybro.scgi import ScgiRequestStats
+
+from cybro import CybroConnectionError
+from cybro import CybroConnectionTimeoutError
+from cybro import CybroError
+
+# default port of the plcs, timeout [s] and attempts of a request and the
+# max data size of a frame
+UDP_PORT = 8442
+UDP_REQUEST_TIMEOUT = 2
+UDP_REQUEST_TRIES = 3
+UDP_MAX_FRAME_DATA = 1024
+# nad the udp requests are sent from
+UDP_CLIENT_NAD = 0
+
+FRAME_SIGNATURE = 0xAA55
+# signature, data length, from nad, to nad, direction, message type,
+# transaction id, followed by the data and a 16 bit checksum
+FRAME_HEADER = struct.Struct("<HHIIBBB")
+FRAME_CHECKSUM = struct.Struct("<H")
+DIRECTION_REQUEST = 0
+DIRECTION_RESPONSE = 1
+MESSAGE_TYPE_COMMAND = 0
+COMMAND_RANDOM_READ = 0x21
+COMMAND_RANDOM_WRITE = 0x22
+# command and the number of 1, 2 and 4 byte vars, followed by the 16 bit
+# addresses of all vars sorted by size and their values for writes
+RANDOM_ACCESS_HEADER = struct.Struct("<BHHH")
+VAR_SIZES = (1, 2, 4)
+
+# struct format of the scalar types of the allocation file
+ALLOCATION_TYPES = {"bit": "B", "int": "h", "long": "i", "real": "f"}
+
+
+class Frame(NamedTuple):
+    """A decoded frame of the Cybro communication protocol."""
+
+    from_nad: int
+    to_nad: int
+    direction: int
+    transaction: int
+    data: bytes
+
+
+class AllocatedVar(NamedTuple):
+    """Address and type of a plc var from the allocation file."""
+
+    address: int
+    var_type: str
+    description: str
+
+    @property
+    def size(self) -> int:
+        """Return the size of the var in bytes."""
+        return struct.calcsize(ALLOCATION_TYPES[self.var_type])
+
+
+def parse_allocation(alc: str, nad: int) -> dict[str, AllocatedVar]:
+    """Return the scalar vars of an allocation file by var name.
+
+    The first 37 columns of a var line hold id, address (hex), array size,
+    offset, size and scope, type and name follow like in
+    PlcInfo.parse_alc_file. Arrays and unknown types are skipped.
+    """
+    prefix = f"c{nad}."
+    result: dict[str, AllocatedVar] = {}
+    for line in alc.splitlines()[2:]:
+        fields = line[:37].split()
+        var_type = line[37:43].strip()
+        name, _, description = line[43:].strip().partition(" ")
+        if len(fields) < 6 or var_type not in ALLOCATION_TYPES or not name:
+            continue
+        try:
+            address = int(fields[1], 16)
+            array = int(fields[2])
+        except ValueError:
+            continue
+        if array == 1:
+            result[prefix + name] = AllocatedVar(address, var_type, description.strip())
+    return result
+
+
+def checksum(data: bytes) -> int:
+    """Return the 16 bit sum of all bytes."""
+    return sum(data) & 0xFFFF
+
+
+def encode_frame(
+    from_nad: int, to_nad: int, direction: int, transaction: int, data: bytes
+) -> bytes:
+    """Return a frame with the given data."""
+    frame = (
+        FRAME_HEADER.pack(
+            FRAME_SIGNATURE,
+            len(data),
+            from_nad,
+            to_nad,
+            direction,
+            MESSAGE_TYPE_COMMAND,
+            transaction,
+        )
+        + data
+    )
+    return frame + FRAME_CHECKSUM.pack(checksum(frame))
+
+
+def decode_frame(frame: bytes) -> Frame:
+    """Return the fields of a received frame."""
+    if len(frame) < FRAME_HEADER.size + FRAME_CHECKSUM.size:
+        raise CybroError(f"Frame too short: {len(frame)} bytes")
+    (
+        signature,
+        length,
+        from_nad,
+        to_nad,
+        direction,
+        _,
+        transaction,
+    ) = FRAME_HEADER.unpack_from(frame)
+    start = FRAME_HEADER.size
+    end = start + length
+    if signature != FRAME_SIGNATURE or len(frame) != end + FRAME_CHECKSUM.size:
+        raise CybroError("Invalid frame signature or length")
+    if FRAME_CHECKSUM.unpack_from(frame, end)[0] != checksum(frame[:end]):
+        raise CybroError("Invalid frame checksum")
+    return Frame(from_nad, to_nad, direction, transaction, frame[start:end])
+
+
+def sort_by_size(
+    variables: Iterable[tuple[str, AllocatedVar]]
+) -> list[tuple[str, AllocatedVar]]:
+    """Return the vars in the order of a random access request."""
+    return sorted(variables, key=lambda variable: variable[1].size)
+
+
+def encode_random_access(
+    command: int,
+    variables: list[tuple[str, AllocatedVar]],
+    values: list[str] | None = None,
+) -> bytes:
+    """Return the data of a random read or write of vars sorted by size."""
+    counts = [sum(1 for _, var in variables if var.size == size) for size in VAR_SIZES]
+    data = RANDOM_ACCESS_HEADER.pack(command, *counts)
+    data += struct.pack(f"<{len(variables)}H", *(var.address for _, var in variables))
+    if values is not None:
+        data += encode_values([var for _, var in variables], values)
+    return data
+
+
+def decode_random_access(data: bytes) -> tuple[int, list[tuple[int, int]], bytes]:
+    """Return command, (address, size) of all vars and values of a request."""
+    command, *counts = RANDOM_ACCESS_HEADER.unpack_from(data)
+    total = sum(counts)
+    start = RANDOM_ACCESS_HEADER.size
+    end = start + 2 * total
+    addresses = struct.unpack_from(f"<{total}H", data, start)
+    sizes = [size for size, count in zip(VAR_SIZES, counts) for _ in range(count)]
+    return command, list(zip(addresses, sizes)), data[end:]
+
+
+def encode_values(variables: list[AllocatedVar], values: list[str]) -> bytes:
+    """Return the binary values of vars."""
+    data = b""
+    for var, value in zip(variables, values):
+        number: int | float
+        if var.var_type == "real":
+            number = float(value)
+        elif var.var_type == "bit":
+            number = int(float(value) != 0)
+        else:
+            number = int(float(value))
+        data += struct.pack("<" + ALLOCATION_TYPES[var.var_type], number)
+    return data
+
+
+def decode_values(variables: list[AllocatedVar], data: bytes) -> list[str]:
+    """Return the values of vars as the scgi server would format them."""
+    fmt = "<" + "".join(ALLOCATION_TYPES[var.var_type] for var in variables)
+    if struct.calcsize(fmt) != len(data):
+        raise CybroError(f"Invalid response size {len(data)} for {len(variables)} vars")
+    return [
+        # 9 significant digits keep every 32 bit real
+        f"{value:.9g}" if isinstance(value, float) else str(value)
+        for value in struct.unpack(fmt, data)
+    ]
+
+
+class CybroUdpProtocol(asyncio.DatagramProtocol):
+    """Resolves the waiting requests with the received responses."""
+
+    def __init__(self) -> None:
+        """Initialize the protocol."""
+        self.transport: asyncio.DatagramTransport | None = None
+        self.waiters: dict[int, asyncio.Future] = {}
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Store the transport."""
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Resolve the request waiting for a response."""
+        try:
+            frame = decode_frame(data)
+        except CybroError as error:
+            LOGGER.debug("Ignoring frame from %s: %s", addr, error)
+            return
+        if frame.direction != DIRECTION_RESPONSE:
+            return
+        future = self.waiters.pop(frame.transaction, None)
+        if future is not None and not future.done():
+            future.set_result(frame)
+
+    def error_received(self, exc: Exception) -> None:
+        """Fail all waiting requests."""
+        self._fail(CybroConnectionError(f"Error sending to the plc: {exc}"))
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Fail all waiting requests."""
+        self.transport = None
+        self._fail(CybroConnectionError("Connection to the plc closed"))
+
+    def _fail(self, error: CybroError) -> None:
+        """Fail all waiting requests with error."""
+        waiters, self.waiters = self.waiters, {}
+        for future in waiters.values():
+            if not future.done():
+                future.set_exception(error)
+
+
+class CybroUdpClient:
+    """Reads and writes the vars of a plc with the native protocol.
+
+    Requests are answered like Cybro.request, but only vars of the
+    allocation file can be accessed, the sys vars still need the scgi
+    server. Long requests are split into frames of at most
+    UDP_MAX_FRAME_DATA bytes, sent one after the other.
+    """
+
+    def __init__(self, nad: int) -> None:
+        """Initialize the client, it is available after set_plc."""
+        self.nad = nad
+        self.host: str | None = None
+        self.port = UDP_PORT
+        self.allocation: dict[str, AllocatedVar] = {}
+        self._alc: str | None = None
+        self._protocol: CybroUdpProtocol | None = None
+        self._transaction = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Return True if the address and allocation of the plc are known."""
+        return self.host is not None and len(self.allocation) > 0
+
+    def set_plc(self, ip_port: str, alc: str) -> None:
+        """Set the address and the allocation file of the plc."""
+        host, _, port = ip_port.rpartition(":")
+        address = (host or None, int(port) if port.isdigit() else UDP_PORT)
+        if address != (self.host, self.port):
+            self.close()
+            self.host, self.port = address
+        if alc != self._alc:
+            self.allocation = parse_allocation(alc, self.nad)
+            self._alc = alc
+            LOGGER.debug(
+                "%s vars of c%s are accessible with udp at %s:%s",
+                len(self.allocation),
+                self.nad,
+                self.host,
+                self.port,
+            )
+
+    def split(self, names: Iterable[str]) -> tuple[list[str], list[str]]:
+        """Split var names into the ones accessible with udp and the rest."""
+        if not self.available:
+            return [], list(names)
+        udp_names: list[str] = []
+        other_names: list[str] = []
+        for name in names:
+            (udp_names if name in self.allocation else other_names).append(name)
+        return udp_names, other_names
+
+    async def request(
+        self, data: dict[str, str], stats: ScgiRequestStats | None = None
+    ) -> dict[str, Any] | None:
+        """Read ("" values) or write vars, return the vars like the scgi server."""
+        try:
+            variables = [(name, self.allocation[name]) for name in data]
+        except KeyError as error:
+            raise CybroError(f"{error} is not in the allocation file") from error
+        items: list[dict[str, Any]] = []
+        writes = sort_by_size(item for item in variables if data[item[0]] != "")
+        reads = sort_by_size(item for item in variables if data[item[0]] == "")
+        for chunk in self._chunks(writes):
+            values = [data[name] for name, _ in chunk]
+            await self._async_exchange(
+                COMMAND_RANDOM_WRITE,
+                encode_random_access(COMMAND_RANDOM_WRITE, chunk, values),
+                stats,
+            )
+            # the scgi server answers writes with the written values
+            items.extend(
+                self._item(name, var, value)
+                for (name, var), value in zip(chunk, values)
+            )
+        for chunk in self._chunks(reads):
+            response = await self._async_exchange(
+                COMMAND_RANDOM_READ,
+                encode_random_access(COMMAND_RANDOM_READ, chunk),
+                stats,
+            )
+            start = monotonic()
+            values = decode_values([var for _, var in chunk], response)
+            items.extend(
+                self._item(name, var, value)
+                for (name, var), value in zip(chunk, values)
+            )
+            if stats is not None:
+                stats.parse_time += monotonic() - start
+                stats.vars += len(chunk)
+        return {"var": items} if items else None
+
+    @staticmethod
+    def _item(name: str, var: AllocatedVar, value: str) -> dict[str, Any]:
+        """Return a var item like in a scgi server response."""
+        return {"name": name, "value": value, "description": var.description}
+
+    @staticmethod
+    def _chunks(
+        variables: list[tuple[str, AllocatedVar]]
+    ) -> list[list[tuple[str, AllocatedVar]]]:
+        """Split vars sorted by size into chunks fitting into a frame."""
+        chunks: list[list[tuple[str, AllocatedVar]]] = []
+        max_length = UDP_MAX_FRAME_DATA - RANDOM_ACCESS_HEADER.size
+        length = 0
+        for variable in variables:
+            # address and value of the var
+            var_length = 2 + variable[1].size
+            if not chunks or length + var_length > max_length:
+                chunks.append([])
+                length = 0
+            chunks[-1].append(variable)
+            length += var_length
+        return chunks
+
+    async def _async_exchange(
+        self, command: int, data: bytes, stats: ScgiRequestStats | None
+    ) -> bytes:
+        """Send a request frame, return the data of the response.
+
+        Lost frames are sent again up to UDP_REQUEST_TRIES times.
+        """
+        async with self._lock:
+            protocol = await self._async_get_protocol()
+            for attempt in range(UDP_REQUEST_TRIES):
+                self._transaction = (self._transaction + 1) % 256
+                future: asyncio.Future = asyncio.get_running_loop().create_future()
+                protocol.waiters[self._transaction] = future
+                frame = encode_frame(
+                    UDP_CLIENT_NAD,
+                    self.nad,
+                    DIRECTION_REQUEST,
+                    self._transaction,
+                    data,
+                )
+                start = monotonic()
+                if protocol.transport is None:
+                    raise CybroConnectionError("Connection to the plc closed")
+                protocol.transport.sendto(frame)
+                try:
+                    async with async_timeout.timeout(UDP_REQUEST_TIMEOUT):
+                        response: Frame = await future
+                except asyncio.TimeoutError:
+                    protocol.waiters.pop(self._transaction, None)
+                    LOGGER.debug(
+                        "No response of c%s on attempt %s", self.nad, attempt + 1
+                    )
+                    continue
+                if response.from_nad != self.nad or response.data[:1] != bytes(
+                    [command]
+                ):
+                    raise CybroError(f"Unexpected response of c{self.nad}")
+                if stats is not None:
+                    stats.requests += 1
+                    stats.latency += monotonic() - start
+                    stats.response_bytes += len(response.data)
+                return response.data[1:]
+        raise CybroConnectionTimeoutError(
+            f"Timeout occurred while connecting to c{self.nad} at"
+            f" {self.host}:{self.port}"
+        )
+
+    async def _async_get_protocol(self) -> CybroUdpProtocol:
+        """Return the protocol of the udp endpoint, open it if needed."""
+        if self._protocol is not None and self._protocol.transport is not None:
+            return self._protocol
+        if self.host is None:
+            raise CybroConnectionError(f"Address of c{self.nad} is unknown")
+        try:
+            _, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+                CybroUdpProtocol, remote_addr=(self.host, self.port)
+            )
+        except OSError as error:
+            raise CybroConnectionError(
+                f"Error opening udp endpoint to {self.host}:{self.port}: {error}"
+            ) from error
+        self._protocol = protocol
+        return protocol
+
+    def close(self) -> None:
+        """Close the udp endpoint."""
+        if self._protocol is not None and self._protocol.transport is not None:
+            self._protocol.transport.close()
+        self._protocol = None
@@ -2,21 +2,41 @@
 from __future__ import annotations
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.storage import Store
 
 from .const import DOMAIN
+from .const import PLATFORMS
+from .const import STORAGE_VERSION
 from .coordinator import CybroDataUpdateCoordinator
-
-PLATFORMS = [Platform.BINARY_SENSOR, Platform.LIGHT, Platform.SENSOR, Platform.WEATHER]
+from .models import plc_device_info
+from .services import async_setup_services
+from .services import async_unload_services
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Cybro from a config entry."""
     coordinator = CybroDataUpdateCoordinator(hass, entry=entry)
-    await coordinator.async_config_entry_first_refresh()
+    # build the entities from the discovery cache if possible,
+    # the first refresh revalidates it in the background
+    if await coordinator.async_load_discovery_cache():
+        hass.async_create_task(coordinator.async_refresh())
+    else:
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except ConfigEntryNotReady:
+            coordinator.poller.async_unregister(coordinator)
+            raise
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    async_setup_services(hass)
+
+    # the plc device is the via device of the other devices of all platforms
+    dr.async_get(hass).async_get_or_create(
+        config_entry_id=entry.entry_id, **plc_device_info(coordinator)
+    )
 
     # Set up all platforms for this device/entry.
     hass.config_entries.async_setup_platforms(entry, PLATFORMS)
@@ -35,8 +55,11 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         # Ensure disconnected and cleanup stop sub
         if coordinator.unsub:
             coordinator.unsub()
+        coordinator.write_queue.async_cancel()
+        coordinator.poller.async_unregister(coordinator)
 
         del hass.data[DOMAIN][entry.entry_id]
+        await async_unload_services(hass)
 
     return unload_ok
 
@@ -44,3 +67,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload the config entry when it changed."""
     await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the discovery cache of a removed config entry."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
@@ -0,0 +1,70 @@
+"""Windowed aggregation of high rate Cybro PLC samples."""
+from __future__ import annotations
+
+from array import array
+from typing import NamedTuple
+
+
+class WindowSummary(NamedTuple):
+    """Aggregated samples of a window."""
+
+    minimum: float
+    mean: float
+    maximum: float
+    samples: int
+
+
+class CybroSampleWindow:
+    """Ring buffer of the samples of a var within an aggregation window.
+
+    The mean is weighted by the time each sample was valid, so irregular
+    refreshes do not skew it. If the buffer is full, the oldest samples
+    are overwritten.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize an empty window."""
+        self._capacity = max(capacity, 1)
+        self._times = array("d", bytes(8 * self._capacity))
+        self._values = array("d", bytes(8 * self._capacity))
+        self._first = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Return the number of samples in the window."""
+        return self._count
+
+    def add(self, time: float, value: float) -> None:
+        """Add a sample taken at a monotonic time."""
+        index = (self._first + self._count) % self._capacity
+        self._times[index] = time
+        self._values[index] = value
+        if self._count < self._capacity:
+            self._count += 1
+        else:
+            self._first = (self._first + 1) % self._capacity
+
+    def summary(self, end: float) -> WindowSummary | None:
+        """Return min, time weighted mean and max of the samples until end."""
+        if self._count == 0:
+            return None
+        indexes = [(self._first + i) % self._capacity for i in range(self._count)]
+        values = [self._values[index] for index in indexes]
+        times = [self._times[index] for index in indexes] + [end]
+        weighted = 0.0
+        duration = 0.0
+        for i, value in enumerate(values):
+            valid = max(times[i + 1] - times[i], 0.0)
+            weighted += value * valid
+            duration += valid
+        mean = weighted / duration if duration > 0 else sum(values) / len(values)
+        return WindowSummary(min(values), mean, max(values), len(values))
+
+    def restart(self, time: float) -> None:
+        """Start a new window at time, continuing with the last sample."""
+        if self._count == 0:
+            return
+        last = self._values[(self._first + self._count - 1) % self._capacity]
+        self._first = 0
+        self._count = 0
+        self.add(time, last)
@@ -4,20 +4,26 @@ from __future__ import annotations
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import AREA_SYSTEM
 from .const import ATTR_DESCRIPTION
 from .const import DEVICE_DESCRIPTION
 from .const import DOMAIN
 from .const import LOGGER
 from .const import MANUFACTURER
 from .const import MANUFACTURER_URL
+from .const import VAR_CAT_DIAG_PROBLEM
+from .const import VAR_CAT_RULE_BINARY_SENSOR
 from .coordinator import CybroDataUpdateCoordinator
+from .models import async_enabled_vars
 from .models import CybroEntity
+from .models import plc_device_info
+from .models import rule_device_info
+from cybro import VarType
 
 
 async def async_setup_entry(
@@ -29,9 +35,22 @@ async def async_setup_entry(
     """Set up a Cybro binary sensor based on a config entry."""
     coordinator: CybroDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
 
+    entities: list[CybroBinarySensor] = []
+
     sys_tags = add_system_tags(coordinator)
     if sys_tags is not None:
-        async_add_entities(sys_tags)
+        entities.extend(sys_tags)
+
+    rule_sensors = find_rule_binary_sensors(coordinator)
+    if rule_sensors is not None:
+        entities.extend(rule_sensors)
+
+    # read all registered vars once, so entities start with a value
+    await coordinator.async_warm_read(
+        async_enabled_vars(hass, Platform.BINARY_SENSOR, entities)
+    )
+    if len(entities) > 0:
+        async_add_entities(entities)
 
 
 def add_system_tags(
@@ -41,40 +60,44 @@ def add_system_tags(
     eg: c1000.scan_time and so on
     """
     res: list[CybroBinarySensor] = []
-    var_prefix = f"c{coordinator.cybro.nad}."
-
-    dev_info = DeviceInfo(
-        identifiers={(DOMAIN, var_prefix)},
-        manufacturer=MANUFACTURER,
-        default_name=f"c{coordinator.cybro.nad} diagnostics",
-        suggested_area=AREA_SYSTEM,
-        model=DEVICE_DESCRIPTION,
-        configuration_url=MANUFACTURER_URL,
-    )
+    dev_info = plc_device_info(coordinator)
+
+    # add different plc diagnostic vars
+    for key in coordinator.category_vars(VAR_CAT_DIAG_PROBLEM):
+        res.append(
+            CybroBinarySensor(
+                coordinator,
+                key,
+                attr_entity_category=EntityCategory.DIAGNOSTIC,
+                attr_device_class=BinarySensorDeviceClass.PROBLEM,
+                dev_info=dev_info,
+            )
+        )
 
-    # find different plc diagnostic vars
-    for key in coordinator.data.plc_info.plc_vars:
-        if key.find(var_prefix) != -1:
-            if key in (f"{var_prefix}scan_overrun", f"{var_prefix}retentive_fail"):
-                res.append(
-                    CybroBinarySensor(
-                        coordinator,
-                        key,
-                        attr_entity_category=EntityCategory.DIAGNOSTIC,
-                        attr_device_class=BinarySensorDeviceClass.PROBLEM,
-                        dev_info=dev_info,
-                    )
-                )
-            elif key.find("general_error") != -1:
-                res.append(
-                    CybroBinarySensor(
-                        coordinator,
-                        key,
-                        attr_entity_category=EntityCategory.DIAGNOSTIC,
-                        attr_device_class=BinarySensorDeviceClass.PROBLEM,
-                        dev_info=dev_info,
-                    )
-                )
+    if len(res) > 0:
+        return res
+    return None
+
+
+def find_rule_binary_sensors(
+    coordinator: CybroDataUpdateCoordinator,
+) -> list[CybroBinarySensor] | None:
+    """Find the plc vars mapped to binary sensors by the user var rules."""
+    res: list[CybroBinarySensor] = []
+    dev_info = rule_device_info(coordinator)
+    for key in coordinator.category_vars(VAR_CAT_RULE_BINARY_SENSOR):
+        if (rule := coordinator.var_rules.match(key)) is None:
+            continue
+        res.append(
+            CybroBinarySensor(
+                coordinator,
+                key,
+                attr_device_class=BinarySensorDeviceClass(rule.device_class)
+                if rule.device_class
+                else None,
+                dev_info=dev_info,
+            )
+        )
 
     if len(res) > 0:
         return res
@@ -110,7 +133,7 @@ class CybroBinarySensor(CybroEntity, BinarySensorEntity):
         self._attr_device_class = attr_device_class
         self._attr_device_info = dev_info
         LOGGER.debug(self._attr_unique_id)
-        coordinator.data.add_var(self._attr_unique_id, var_type=0)
+        self._slot = coordinator.register_value(var_name, VarType.BOOL)
 
     @property
     def device_info(self):
@@ -128,11 +151,9 @@ class CybroBinarySensor(CybroEntity, BinarySensorEntity):
     @property
     def is_on(self) -> bool | None:
         """Return entity state."""
-        if self._attr_unique_id in self.coordinator.data.vars:
-            self._attr_available = True
-            return self.coordinator.data.vars[self._attr_unique_id].value == "1"
-        self._attr_available = False
-        return None
+        value = self.coordinator.values.get(self._slot)
+        self._attr_available = value is not None
+        return value
 
     @property
     def extra_state_attributes(self):
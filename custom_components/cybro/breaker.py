@@ -0,0 +1,124 @@
+"""Circuit breaker for unreachable Cybro scgi servers."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable
+from collections.abc import Callable
+from time import monotonic
+
+from .const import BREAKER_CLOSED
+from .const import BREAKER_FAILURE_THRESHOLD
+from .const import BREAKER_HALF_OPEN
+from .const import BREAKER_OPEN
+from .const import BREAKER_RESET_TIMEOUT_MAX
+from .const import BREAKER_RESET_TIMEOUT_MIN
+from .const import LOGGER
+from cybro import CybroConnectionError
+
+
+class CybroCircuitBreaker:
+    """Stops sending requests to a scgi server which does not respond.
+
+    Closed: requests are sent, BREAKER_FAILURE_THRESHOLD failed requests in
+    a row open the breaker.
+    Open: requests fail at once, a single cheap probe request is sent after
+    the reset timeout.
+    Half open: requests wait for the probe. The breaker closes if the probe
+    succeeds, otherwise it opens again with a doubled reset timeout.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], Awaitable[object]],
+        on_close: Callable[[], None] | None = None,
+    ) -> None:
+        """Initialize a closed breaker."""
+        self.name = name
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self._probe = probe
+        self._on_close = on_close
+        self._reset_timeout = BREAKER_RESET_TIMEOUT_MIN.total_seconds()
+        self._probe_at = 0.0
+        self._probe_handle: asyncio.TimerHandle | None = None
+        self._probe_task: asyncio.Task | None = None
+
+    async def async_check(self) -> None:
+        """Return if a request may be sent, raise CybroConnectionError if not."""
+        if self._probe_task is not None:
+            # a cancelled caller must not cancel the probe of the others
+            await asyncio.shield(self._probe_task)
+        if self.state == BREAKER_CLOSED:
+            return
+        raise CybroConnectionError(
+            f"Cybro scgi server at {self.name} is unreachable, next probe"
+            f" in {max(self._probe_at - monotonic(), 0):.0f}s"
+        )
+
+    def _start_probe(self) -> None:
+        """Start the probe request."""
+        self._probe_handle = None
+        self.state = BREAKER_HALF_OPEN
+        self._probe_task = asyncio.create_task(self._async_probe())
+
+    async def _async_probe(self) -> None:
+        """Send the probe request, close or reopen the breaker."""
+        LOGGER.debug("Probing the scgi server at %s", self.name)
+        try:
+            await self._probe()
+        except Exception as error:
+            LOGGER.debug("Probe of the scgi server at %s failed: %s", self.name, error)
+            self._open()
+            return
+        finally:
+            self._probe_task = None
+        self.record_success()
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request."""
+        self.failures = 0
+        if self.state == BREAKER_CLOSED:
+            return
+        # a request in flight can close the breaker before the probe
+        self._cancel_probe_timer()
+        self.state = BREAKER_CLOSED
+        self._reset_timeout = BREAKER_RESET_TIMEOUT_MIN.total_seconds()
+        LOGGER.info("Cybro scgi server at %s is reachable again", self.name)
+        if self._on_close is not None:
+            self._on_close()
+
+    def record_failure(self) -> None:
+        """Count a failed request, open the breaker at the threshold."""
+        self.failures += 1
+        if self.state == BREAKER_CLOSED and self.failures >= BREAKER_FAILURE_THRESHOLD:
+            LOGGER.warning(
+                "Cybro scgi server at %s is unreachable, pausing requests",
+                self.name,
+            )
+            self._open()
+
+    def _open(self) -> None:
+        """Open the breaker, double the reset timeout after a failed probe."""
+        if self.state == BREAKER_HALF_OPEN:
+            self._reset_timeout = min(
+                self._reset_timeout * 2, BREAKER_RESET_TIMEOUT_MAX.total_seconds()
+            )
+        self.state = BREAKER_OPEN
+        self._probe_at = monotonic() + self._reset_timeout
+        self._cancel_probe_timer()
+        self._probe_handle = asyncio.get_running_loop().call_later(
+            self._reset_timeout, self._start_probe
+        )
+
+    def _cancel_probe_timer(self) -> None:
+        """Cancel the scheduled start of a probe."""
+        if self._probe_handle is not None:
+            self._probe_handle.cancel()
+            self._probe_handle = None
+
+    def stop(self) -> None:
+        """Cancel a pending probe."""
+        self._cancel_probe_timer()
+        if self._probe_task is not None:
+            self._probe_task.cancel()
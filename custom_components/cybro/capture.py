@@ -0,0 +1,153 @@
+"""Capture of the scgi traffic of a Cybro scgi server for offline replay."""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import time
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.core import HomeAssistant
+
+from .const import CAPTURE_FLUSH_RECORDS
+from .const import CAPTURE_VERSION
+from .const import LOGGER
+from .scgi import CybroScgiClient
+from .scgi import response_vars
+from cybro import Cybro
+
+
+def query_pairs(data: dict[str, str] | str | None) -> list[list[str]]:
+    """Return the [name, value] pairs of a scgi request, value "" for reads."""
+    if data is None:
+        return []
+    if isinstance(data, str):
+        return [
+            list(part.partition("=")[::2]) for part in data.split("&") if part != ""
+        ]
+    return [[name, str(value)] for name, value in data.items()]
+
+
+class CybroCapture:
+    """Records all requests and responses of a scgi server to a file.
+
+    The file holds gzipped json lines, a header followed by one record per
+    request: [offset, duration, query pairs, response pairs or null, error].
+    Offset and duration are seconds relative to the start of the capture.
+    """
+
+    def __init__(self, hass: HomeAssistant, host: str, port: int, path: str) -> None:
+        """Initialize the capture."""
+        self.hass = hass
+        self.path = path
+        self.records = 0
+        self._header = {
+            "version": CAPTURE_VERSION,
+            "host": host,
+            "port": port,
+            "start": time.time(),
+        }
+        self._start = time.monotonic()
+        self._lines: list[str] = [json.dumps(self._header)]
+        # attached clients and their replaced request attribute by id, Cybro
+        # is an unhashable dataclass
+        self._clients: dict[int, tuple[Cybro | CybroScgiClient, Any]] = {}
+        self._write_lock = asyncio.Lock()
+        # cancels the scheduled stop of the capture
+        self.cancel_stop: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_attach(self, cybro: Cybro | CybroScgiClient) -> None:
+        """Record all requests done by a scgi client."""
+        if id(cybro) in self._clients:
+            return
+        self._clients[id(cybro)] = (cybro, vars(cybro).get("request"))
+        request = cybro.request
+
+        async def capture_request(
+            data: dict[str, str] | str | None = None, *args: Any
+        ) -> Any:
+            start = time.monotonic()
+            try:
+                result = await request(data, *args)
+            except Exception as err:
+                self._record(start, data, None, repr(err))
+                raise
+            self._record(start, data, result, None)
+            return result
+
+        cybro.request = capture_request
+
+    def _record(
+        self,
+        start: float,
+        data: dict[str, str] | str | None,
+        result: dict[str, Any] | None,
+        error: str | None,
+    ) -> None:
+        """Add a record, write out the records if enough are pending."""
+        response = None
+        if error is None:
+            response = [
+                [item.get("name"), item.get("value")] for item in response_vars(result)
+            ]
+        self._lines.append(
+            json.dumps(
+                [
+                    round(start - self._start, 4),
+                    round(time.monotonic() - start, 4),
+                    query_pairs(data),
+                    response,
+                    error,
+                ],
+                separators=(",", ":"),
+            )
+        )
+        self.records += 1
+        if len(self._lines) >= CAPTURE_FLUSH_RECORDS:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Append the pending records to the capture file in the background."""
+        lines, self._lines = self._lines, []
+        self.hass.async_create_task(self._async_write(lines))
+
+    async def _async_write(self, lines: list[str]) -> None:
+        """Append lines to the capture file, keeping the order of the writes."""
+        async with self._write_lock:
+            await self.hass.async_add_executor_job(self._write, lines)
+
+    def _write(self, lines: list[str]) -> None:
+        """Append lines to the capture file."""
+        with gzip.open(self.path, "at", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+    async def async_stop(self) -> None:
+        """Stop recording and write out all pending records.
+
+        The clients get back the request they had before they were attached.
+        """
+        if self.cancel_stop is not None:
+            self.cancel_stop()
+            self.cancel_stop = None
+        for cybro, request in self._clients.values():
+            if request is None:
+                del cybro.request
+            else:
+                cybro.request = request
+        self._clients.clear()
+        if lines := self._lines:
+            self._lines = []
+            await self._async_write(lines)
+        LOGGER.info("Captured %s scgi requests to %s", self.records, self.path)
+
+
+def read_capture(path: str) -> tuple[dict[str, Any], list[list[Any]]]:
+    """Return the header and records of a capture file."""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        header = json.loads(file.readline())
+        if header.get("version") != CAPTURE_VERSION:
+            raise ValueError(f"Unsupported capture version in {path}")
+        return header, [json.loads(line) for line in file if line.strip()]
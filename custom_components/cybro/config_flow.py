@@ -4,15 +4,38 @@ from __future__ import annotations
 from typing import Any
 
 import voluptuous as vol
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.config_entries import ConfigFlow
+from homeassistant.config_entries import OptionsFlow
 from homeassistant.const import CONF_ADDRESS
 from homeassistant.const import CONF_HOST
 from homeassistant.const import CONF_PORT
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.selector import TextSelector
+from homeassistant.helpers.selector import TextSelectorConfig
 
+from .const import AGGREGATION_CATEGORIES
+from .const import CONF_AGGREGATION_WINDOW
+from .const import CONF_CHANGE_COUNTER
+from .const import CONF_CHANGE_COUNTER_INTERVAL
+from .const import CONF_DEADBAND
+from .const import CONF_DEADBAND_PERCENT
+from .const import CONF_FORCE_UPDATE_INTERVAL
+from .const import CONF_MAX_CONCURRENT_REQUESTS
+from .const import CONF_MAX_POLL_INTERVAL
+from .const import CONF_MIN_POLL_INTERVAL
+from .const import CONF_VAR_RULES
+from .const import DEADBAND_CATEGORIES
+from .const import DEFAULT_CHANGE_COUNTER_INTERVAL
+from .const import DEFAULT_FORCE_UPDATE_INTERVAL
+from .const import DEFAULT_MAX_CONCURRENT_REQUESTS
+from .const import DEFAULT_MAX_POLL_INTERVAL
+from .const import DEFAULT_MIN_POLL_INTERVAL
 from .const import DOMAIN
 from .const import LOGGER
+from .discovery import parse_var_rules
 from cybro import Cybro
 from cybro import CybroConnectionError
 from cybro import Device
@@ -25,6 +48,12 @@ class CybroFlowHandler(ConfigFlow, domain=DOMAIN):
     discovered_host: str
     discovered_device: Device
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return CybroOptionsFlowHandler(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -84,3 +113,89 @@ class CybroFlowHandler(ConfigFlow, domain=DOMAIN):
         session = async_get_clientsession(self.hass)
         cybro = Cybro(host, port=port, session=session, nad=address)
         return await cybro.update(plc_nad=address)
+
+
+class CybroOptionsFlowHandler(OptionsFlow):
+    """Handle Cybro PLC options."""
+
+    def __init__(self, config_entry: ConfigEntry) -> None:
+        """Initialize Cybro PLC options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the sensor filters, the scgi requests and the var rules."""
+        errors: dict[str, str] = {}
+        # the parse error is shown with the form
+        rules_error = ""
+        if user_input is not None:
+            try:
+                parse_var_rules(user_input.get(CONF_VAR_RULES, ""))
+            except ValueError as error:
+                LOGGER.debug("Invalid var rules: %s", error)
+                errors[CONF_VAR_RULES] = "invalid_var_rules"
+                rules_error = str(error)
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = {**self.config_entry.options, **(user_input or {})}
+        schema: dict[vol.Marker, Any] = {}
+        for category in DEADBAND_CATEGORIES:
+            band = f"{category}_{CONF_DEADBAND}"
+            percent = f"{category}_{CONF_DEADBAND_PERCENT}"
+            schema[vol.Optional(band, default=options.get(band, 0.0))] = vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            )
+            schema[vol.Optional(percent, default=options.get(percent, False))] = bool
+        for category in AGGREGATION_CATEGORIES:
+            window = f"{category}_{CONF_AGGREGATION_WINDOW}"
+            schema[vol.Optional(window, default=options.get(window, 0))] = vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=3600)
+            )
+        schema[
+            vol.Optional(
+                CONF_FORCE_UPDATE_INTERVAL,
+                default=options.get(
+                    CONF_FORCE_UPDATE_INTERVAL, DEFAULT_FORCE_UPDATE_INTERVAL
+                ),
+            )
+        ] = vol.All(vol.Coerce(int), vol.Range(min=1))
+        schema[
+            vol.Optional(
+                CONF_MAX_CONCURRENT_REQUESTS,
+                default=options.get(
+                    CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+                ),
+            )
+        ] = vol.All(vol.Coerce(int), vol.Range(min=1, max=16))
+        schema[
+            vol.Optional(
+                CONF_CHANGE_COUNTER, default=options.get(CONF_CHANGE_COUNTER, "")
+            )
+        ] = str
+        schema[
+            vol.Optional(
+                CONF_CHANGE_COUNTER_INTERVAL,
+                default=options.get(
+                    CONF_CHANGE_COUNTER_INTERVAL, DEFAULT_CHANGE_COUNTER_INTERVAL
+                ),
+            )
+        ] = vol.All(vol.Coerce(int), vol.Range(min=1))
+        for key, default in (
+            (CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL),
+            (CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL),
+        ):
+            schema[vol.Optional(key, default=options.get(key, default))] = vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=3600)
+            )
+        schema[
+            vol.Optional(CONF_VAR_RULES, default=options.get(CONF_VAR_RULES, ""))
+        ] = TextSelector(TextSelectorConfig(multiline=True))
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(schema),
+            errors=errors,
+            description_placeholders={"rules_error": rules_error},
+        )
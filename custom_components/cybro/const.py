@@ -3,8 +3,15 @@ import logging
 from datetime import timedelta
 from typing import Final
 
+from homeassistant.const import Platform
+
 # Integration domain
 DOMAIN = "cybro"
+DATA_HOST_POLLERS = f"{DOMAIN}_host_pollers"
+DATA_CAPTURES = f"{DOMAIN}_captures"
+DATA_CAPTURE_STOP_LISTENER = f"{DOMAIN}_capture_stop_listener"
+PLATFORMS = [Platform.BINARY_SENSOR, Platform.LIGHT, Platform.SENSOR, Platform.WEATHER]
+STORAGE_VERSION = 1
 
 MANUFACTURER = "Cybrotech Ltd"
 MANUFACTURER_URL = "https://www.cybrotech.com"
@@ -13,8 +20,83 @@ DEVICE_DESCRIPTION = "Cybro 2/3 PLC"
 
 LOGGER = logging.getLogger(__package__)
 SCAN_INTERVAL = timedelta(seconds=10)
+# time [s] the platforms wait for each other to register their vars
+WARM_READ_TIMEOUT = 10
+# delay of the next refresh after a failure, doubled on every failure
+RECOVERY_INTERVAL_MIN = timedelta(seconds=2)
+RECOVERY_INTERVAL_MAX = timedelta(minutes=5)
+# writes arriving within this time [s] are sent with a single request
+WRITE_COALESCE_DELAY = 0.05
+# reads of plcs on the same host arriving within this time [s] are sent
+# with a single request (refreshes are scheduled within the same second)
+POLLER_GATHER_DELAY = 0.5
+# attempts of a scgi request before giving up
+SCGI_REQUEST_TRIES = 3
+# circuit breaker of a scgi server (see breaker.CybroCircuitBreaker), failed
+# requests in a row which open it and the time until it is probed, doubled
+# on every failed probe
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT_MIN = timedelta(seconds=10)
+BREAKER_RESET_TIMEOUT_MAX = timedelta(minutes=1)
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+# longer requests are split into chunks, most servers limit the request
+# line to 8 KiB
+SCGI_MAX_URL_LENGTH = 8000
+# responses are parsed in chunks of this size [bytes] while they arrive
+SCGI_READ_CHUNK_SIZE = 16384
+# number of refreshes the poll metric percentiles are calculated of
+POLL_METRICS_WINDOW = 100
+# adaptive polling, the fast tier is never polled faster than these
+# multiples of the smoothed request latency and of the plc scan time
+POLL_LATENCY_MULTIPLE = 4
+POLL_SCAN_TIME_MULTIPLE = 2
+# weight of the last refresh in the smoothed latency and volatility
+POLL_SMOOTHING = 0.3
+# smoothed share of the read vars which changed, the polling speeds up
+# above the high and slows down below the low volatility by these factors
+POLL_VOLATILITY_HIGH = 0.02
+POLL_VOLATILITY_LOW = 0.002
+POLL_SPEED_UP = 0.5
+POLL_SLOW_DOWN = 1.25
+# format version of the scgi traffic captures
+CAPTURE_VERSION = 1
+# captured requests are written to the file in chunks of this size
+CAPTURE_FLUSH_RECORDS = 100
+
+# Services
+SERVICE_CAPTURE = "capture"
 
 # Options
+CONF_FORCE_UPDATE_INTERVAL = "force_update_interval"
+DEFAULT_FORCE_UPDATE_INTERVAL = 300
+# chunks of a scgi request sent at once, the smallest limit of all
+# entries of a scgi server applies
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+# plc var (without the "cNAD." prefix) counting the changes of the plc
+# vars, the due vars are only read if it changed, all registered vars are
+# read at least once per change counter interval [s]
+CONF_CHANGE_COUNTER = "change_counter"
+CONF_CHANGE_COUNTER_INTERVAL = "change_counter_interval"
+DEFAULT_CHANGE_COUNTER_INTERVAL = 60
+# bounds [s] of the adaptive interval of the normal poll tier, the other
+# tiers are scaled alike
+CONF_MIN_POLL_INTERVAL = "min_poll_interval"
+CONF_MAX_POLL_INTERVAL = "max_poll_interval"
+DEFAULT_MIN_POLL_INTERVAL = 10
+DEFAULT_MAX_POLL_INTERVAL = 60
+# user rules mapping plc var names to entities, one rule per line:
+# pattern; platform; unit; device class; scale (see discovery.parse_var_rules)
+CONF_VAR_RULES = "var_rules"
+# the deadband options of a category are "<category>_deadband" and
+# "<category>_deadband_percent" (see DEADBAND_CATEGORIES)
+CONF_DEADBAND = "deadband"
+CONF_DEADBAND_PERCENT = "deadband_percent"
+# the aggregation window [s] option of a category is
+# "<category>_aggregation_window" (see AGGREGATION_CATEGORIES)
+CONF_AGGREGATION_WINDOW = "aggregation_window"
 
 # Attributes
 AREA_SYSTEM = "System"
@@ -22,6 +104,99 @@ AREA_ENERGY = "Energy"
 AREA_WEATHER = "Weather"
 AREA_LIGHTS = "Lights"
 ATTR_DESCRIPTION = "description"
+ATTR_DURATION = "duration"
+ATTR_MIN = "min"
+ATTR_MAX = "max"
+ATTR_SAMPLES = "samples"
 
 # Device classes
 DEVICE_CLASS_CYBRO_LIVE_OVERRIDE: Final = "cybro__live_override"
+
+# Poll metrics (see metrics.CybroPollMetrics)
+POLL_METRIC_REQUEST_LATENCY: Final = "request_latency"
+POLL_METRIC_RESPONSE_BYTES: Final = "response_bytes"
+POLL_METRIC_PARSE_TIME: Final = "parse_time"
+POLL_METRIC_VARS: Final = "vars"
+POLL_METRIC_DISPATCH_TIME: Final = "dispatch_time"
+POLL_METRICS = (
+    POLL_METRIC_REQUEST_LATENCY,
+    POLL_METRIC_RESPONSE_BYTES,
+    POLL_METRIC_PARSE_TIME,
+    POLL_METRIC_VARS,
+    POLL_METRIC_DISPATCH_TIME,
+)
+
+# Variable categories (see discovery.classify_plc_vars)
+VAR_CAT_DIAG_SCAN_TIME: Final = "diag_scan_time"
+VAR_CAT_DIAG_UPTIME: Final = "diag_uptime"
+VAR_CAT_DIAG_SCAN_FREQUENCY: Final = "diag_scan_frequency"
+VAR_CAT_DIAG_POWER_SUPPLY: Final = "diag_power_supply"
+VAR_CAT_DIAG_PROBLEM: Final = "diag_problem"
+VAR_CAT_TEMPERATURE: Final = "temperature"
+VAR_CAT_HUMIDITY: Final = "humidity"
+VAR_CAT_WEATHER_TEMPERATURE: Final = "weather_temperature"
+VAR_CAT_WEATHER_HUMIDITY: Final = "weather_humidity"
+VAR_CAT_WEATHER_WIND_SPEED: Final = "weather_wind_speed"
+VAR_CAT_WEATHER_STATION: Final = "weather_station"
+VAR_CAT_POWER_METER_POWER: Final = "power_meter_power"
+VAR_CAT_POWER_METER_VOLTAGE: Final = "power_meter_voltage"
+VAR_CAT_POWER_METER_CURRENT: Final = "power_meter_current"
+VAR_CAT_POWER_METER_ENERGY: Final = "power_meter_energy"
+VAR_CAT_POWER_METER_ENERGY_WH: Final = "power_meter_energy_wh"
+VAR_CAT_LIGHT: Final = "light"
+# vars matched by a user var rule, by platform of the rule
+VAR_CAT_RULE_SENSOR: Final = "rule_sensor"
+VAR_CAT_RULE_BINARY_SENSOR: Final = "rule_binary_sensor"
+VAR_CAT_RULE_LIGHT: Final = "rule_light"
+VAR_RULE_CATEGORIES: Final = {
+    Platform.SENSOR: VAR_CAT_RULE_SENSOR,
+    Platform.BINARY_SENSOR: VAR_CAT_RULE_BINARY_SENSOR,
+    Platform.LIGHT: VAR_CAT_RULE_LIGHT,
+}
+
+# Poll tiers
+POLL_TIER_FAST: Final = "fast"
+POLL_TIER_NORMAL: Final = "normal"
+POLL_TIER_SLOW: Final = "slow"
+POLL_TIER_STATIC: Final = "static"
+# static vars are only read after a full update
+POLL_TIER_INTERVALS: Final = {
+    POLL_TIER_FAST: timedelta(seconds=1),
+    POLL_TIER_NORMAL: SCAN_INTERVAL,
+    POLL_TIER_SLOW: timedelta(minutes=5),
+    POLL_TIER_STATIC: None,
+}
+CATEGORY_POLL_TIERS: Final = {
+    VAR_CAT_LIGHT: POLL_TIER_FAST,
+    VAR_CAT_RULE_LIGHT: POLL_TIER_FAST,
+    VAR_CAT_RULE_SENSOR: POLL_TIER_NORMAL,
+    VAR_CAT_RULE_BINARY_SENSOR: POLL_TIER_NORMAL,
+    VAR_CAT_POWER_METER_POWER: POLL_TIER_FAST,
+    VAR_CAT_POWER_METER_VOLTAGE: POLL_TIER_FAST,
+    VAR_CAT_POWER_METER_CURRENT: POLL_TIER_FAST,
+    VAR_CAT_POWER_METER_ENERGY: POLL_TIER_FAST,
+    VAR_CAT_POWER_METER_ENERGY_WH: POLL_TIER_FAST,
+    VAR_CAT_TEMPERATURE: POLL_TIER_NORMAL,
+    VAR_CAT_HUMIDITY: POLL_TIER_NORMAL,
+    VAR_CAT_WEATHER_TEMPERATURE: POLL_TIER_NORMAL,
+    VAR_CAT_WEATHER_HUMIDITY: POLL_TIER_NORMAL,
+    VAR_CAT_WEATHER_WIND_SPEED: POLL_TIER_NORMAL,
+    VAR_CAT_WEATHER_STATION: POLL_TIER_NORMAL,
+    VAR_CAT_DIAG_PROBLEM: POLL_TIER_NORMAL,
+    VAR_CAT_DIAG_SCAN_TIME: POLL_TIER_SLOW,
+    VAR_CAT_DIAG_UPTIME: POLL_TIER_SLOW,
+    VAR_CAT_DIAG_SCAN_FREQUENCY: POLL_TIER_SLOW,
+    VAR_CAT_DIAG_POWER_SUPPLY: POLL_TIER_SLOW,
+}
+# categories of numeric sensors whose changes can be filtered by a deadband
+DEADBAND_CATEGORIES: Final = (
+    VAR_CAT_POWER_METER_POWER,
+    VAR_CAT_POWER_METER_VOLTAGE,
+    VAR_CAT_POWER_METER_CURRENT,
+    VAR_CAT_TEMPERATURE,
+    VAR_CAT_HUMIDITY,
+)
+# categories of sensors which can publish aggregates of their samples
+AGGREGATION_CATEGORIES: Final = (VAR_CAT_POWER_METER_POWER,)
+# plc vars (without the "cNAD." prefix) which never change while running
+STATIC_PLC_VARS: Final = ("sys.ip_port",)
@@ -1,23 +1,122 @@
 """DataUpdateCoordinator for Cybro PLC."""
 from __future__ import annotations
 
+import asyncio
+import random
+import re
 from collections.abc import Callable
+from collections.abc import Iterable
+from datetime import timedelta
+from time import monotonic
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_ADDRESS
 from homeassistant.const import CONF_HOST
 from homeassistant.const import CONF_PORT
+from homeassistant.core import callback
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers.update_coordinator import UpdateFailed
 
+from .capture import CybroCapture
+from .const import BREAKER_CLOSED
+from .const import BREAKER_FAILURE_THRESHOLD
+from .const import CATEGORY_POLL_TIERS
+from .const import CONF_AGGREGATION_WINDOW
+from .const import CONF_CHANGE_COUNTER
+from .const import CONF_CHANGE_COUNTER_INTERVAL
+from .const import CONF_DEADBAND
+from .const import CONF_DEADBAND_PERCENT
+from .const import CONF_FORCE_UPDATE_INTERVAL
+from .const import CONF_MAX_CONCURRENT_REQUESTS
+from .const import CONF_MAX_POLL_INTERVAL
+from .const import CONF_MIN_POLL_INTERVAL
+from .const import CONF_VAR_RULES
+from .const import DEADBAND_CATEGORIES
+from .const import DEFAULT_CHANGE_COUNTER_INTERVAL
+from .const import DEFAULT_FORCE_UPDATE_INTERVAL
+from .const import DEFAULT_MAX_CONCURRENT_REQUESTS
+from .const import DEFAULT_MAX_POLL_INTERVAL
+from .const import DEFAULT_MIN_POLL_INTERVAL
 from .const import DOMAIN
 from .const import LOGGER
-from .const import SCAN_INTERVAL
+from .const import PLATFORMS
+from .const import POLL_LATENCY_MULTIPLE
+from .const import POLL_SCAN_TIME_MULTIPLE
+from .const import POLL_SLOW_DOWN
+from .const import POLL_SMOOTHING
+from .const import POLL_SPEED_UP
+from .const import POLL_TIER_FAST
+from .const import POLL_TIER_INTERVALS
+from .const import POLL_TIER_NORMAL
+from .const import POLL_TIER_STATIC
+from .const import POLL_VOLATILITY_HIGH
+from .const import POLL_VOLATILITY_LOW
+from .const import RECOVERY_INTERVAL_MAX
+from .const import RECOVERY_INTERVAL_MIN
+from .const import STATIC_PLC_VARS
+from .const import STORAGE_VERSION
+from .const import WARM_READ_TIMEOUT
+from .discovery import classify_plc_vars
+from .discovery import parse_var_rules
+from .discovery import VarRuleMatcher
+from .metrics import CybroPollMetrics
+from .poller import async_get_host_poller
+from .scgi import full_update_vars
+from .scgi import PLC_INFO_VARS
+from .scgi import ScgiRequestStats
+from .values import CybroValueStore
+from .write_queue import CybroWriteQueue
 from cybro import Cybro
 from cybro import CybroError
 from cybro import Device as CybroDevice
+from cybro import Var
+from cybro import VarType
+
+# a tier is due if it would be due within this time (scheduling jitter)
+POLL_TIER_TOLERANCE = 0.5
+
+
+class CybroPlcDevice(CybroDevice):
+    """Scgi server device of a single plc with vars of its own.
+
+    cybro.Device keeps the vars in class attributes, so all devices would
+    share them.
+    """
+
+    def __init__(self, data: dict[str, Any], plc_nad: int = 0) -> None:
+        """Initialize the device with empty vars."""
+        self.vars = {}
+        self.user_vars = {}
+        self.vars_types = {}
+        super().__init__(data, plc_nad)
+
+
+class CybroVarSubscription:
+    """Handle of the plc vars an entity subscribed to.
+
+    Releasing the handle unsubscribes the vars, releasing it again does
+    nothing.
+    """
+
+    def __init__(
+        self, coordinator: CybroDataUpdateCoordinator, names: tuple[str, ...]
+    ) -> None:
+        """Initialize the handle."""
+        self._coordinator = coordinator
+        self.names = names
+        self.released = False
+
+    @callback
+    def release(self) -> None:
+        """Unsubscribe the vars of this handle."""
+        if self.released:
+            return
+        self.released = True
+        self._coordinator.async_unsubscribe(self)
 
 
 class CybroDataUpdateCoordinator(DataUpdateCoordinator[CybroDevice]):
@@ -40,24 +139,685 @@ class CybroDataUpdateCoordinator(DataUpdateCoordinator[CybroDevice]):
             session=async_get_clientsession(hass),
         )
         self.unique_id = "c" + str(entry.data[CONF_ADDRESS])
+        self.entry_id = entry.entry_id
+        self.options = entry.options
+        self.max_concurrent_requests: int = self.options.get(
+            CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS
+        )
+        # discovered plc info and var index, keyed by the plc program
+        self._store: Store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+        self.program: str | None = None
+        self._full_update_pending = False
+        # number of failed refreshes in a row
+        self._failures = 0
+        # platforms waiting for the first read of their vars
+        self._warm_read_waiting = 0
+        self._warm_read_done = asyncio.Event()
+        # all plcs of the same scgi server are read with a single request
+        self.poller = async_get_host_poller(
+            hass, entry.data[CONF_HOST], entry.data[CONF_PORT]
+        )
+        self.poller.async_register(self)
+        self.write_queue = CybroWriteQueue(hass, self.poller)
+        self._read_back_vars: set[str] = set()
+        self._read_back_task: asyncio.Task | None = None
         self.unsub: Callable | None = None
+        self.var_index: dict[str, list[str]] = {}
+        # user var rules, a changed rule table invalidates the discovery cache
+        self._var_rules_text: str = self.options.get(CONF_VAR_RULES, "")
+        try:
+            self.var_rules = VarRuleMatcher(parse_var_rules(self._var_rules_text))
+        except (ValueError, re.error) as error:
+            LOGGER.warning("Ignoring the var rules of c%s: %s", self.cybro.nad, error)
+            self.var_rules = VarRuleMatcher([])
+        self._indexed_vars: dict[str, str] | None = None
+        # last seen value of every var, used to find changed vars per refresh
+        self._snapshot: dict[str, str] = {}
+        # poll tier of every known plc var and the registered vars per tier
+        self._var_tiers: dict[str, str] = {}
+        self._tier_vars: dict[str, list[str]] = {}
+        self._tier_read: dict[str, float] = {}
+        self._unread_vars: list[str] = []
+        # subscriptions per var of the added and enabled entities, the
+        # subscribed vars are regrouped into the poll tiers on the next
+        # refresh
+        self._subscriptions: dict[str, int] = {}
+        self._poll_vars_changed = False
+        # vars read by the warm read before their entities were added
+        self._warm_read_vars: set[str] = set()
+        self.changed_vars: set[str] = set()
+        # due vars are only read if the change counter var moved, all vars
+        # are read at least once per change counter interval
+        self._change_counter: str | None = None
+        if counter := self.options.get(CONF_CHANGE_COUNTER, "").strip():
+            self._change_counter = f"{self.unique_id}.{counter}"
+        self._change_counter_interval: float = self.options.get(
+            CONF_CHANGE_COUNTER_INTERVAL, DEFAULT_CHANGE_COUNTER_INTERVAL
+        )
+        self._change_count: str | None = None
+        self._counted_read = 0.0
+        # deadband (band, percent) per category and var, changes within the
+        # deadband are only published after the force update interval
+        self._category_deadbands: dict[str, tuple[float, bool]] = {
+            category: (
+                band,
+                self.options.get(f"{category}_{CONF_DEADBAND_PERCENT}", False),
+            )
+            for category in DEADBAND_CATEGORIES
+            if (band := self.options.get(f"{category}_{CONF_DEADBAND}", 0)) > 0
+            # aggregated sensors need every sample
+            and self.aggregation_window(category) == 0
+        }
+        self._var_deadbands: dict[str, tuple[float, bool]] = {}
+        self._force_update_interval: float = self.options.get(
+            CONF_FORCE_UPDATE_INTERVAL, DEFAULT_FORCE_UPDATE_INTERVAL
+        )
+        self._published: dict[str, float] = {}
+        # decoded values of all vars registered by entities
+        self.values = CybroValueStore()
+        # entity state write statistics
+        self.state_writes = 0
+        self.state_writes_skipped = 0
+        self.refresh_state_writes = 0
+        self.poll_metrics = CybroPollMetrics()
+        # the poll tier intervals are scaled between the bounds by the
+        # request latency, the plc scan time and the value volatility
+        normal = POLL_TIER_INTERVALS[POLL_TIER_NORMAL].total_seconds()
+        min_interval = self.options.get(
+            CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL
+        )
+        max_interval = self.options.get(
+            CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL
+        )
+        self.poll_scale_bounds = (
+            min_interval / normal,
+            max(max_interval, min_interval) / normal,
+        )
+        self.poll_scale = self.poll_scale_bounds[0]
+        self.volatility = 0.0
+        self.latency = 0.0
+        self._fast_interval = POLL_TIER_INTERVALS[POLL_TIER_FAST].total_seconds()
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_start = 0.0
 
         super().__init__(
             hass,
             LOGGER,
             name=DOMAIN,
-            update_interval=SCAN_INTERVAL,
+            update_interval=POLL_TIER_INTERVALS[POLL_TIER_FAST],
         )
 
     async def _async_update_data(self) -> CybroDevice:
-        """Fetch data from Cybro."""
+        """Fetch data from Cybro, one refresh at a time.
+
+        A refresh started while another one is running waits for it, then
+        only reads the vars which are still due.
+        """
+        async with self._refresh_lock:
+            self._refresh_start = monotonic()
+            return await self._async_refresh_vars()
+
+    async def _async_refresh_vars(self) -> CybroDevice:
+        """Read the due vars, do a full update if needed."""
+        read_vars: list[str] | None = None
+        stats = ScgiRequestStats()
         try:
-            device = await self.cybro.update(full_update=not self.last_update_success)
+            if self.data is None or self._full_update_pending:
+                device = await self._async_full_update(stats)
+            else:
+                # after a failure, retry the incremental read first
+                device = self.data
+                read_vars = await self._async_read_due_tiers(
+                    device, stats, check_program=self._failures > 0
+                )
+                if read_vars is None:
+                    device = await self._async_full_update(stats)
         except CybroError as error:
+            self._schedule_recovery()
+            if self._ride_out_failure(error):
+                return self.data
             raise UpdateFailed(
                 f"Invalid response from Cybro scgi server: {error}"
             ) from error
+        except UpdateFailed as error:
+            self._schedule_recovery()
+            if self._ride_out_failure(error):
+                return self.data
+            raise
 
-        self.async_update_listeners()
+        self._failures = 0
+        self.poll_metrics.record_requests(stats)
+        self.changed_vars = self._diff_vars(device, read_vars)
+        self.refresh_state_writes = 0
+        self._adapt_poll_scale(device, read_vars, stats)
+        self.update_interval = self._next_update_interval()
+        LOGGER.debug(
+            "%s vars changed since last refresh, next refresh in %s",
+            len(self.changed_vars),
+            self.update_interval,
+        )
+
+        return device
 
+    async def _async_full_update(self, stats: ScgiRequestStats) -> CybroDevice:
+        """Read the server and plc info and all registered vars of this plc."""
+        data = await self.poller.async_request(full_update_vars(self.cybro.nad), stats)
+        if not data:
+            raise UpdateFailed(
+                f"Cybro scgi server at {self.cybro.host}:{self.cybro.port} returned"
+                " an empty response on full update"
+            )
+        device = CybroPlcDevice(data, plc_nad=self.cybro.nad)
+        index_changed = self._update_var_index(device)
+        await self._async_update_program(device, index_changed)
+        self._full_update_pending = False
+        self._group_poll_vars(device, force=True)
+        self._unread_vars = []
+        counter = self._change_counter
+        if counter is not None and counter not in device.plc_info.plc_vars:
+            LOGGER.warning(
+                "Change counter %s does not exist, reading all due vars", counter
+            )
+            counter = self._change_counter = None
+        names = [name for tier_vars in self._tier_vars.values() for name in tier_vars]
+        if counter is not None:
+            names.append(counter)
+        if len(names) > 0:
+            await self._async_read_vars(device, names, stats)
+        now = monotonic()
+        self._tier_read = {tier: now for tier in self._tier_vars}
+        if counter is not None:
+            self._change_count = self._read_change_count(device)
+            self._counted_read = now
         return device
+
+    async def async_load_discovery_cache(self) -> bool:
+        """Set up the plc info and var index from the discovery cache.
+
+        A full update revalidates the cache on the next refresh.
+        Returns False if there is no usable cache.
+        """
+        if (cache := await self._store.async_load()) is None:
+            return False
+        try:
+            device = CybroPlcDevice({"var": cache["vars"]}, plc_nad=self.cybro.nad)
+            index = cache["index"]
+            program = cache["program"]
+        except (CybroError, KeyError, TypeError, AttributeError) as error:
+            LOGGER.debug("Ignoring invalid discovery cache: %s", error)
+            return False
+        if cache.get("var_rules", "") != self._var_rules_text:
+            LOGGER.debug("Ignoring discovery cache of changed var rules")
+            return False
+        self.program = program
+        self.var_index = index
+        self._indexed_vars = device.plc_info.plc_vars
+        self._update_var_tiers(device.plc_info.nad)
+        self._full_update_pending = True
+        self.async_set_updated_data(device)
+        return True
+
+    async def _async_update_program(
+        self, device: CybroDevice, index_changed: bool
+    ) -> None:
+        """Save the discovery cache and reload if the plc program changed."""
+        program = device.plc_info.timestamp
+        if program == self.program and not index_changed:
+            return
+        info_vars = [f"c{self.cybro.nad}.{name}" for name in PLC_INFO_VARS]
+        await self._store.async_save(
+            {
+                "program": program,
+                "vars": [
+                    {
+                        "name": var.name,
+                        "value": var.value,
+                        "description": var.description,
+                    }
+                    for name, var in device.vars.items()
+                    if name.startswith("sys.") or name in info_vars
+                ],
+                "index": self.var_index,
+                "var_rules": self._var_rules_text,
+            }
+        )
+        if self.program is not None:
+            # entities are built for the previous program
+            LOGGER.info("PLC program of c%s changed, reloading", self.cybro.nad)
+            self.hass.async_create_task(
+                self.hass.config_entries.async_reload(self.entry_id)
+            )
+        self.program = program
+
+    async def async_warm_read(self, names: Iterable[str]) -> None:
+        """Read the vars of all platforms once before their entities are added.
+
+        Every platform calls this with the vars of its enabled entities, the
+        last one reads the vars of all platforms with a single request.
+        """
+        self._warm_read_vars.update(names)
+        self._warm_read_waiting += 1
+        if self._warm_read_waiting < len(PLATFORMS):
+            try:
+                await asyncio.wait_for(self._warm_read_done.wait(), WARM_READ_TIMEOUT)
+            except asyncio.TimeoutError:
+                LOGGER.debug("Timeout waiting for the warm read of c%s", self.cybro.nad)
+            return
+
+        device = self.data
+        names = list(self._warm_read_vars)
+        try:
+            if len(names) > 0:
+                await self._async_read_vars(device, names)
+        except (CybroError, UpdateFailed) as error:
+            LOGGER.debug("Warm read of c%s failed: %s", self.cybro.nad, error)
+            self._warm_read_vars.clear()
+        else:
+            now = monotonic()
+            self._tier_read = dict.fromkeys(POLL_TIER_INTERVALS, now)
+            self._diff_vars(device, names)
+        finally:
+            self._warm_read_done.set()
+
+    def _schedule_recovery(self) -> None:
+        """Delay the next refresh after a failure.
+
+        The delay is doubled on every failure, the jitter spreads the
+        retries of all plcs on a struggling scgi server.
+        """
+        self._failures += 1
+        delay = min(
+            RECOVERY_INTERVAL_MIN.total_seconds() * 2 ** (self._failures - 1),
+            RECOVERY_INTERVAL_MAX.total_seconds(),
+        )
+        self.update_interval = timedelta(seconds=delay * random.uniform(0.5, 1.0))
+        LOGGER.debug(
+            "Refresh failed %s times, retrying in %s",
+            self._failures,
+            self.update_interval,
+        )
+
+    def _ride_out_failure(self, error: Exception) -> bool:
+        """Return True if the entities keep the last values after a failure.
+
+        Entities only become unavailable once per outage, when the circuit
+        breaker of the scgi server is open or this plc failed
+        BREAKER_FAILURE_THRESHOLD times in a row.
+        """
+        if (
+            self.data is None
+            or not self.last_update_success
+            or self.poller.breaker.state != BREAKER_CLOSED
+            or self._failures >= BREAKER_FAILURE_THRESHOLD
+        ):
+            return False
+        LOGGER.debug(
+            "Refresh of c%s failed, keeping the last values: %s", self.cybro.nad, error
+        )
+        self.changed_vars = set()
+        return True
+
+    async def _async_read_due_tiers(
+        self, device: CybroDevice, stats: ScgiRequestStats, check_program: bool = False
+    ) -> list[str] | None:
+        """Read all vars of the poll tiers which are due.
+
+        If check_program is set, the plc program timestamp is read too.
+        Returns the names of the read vars or None if the plc program or
+        var set has changed and a full update is needed.
+        """
+        self._group_poll_vars(device)
+        now = monotonic()
+        due_tiers = [
+            tier
+            for tier in self._tier_vars
+            if (interval := self._tier_interval(tier)) is not None
+            and now + POLL_TIER_TOLERANCE >= self._tier_read.get(tier, 0.0) + interval
+        ]
+        counter = self._change_counter
+        forced = False
+        if counter is not None and not check_program and not self._unread_vars:
+            if now - self._counted_read >= self._change_counter_interval:
+                # safety net for changes the counter missed
+                forced = True
+                due_tiers = [
+                    tier
+                    for tier in self._tier_vars
+                    if POLL_TIER_INTERVALS[tier] is not None
+                ]
+            elif len(due_tiers) > 0:
+                await self._async_read_vars(device, [counter], stats)
+                if self._read_change_count(device) == self._change_count:
+                    for tier in due_tiers:
+                        self._tier_read[tier] = now
+                    return [counter]
+        names = list(self._unread_vars)
+        for tier in due_tiers:
+            names.extend(self._tier_vars[tier])
+        if counter is not None and len(names) > 0:
+            names.append(counter)
+        program_var = f"c{self.cybro.nad}.sys.timestamp"
+        if check_program:
+            names.append(program_var)
+        if len(names) > 0:
+            read_vars = await self._async_read_vars(device, names, stats)
+            if check_program and (
+                len(read_vars) < len(set(names))
+                or device.vars[program_var].value != self.program
+            ):
+                LOGGER.info(
+                    "PLC program or vars of c%s changed, doing a full update",
+                    self.cybro.nad,
+                )
+                return None
+        self._unread_vars = []
+        for tier in due_tiers:
+            self._tier_read[tier] = now
+        if counter is not None:
+            self._change_count = self._read_change_count(device)
+            if forced:
+                self._counted_read = now
+        return names
+
+    def _read_change_count(self, device: CybroDevice) -> str | None:
+        """Return the last read value of the change counter var."""
+        if self._change_counter is None:
+            return None
+        return getattr(device.vars.get(self._change_counter), "value", None)
+
+    async def _async_read_vars(
+        self,
+        device: CybroDevice,
+        names: list[str],
+        stats: ScgiRequestStats | None = None,
+    ) -> set[str]:
+        """Read a list of vars with a single scgi request.
+
+        Returns the names of the vars in the response.
+        """
+        items = await self.poller.async_read(names, stats)
+        if len(items) == 0:
+            raise UpdateFailed(
+                f"Cybro scgi server at {self.cybro.host}:{self.cybro.port} returned"
+                " an empty response"
+            )
+        for item in items:
+            device.vars[item["name"]] = Var.from_dict(item)
+        return {item["name"] for item in items}
+
+    @callback
+    def async_start_capture(self, capture: CybroCapture) -> None:
+        """Record the scgi traffic of this plc, starting with a full update.
+
+        The full update puts the plc program into the capture for replay.
+        """
+        capture.async_attach(self.cybro)
+        capture.async_attach(self.poller.client)
+        self._full_update_pending = True
+
+    async def async_write_var(self, name: str, value: str) -> str:
+        """Write a single var, concurrent writes are sent together.
+
+        The written value is applied right away, a targeted read of the
+        written vars confirms it or rolls it back afterwards.
+        Returns the value from the scgi server response.
+        """
+        device = self.data
+        previous = device.vars.get(name)
+        device.vars[name] = Var(
+            name, value, previous.description if previous is not None else ""
+        )
+        self._async_dispatch_vars([name])
+        try:
+            item = await self.write_queue.async_write(name, value)
+        except Exception:
+            # the plc did not take the value, whatever failed
+            if previous is None:
+                device.vars.pop(name, None)
+            else:
+                device.vars[name] = previous
+            self._async_dispatch_vars([name])
+            raise
+
+        self._read_back_vars.add(name)
+        if self._read_back_task is None:
+            self._read_back_task = self.hass.async_create_task(self._async_read_back())
+        return item["value"]
+
+    async def _async_read_back(self) -> None:
+        """Read the written vars to confirm their optimistic values."""
+        # let all callers of the same write request add their vars
+        await asyncio.sleep(0)
+        self._read_back_task = None
+        names = list(self._read_back_vars)
+        self._read_back_vars.clear()
+        try:
+            await self._async_read_vars(self.data, names)
+        except (CybroError, UpdateFailed) as error:
+            LOGGER.debug("Read back of written vars failed: %s", error)
+            return
+        self._async_dispatch_vars(names)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners and measure how long they take."""
+        start = monotonic()
+        super().async_update_listeners()
+        self.poll_metrics.record_dispatch(monotonic() - start)
+
+    @callback
+    def _async_dispatch_vars(self, names: Iterable[str]) -> None:
+        """Notify the listeners of changed vars outside of a refresh."""
+        if changed := self._diff_vars(self.data, names):
+            self.changed_vars = changed
+            self.async_update_listeners()
+
+    @callback
+    def async_subscribe(self, names: Iterable[str]) -> CybroVarSubscription:
+        """Poll vars, starting with the next refresh.
+
+        Returns a handle which unsubscribes the vars when released. Vars
+        without a value from the warm read are read on the next refresh.
+        """
+        subscription = CybroVarSubscription(self, tuple(names))
+        for name in subscription.names:
+            count = self._subscriptions.get(name, 0)
+            self._subscriptions[name] = count + 1
+            if count > 0:
+                continue
+            self._poll_vars_changed = True
+            if name in self._warm_read_vars:
+                self._warm_read_vars.discard(name)
+            else:
+                self._unread_vars.append(name)
+        return subscription
+
+    @callback
+    def async_unsubscribe(self, subscription: CybroVarSubscription) -> None:
+        """Stop polling the vars of a released subscription.
+
+        Vars stay polled while another subscription holds them.
+        """
+        for name in subscription.names:
+            if (count := self._subscriptions.get(name, 0)) > 1:
+                self._subscriptions[name] = count - 1
+                continue
+            if self._subscriptions.pop(name, None) is None:
+                continue
+            self._poll_vars_changed = True
+            if name in self._unread_vars:
+                self._unread_vars.remove(name)
+
+    def _group_poll_vars(self, device: CybroDevice, force: bool = False) -> None:
+        """Sort the polled vars of this plc into their poll tiers."""
+        if not force and not self._poll_vars_changed:
+            return
+        tier_vars: dict[str, list[str]] = {}
+        for name in self._subscriptions:
+            tier = self._var_tiers.get(name, POLL_TIER_NORMAL)
+            tier_vars.setdefault(tier, []).append(name)
+        self._tier_vars = tier_vars
+        self._poll_vars_changed = False
+
+    def _tier_interval(self, tier: str) -> float | None:
+        """Return the scaled interval [s] of a poll tier, None if static."""
+        if (interval := POLL_TIER_INTERVALS[tier]) is None:
+            return None
+        return interval.total_seconds() * self.poll_scale
+
+    def _adapt_poll_scale(
+        self,
+        device: CybroDevice,
+        read_vars: list[str] | None,
+        stats: ScgiRequestStats,
+    ) -> None:
+        """Scale the poll tier intervals to the value changes and the load.
+
+        The polling speeds up while many of the read vars change and slows
+        down while they are idle. The fast tier is never polled faster than
+        multiples of the smoothed request latency and of the plc scan time.
+        """
+        scale = self.poll_scale
+        if read_vars:
+            changed = len(self.changed_vars) / len(read_vars)
+            self.volatility += POLL_SMOOTHING * (changed - self.volatility)
+            if self.volatility > POLL_VOLATILITY_HIGH:
+                scale *= POLL_SPEED_UP
+            elif self.volatility < POLL_VOLATILITY_LOW:
+                scale *= POLL_SLOW_DOWN
+        if stats.requests > 0:
+            self.latency += POLL_SMOOTHING * (stats.latency - self.latency)
+        # shortest fast tier interval [s], the scan time is in ms
+        fastest = POLL_LATENCY_MULTIPLE * self.latency
+        scan_time = getattr(device.vars.get(f"{self.unique_id}.scan_time"), "value", "")
+        try:
+            fastest = max(fastest, POLL_SCAN_TIME_MULTIPLE * float(scan_time) / 1000)
+        except (TypeError, ValueError):
+            pass
+        scale = max(scale, fastest / self._fast_interval)
+        min_scale, max_scale = self.poll_scale_bounds
+        self.poll_scale = min(max(scale, min_scale), max_scale)
+
+    def _next_update_interval(self) -> timedelta:
+        """Return the time until the next poll tier is due.
+
+        The pause after a refresh is at least as long as the refresh took.
+        """
+        now = monotonic()
+        next_due = min(
+            (
+                self._tier_read.get(tier, now) + interval
+                for tier in self._tier_vars
+                if (interval := self._tier_interval(tier)) is not None
+            ),
+            default=now,
+        )
+        return timedelta(
+            seconds=max(
+                next_due - now,
+                self._fast_interval * self.poll_scale,
+                now - self._refresh_start,
+            )
+        )
+
+    def _diff_vars(
+        self, device: CybroDevice, names: Iterable[str] | None = None
+    ) -> set[str]:
+        """Return all vars whose value changed since the last refresh.
+
+        If names is given, only these vars are compared.
+        """
+        snapshot = self._snapshot
+        deadbands = self._var_deadbands
+        changed: set[str] = set()
+        now = monotonic()
+        if names is None:
+            names = device.vars.keys()
+        for name in names:
+            if (var := device.vars.get(name)) is None:
+                continue
+            if snapshot.get(name) != var.value:
+                if (deadband := deadbands.get(name)) is not None:
+                    if now - self._published.get(
+                        name, 0.0
+                    ) < self._force_update_interval and self.values.within_deadband(
+                        name, var.value, *deadband
+                    ):
+                        continue
+                    self._published[name] = now
+                snapshot[name] = var.value
+                self.values.decode(name, var.value)
+                changed.add(name)
+        return changed
+
+    def register_value(
+        self, name: str, var_type: VarType = VarType.STR, fact: float = 1.0
+    ) -> int:
+        """Register a var in the value store and return its slot."""
+        slot = self.values.register(name, var_type, fact)
+        if (raw := self._snapshot.get(name)) is None and self.data is not None:
+            raw = getattr(self.data.vars.get(name), "value", None)
+        if raw is not None:
+            self.values.decode(name, raw)
+        return slot
+
+    def vars_changed(self, names: Iterable[str]) -> bool:
+        """Return True if any of the given vars changed on the last refresh."""
+        return not self.changed_vars.isdisjoint(names)
+
+    def count_state_write(self, written: bool) -> None:
+        """Count a written or skipped entity state write."""
+        if written:
+            self.state_writes += 1
+            self.refresh_state_writes += 1
+        else:
+            self.state_writes_skipped += 1
+
+    def _update_var_index(self, device: CybroDevice) -> bool:
+        """Rebuild the variable index if the plc var list has changed.
+
+        Returns True if the index was rebuilt.
+        """
+        plc_vars = device.plc_info.plc_vars
+        if plc_vars is self._indexed_vars:
+            return False
+        if (
+            self._indexed_vars is not None
+            and plc_vars.keys() == self._indexed_vars.keys()
+        ):
+            self._indexed_vars = plc_vars
+            return False
+        self.var_index = classify_plc_vars(
+            plc_vars, device.plc_info.nad, self.var_rules
+        )
+        self._update_var_tiers(device.plc_info.nad)
+        LOGGER.debug(
+            "Classified %s plc vars into %s categories",
+            len(plc_vars),
+            len(self.var_index),
+        )
+        self._indexed_vars = plc_vars
+        return True
+
+    def _update_var_tiers(self, nad: int) -> None:
+        """Assign the poll tier and deadband of all vars in the var index."""
+        self._var_tiers = {
+            name: tier
+            for category, tier in CATEGORY_POLL_TIERS.items()
+            for name in self.var_index.get(category, [])
+        }
+        for name in STATIC_PLC_VARS:
+            self._var_tiers[f"c{nad}.{name}"] = POLL_TIER_STATIC
+        self._var_deadbands = {
+            name: deadband
+            for category, deadband in self._category_deadbands.items()
+            for name in self.var_index.get(category, [])
+        }
+
+    def aggregation_window(self, category: str) -> float:
+        """Return the aggregation window [s] of a category, 0 if disabled."""
+        return self.options.get(f"{category}_{CONF_AGGREGATION_WINDOW}", 0)
+
+    def category_vars(self, category: str) -> list[str]:
+        """Return all plc var names of a category."""
+        return self.var_index.get(category, [])
@@ -0,0 +1,39 @@
+"""Diagnostics support for Cybro PLC."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import CybroDataUpdateCoordinator
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: CybroDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": dict(entry.data),
+        },
+        "state_writes": {
+            "total": coordinator.state_writes,
+            "skipped": coordinator.state_writes_skipped,
+            "last_refresh": coordinator.refresh_state_writes,
+            "last_refresh_changed_vars": len(coordinator.changed_vars),
+        },
+        "poll_metrics": coordinator.poll_metrics.as_dict(),
+        "circuit_breaker": {
+            "state": coordinator.poller.breaker.state,
+            "failures": coordinator.poller.breaker.failures,
+        },
+        "adaptive_polling": {
+            "scale": coordinator.poll_scale,
+            "volatility": coordinator.volatility,
+            "latency": coordinator.latency,
+        },
+    }
@@ -0,0 +1,221 @@
+"""Variable discovery for Cybro PLC."""
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from homeassistant.components.binary_sensor import BinarySensorDeviceClass
+from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.const import Platform
+
+from .const import VAR_CAT_DIAG_POWER_SUPPLY
+from .const import VAR_CAT_DIAG_PROBLEM
+from .const import VAR_CAT_DIAG_SCAN_FREQUENCY
+from .const import VAR_CAT_DIAG_SCAN_TIME
+from .const import VAR_CAT_DIAG_UPTIME
+from .const import VAR_CAT_HUMIDITY
+from .const import VAR_CAT_LIGHT
+from .const import VAR_CAT_POWER_METER_CURRENT
+from .const import VAR_CAT_POWER_METER_ENERGY
+from .const import VAR_CAT_POWER_METER_ENERGY_WH
+from .const import VAR_CAT_POWER_METER_POWER
+from .const import VAR_CAT_POWER_METER_VOLTAGE
+from .const import VAR_CAT_TEMPERATURE
+from .const import VAR_CAT_WEATHER_HUMIDITY
+from .const import VAR_CAT_WEATHER_STATION
+from .const import VAR_CAT_WEATHER_TEMPERATURE
+from .const import VAR_CAT_WEATHER_WIND_SPEED
+from .const import VAR_RULE_CATEGORIES
+
+WEATHER_STATION_VARS = (
+    "temperature",
+    "humidity",
+    "wind_speed",
+    "wind_direction",
+    "pressure",
+)
+# prefix of var rule patterns which are regular expressions instead of globs
+VAR_RULE_REGEX_PREFIX = "re:"
+VAR_RULE_DEVICE_CLASSES = {
+    Platform.SENSOR: SensorDeviceClass,
+    Platform.BINARY_SENSOR: BinarySensorDeviceClass,
+}
+
+
+class VarRule(NamedTuple):
+    """A user rule mapping matching plc vars to entities of a platform."""
+
+    pattern: str
+    platform: str
+    unit: str | None
+    device_class: str | None
+    scale: float
+
+
+def parse_var_rules(text: str) -> list[VarRule]:
+    """Parse the var rules option, one rule per line.
+
+    A rule is "pattern; platform; unit; device class; scale", all fields but
+    the pattern and the platform are optional, eg:
+    c*.boiler_temp_??; sensor; °C; temperature; 0.1
+    Patterns are globs with * and ? on the full var name, or regular
+    expressions if prefixed with "re:". Empty lines and lines starting with # are skipped.
+    Raises ValueError on an invalid rule or if the rules can not be combined
+    into a single matcher.
+    """
+    rules: list[VarRule] = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not (line := line.strip()) or line.startswith("#"):
+            continue
+        fields = [field.strip() for field in line.split(";")]
+        if len(fields) < 2 or len(fields) > 5 or not fields[0]:
+            raise ValueError(f"Rule {number} needs a pattern and a platform")
+        fields += [""] * (5 - len(fields))
+        pattern, platform, unit, device_class, scale = fields
+        if platform not in VAR_RULE_CATEGORIES:
+            raise ValueError(f"Rule {number} has an unsupported platform {platform}")
+        if device_class and device_class not in {
+            member.value for member in VAR_RULE_DEVICE_CLASSES.get(platform, ())
+        }:
+            raise ValueError(f"Rule {number} has an invalid device class")
+        try:
+            rules.append(
+                VarRule(
+                    pattern,
+                    platform,
+                    unit or None,
+                    device_class or None,
+                    float(scale) if scale else 1.0,
+                )
+            )
+            _rule_regex(rules[-1])
+        except (ValueError, re.error) as error:
+            raise ValueError(f"Rule {number} is invalid: {error}") from error
+    VarRuleMatcher(rules)
+    return rules
+
+
+def _rule_regex(rule: VarRule) -> str:
+    """Return the regular expression of a rule pattern, validated."""
+    if rule.pattern.startswith(VAR_RULE_REGEX_PREFIX):
+        regex = rule.pattern.removeprefix(VAR_RULE_REGEX_PREFIX)
+    else:
+        # fnmatch.translate adds lookaheads which slow down the matcher
+        regex = re.escape(rule.pattern).replace(r"\*", ".*").replace(r"\?", ".")
+    re.compile(regex)
+    return regex
+
+
+class VarRuleMatcher:
+    """Matches plc var names against all var rules at once.
+
+    The patterns are compiled into a single regular expression with a named
+    group per rule, so every name is matched once. The first matching rule
+    wins. Numbered back references and group names used by several rules
+    do not work within the combined expression.
+    """
+
+    def __init__(self, rules: list[VarRule]) -> None:
+        """Compile the rules, raise ValueError if they can not be combined."""
+        self.rules = rules
+        self._regex: re.Pattern[str] | None = None
+        if len(rules) == 0:
+            return
+        try:
+            self._regex = re.compile(
+                "|".join(
+                    f"(?P<_rule{index}>{_rule_regex(rule)})"
+                    for index, rule in enumerate(rules)
+                )
+            )
+        except re.error as error:
+            raise ValueError(f"The rules can not be combined: {error}") from error
+
+    def match(self, name: str) -> VarRule | None:
+        """Return the first rule matching a var name, None if none matches."""
+        if self._regex is None or (match := self._regex.fullmatch(name)) is None:
+            return None
+        # the group of a rule closes after all groups of its own pattern
+        return self.rules[int(match.lastgroup.removeprefix("_rule"))]
+
+
+def classify_plc_vars(
+    plc_vars: Iterable[str], nad: int, rules: VarRuleMatcher | None = None
+) -> dict[str, list[str]]:
+    """Sort all plc vars into categories with a single pass.
+
+    Returns a dict of category -> list of var names, eg:
+    {"light": ["c1000.lc00_qx00", "c1000.lc00_qx01"], ...}
+    The order of the var names follows the order of plc_vars. Vars matching
+    a var rule only go into the rule category of its platform.
+    """
+    index: dict[str, list[str]] = {}
+    var_prefix = f"c{nad}."
+    power_meter_prefix = f"{var_prefix}power_meter"
+    weather_prefix = f"{var_prefix}weather_"
+
+    diag_names = {
+        f"{var_prefix}scan_time": VAR_CAT_DIAG_SCAN_TIME,
+        f"{var_prefix}scan_time_max": VAR_CAT_DIAG_SCAN_TIME,
+        f"{var_prefix}cybro_uptime": VAR_CAT_DIAG_UPTIME,
+        f"{var_prefix}operating_hours": VAR_CAT_DIAG_UPTIME,
+        f"{var_prefix}scan_frequency": VAR_CAT_DIAG_SCAN_FREQUENCY,
+    }
+    problem_names = {f"{var_prefix}scan_overrun", f"{var_prefix}retentive_fail"}
+    energy_names = {f"{power_meter_prefix}_energy", f"{power_meter_prefix}_energy_real"}
+    weather_station_names = {f"{weather_prefix}{name}" for name in WEATHER_STATION_VARS}
+
+    def add(category: str, key: str) -> None:
+        index.setdefault(category, []).append(key)
+
+    for key in plc_vars:
+        if rules is not None and (rule := rules.match(key)) is not None:
+            add(VAR_RULE_CATEGORIES[rule.platform], key)
+            continue
+
+        if var_prefix in key:
+            # plc diagnostic vars
+            if (category := diag_names.get(key)) is not None:
+                add(category, key)
+            elif "iex_power_supply" in key or "cybro_power_supply" in key:
+                add(VAR_CAT_DIAG_POWER_SUPPLY, key)
+            if key in problem_names or "general_error" in key:
+                add(VAR_CAT_DIAG_PROBLEM, key)
+
+            # power meter vars
+            if power_meter_prefix in key:
+                if "_power" in key:
+                    add(VAR_CAT_POWER_METER_POWER, key)
+                elif "_voltage" in key:
+                    add(VAR_CAT_POWER_METER_VOLTAGE, key)
+                elif "_current" in key:
+                    add(VAR_CAT_POWER_METER_CURRENT, key)
+                elif key in energy_names:
+                    add(VAR_CAT_POWER_METER_ENERGY, key)
+                elif f"{power_meter_prefix}_energy_watthours" in key:
+                    add(VAR_CAT_POWER_METER_ENERGY_WH, key)
+
+            # weather station vars
+            if weather_prefix in key:
+                if "_temperature" in key:
+                    add(VAR_CAT_WEATHER_TEMPERATURE, key)
+                elif "_humidity" in key:
+                    add(VAR_CAT_WEATHER_HUMIDITY, key)
+                elif "_wind_speed" in key:
+                    add(VAR_CAT_WEATHER_WIND_SPEED, key)
+                if key in weather_station_names:
+                    add(VAR_CAT_WEATHER_STATION, key)
+
+        # simple temperature objects
+        if ".th" in key or ".op" in key or ".ts" in key or ".fc" in key:
+            if "_temperature" in key:
+                add(VAR_CAT_TEMPERATURE, key)
+            elif "_humidity" in key:
+                add(VAR_CAT_HUMIDITY, key)
+
+        # simple light objects
+        if ".lc" in key and "_qx" in key:
+            add(VAR_CAT_LIGHT, key)
+
+    return index
@@ -1,14 +1,18 @@
 """Support for cybro lights."""
 from __future__ import annotations
 
+import re
 from typing import Any
 
 from homeassistant.components.light import LightEntity
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
+from homeassistant.core import callback
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from sqlalchemy import false
 
 from .const import AREA_LIGHTS
 from .const import ATTR_DESCRIPTION
@@ -16,10 +20,19 @@ from .const import DEVICE_DESCRIPTION
 from .const import DOMAIN
 from .const import MANUFACTURER
 from .const import MANUFACTURER_URL
+from .const import VAR_CAT_LIGHT
+from .const import VAR_CAT_RULE_LIGHT
 from .coordinator import CybroDataUpdateCoordinator
+from .models import async_enabled_vars
 from .models import CybroEntity
+from .models import rule_device_info
+from cybro import VarType
 
-PARALLEL_UPDATES = 1
+# writes are coalesced by the coordinator write queue
+PARALLEL_UPDATES = 0
+
+# the light controller of a light channel var, eg c1000.lc00 of c1000.lc00_qx00
+LIGHT_CONTROLLER_RE = re.compile(r"^(c\d+\.lc\d+)_qx")
 
 
 async def async_setup_entry(
@@ -31,7 +44,13 @@ async def async_setup_entry(
     coordinator: CybroDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
     # var_prefix = f"c{coordinator.cybro.nad}."
     lights = find_on_off_lights(coordinator)
+    if lights is not None:
+        async_migrate_light_devices(hass, entry, lights)
 
+    # read all registered vars once, so entities start with a value
+    await coordinator.async_warm_read(
+        async_enabled_vars(hass, Platform.LIGHT, lights or [])
+    )
     if lights is not None:
         async_add_entities(lights)
 
@@ -39,29 +58,90 @@ async def async_setup_entry(
 def find_on_off_lights(
     coordinator: CybroDataUpdateCoordinator,
 ) -> list[CybroUpdateLight] | None:
-    """Find simple light objects in the plc vars.
+    """Find simple light objects and lights of the var rules in the plc vars.
     eg: c1000.lc00_qx00 and so on
     """
     res: list[CybroUpdateLight] = []
-    for key in coordinator.data.plc_info.plc_vars:
-        if key.find(".lc") != -1 and key.find("_qx") != -1:
-            dev_info = DeviceInfo(
-                # entry_type=DeviceEntryType.SERVICE,
-                identifiers={(DOMAIN, key)},
-                manufacturer=MANUFACTURER,
-                # name=f"Light {key}",
-                default_name=f"Light {key}",
-                suggested_area=AREA_LIGHTS,
-                model=f"{DEVICE_DESCRIPTION} Light Channel",
-                configuration_url=MANUFACTURER_URL,
-            )
-            res.append(CybroUpdateLight(coordinator, key, dev_info=dev_info))
+    var_prefix = f"c{coordinator.cybro.nad}."
+    devices: dict[str, DeviceInfo] = {}
+    rule_keys = coordinator.category_vars(VAR_CAT_RULE_LIGHT)
+    rule_lights = set(rule_keys)
+    keys = coordinator.category_vars(VAR_CAT_LIGHT) + rule_keys
+    for key in keys:
+        # all channels of a light controller share a device, the other
+        # lights of the var rules go to the rule device and the rest to a
+        # light device of the plc
+        match = LIGHT_CONTROLLER_RE.match(key)
+        if match:
+            controller = match[1]
+        elif key in rule_lights:
+            controller = f"{var_prefix}rules"
+        else:
+            controller = f"{var_prefix}lights"
+        if (dev_info := devices.get(controller)) is None:
+            if match:
+                dev_info = DeviceInfo(
+                    identifiers={(DOMAIN, controller)},
+                    manufacturer=MANUFACTURER,
+                    default_name=f"Light controller {controller}",
+                    suggested_area=AREA_LIGHTS,
+                    model=f"{DEVICE_DESCRIPTION} Light Controller",
+                    configuration_url=MANUFACTURER_URL,
+                    via_device=(DOMAIN, var_prefix),
+                )
+            elif key in rule_lights:
+                dev_info = rule_device_info(coordinator)
+            else:
+                dev_info = DeviceInfo(
+                    identifiers={(DOMAIN, controller)},
+                    manufacturer=MANUFACTURER,
+                    default_name=f"c{coordinator.cybro.nad} lights",
+                    suggested_area=AREA_LIGHTS,
+                    model=DEVICE_DESCRIPTION,
+                    configuration_url=MANUFACTURER_URL,
+                    via_device=(DOMAIN, var_prefix),
+                )
+            devices[controller] = dev_info
+        res.append(CybroUpdateLight(coordinator, key, dev_info=dev_info))
 
     if len(res) > 0:
         return res
     return None
 
 
+@callback
+def async_migrate_light_devices(
+    hass: HomeAssistant, entry: ConfigEntry, lights: list[CybroUpdateLight]
+) -> None:
+    """Move the lights of the former per channel devices to their controller.
+
+    The device area is kept as entity area, the empty devices are removed.
+    """
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+    light_devices = {light.unique_id: light.device_info for light in lights}
+    for device in dr.async_entries_for_config_entry(device_registry, entry.entry_id):
+        channels = [
+            identifier
+            for domain, identifier in device.identifiers
+            if domain == DOMAIN and identifier in light_devices
+        ]
+        if len(channels) == 0:
+            continue
+        group = device_registry.async_get_or_create(
+            config_entry_id=entry.entry_id, **light_devices[channels[0]]
+        )
+        for entity in er.async_entries_for_device(
+            entity_registry, device.id, include_disabled_entities=True
+        ):
+            entity_registry.async_update_entity(
+                entity.entity_id,
+                device_id=group.id,
+                area_id=entity.area_id or device.area_id,
+            )
+        device_registry.async_remove_device(device.id)
+
+
 class CybroUpdateLight(CybroEntity, LightEntity):
     """Defines a Simple Cybro light."""
 
@@ -80,7 +160,7 @@ class CybroUpdateLight(CybroEntity, LightEntity):
         self._attr_name = f"Light {var_name}"
         self._attr_icon = attr_icon
         self._attr_device_info = dev_info
-        coordinator.data.add_var(self._attr_unique_id, var_type=0)
+        self._slot = coordinator.register_value(var_name, VarType.BOOL)
 
     @property
     def device_info(self):
@@ -98,33 +178,28 @@ class CybroUpdateLight(CybroEntity, LightEntity):
     @property
     def is_on(self) -> bool:
         """Return the state of the light."""
-        res = self.coordinator.data.vars.get(self._attr_unique_id, None)
-        if res is None:
-            return false
-        return bool(res.value == "1")
+        return self.coordinator.values.get(self._slot) is True
 
     @property
     def available(self) -> bool:
         """Return if this light is available or not."""
-        res = self.coordinator.data.vars.get(self._attr_unique_id, None)
-        if res is None:
-            return false
-        return res.value != "?"
+        return self.coordinator.values.get(self._slot) is not None
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn off the light."""
-
-        await self.coordinator.cybro.write_var(self.unique_id, "0")
+        await self.coordinator.async_write_var(self.unique_id, "0")
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn on the light."""
-        await self.coordinator.cybro.write_var(self.unique_id, "1")
+        await self.coordinator.async_write_var(self.unique_id, "1")
 
     @property
     def extra_state_attributes(self):
         """Return the state attributes."""
+        try:
+            desc = self.coordinator.data.vars[self._attr_unique_id].description
+        except KeyError:
+            desc = self._attr_name
         return {
-            ATTR_DESCRIPTION: self.coordinator.data.vars[
-                self._attr_unique_id
-            ].description,
+            ATTR_DESCRIPTION: desc,
         }
@@ -0,0 +1,65 @@
+"""Poll cycle metrics of the Cybro coordinator."""
+from __future__ import annotations
+
+import math
+from collections import deque
+
+from .const import POLL_METRIC_DISPATCH_TIME
+from .const import POLL_METRIC_PARSE_TIME
+from .const import POLL_METRIC_REQUEST_LATENCY
+from .const import POLL_METRIC_RESPONSE_BYTES
+from .const import POLL_METRIC_VARS
+from .const import POLL_METRICS
+from .const import POLL_METRICS_WINDOW
+from .scgi import ScgiRequestStats
+
+
+def percentile(ordered: list[float], percent: int) -> float:
+    """Return the nearest rank percentile of a sorted list."""
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class CybroPollMetrics:
+    """Phase timings and sizes of the last refreshes.
+
+    The values of the last refresh feed the diagnostic sensors, the last
+    POLL_METRICS_WINDOW values of every metric give the percentiles.
+    Times are in milliseconds.
+    """
+
+    def __init__(self, window: int = POLL_METRICS_WINDOW) -> None:
+        """Initialize the metrics."""
+        self.last: dict[str, float] = {}
+        self._history: dict[str, deque[float]] = {
+            metric: deque(maxlen=window) for metric in POLL_METRICS
+        }
+
+    def record(self, metric: str, value: float) -> None:
+        """Record a value of a metric."""
+        self.last[metric] = value
+        self._history[metric].append(value)
+
+    def record_requests(self, stats: ScgiRequestStats) -> None:
+        """Record the scgi requests of a refresh."""
+        self.record(POLL_METRIC_REQUEST_LATENCY, round(stats.latency * 1000, 2))
+        self.record(POLL_METRIC_RESPONSE_BYTES, stats.response_bytes)
+        self.record(POLL_METRIC_PARSE_TIME, round(stats.parse_time * 1000, 2))
+        self.record(POLL_METRIC_VARS, stats.vars)
+
+    def record_dispatch(self, seconds: float) -> None:
+        """Record the time the listeners took to handle an update."""
+        self.record(POLL_METRIC_DISPATCH_TIME, round(seconds * 1000, 2))
+
+    def as_dict(self) -> dict[str, dict[str, float | int | None]]:
+        """Return the last value, p50 and p95 of every metric."""
+        result: dict[str, dict[str, float | int | None]] = {}
+        for metric, values in self._history.items():
+            ordered = sorted(values)
+            result[metric] = {
+                "last": self.last.get(metric),
+                "p50": percentile(ordered, 50) if ordered else None,
+                "p95": percentile(ordered, 95) if ordered else None,
+                "samples": len(ordered),
+            }
+        return result
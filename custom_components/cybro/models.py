@@ -1,22 +1,113 @@
 """Models for Cybro."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+
 from homeassistant.const import ATTR_CONFIGURATION_URL
 from homeassistant.const import ATTR_IDENTIFIERS
 from homeassistant.const import ATTR_MANUFACTURER
 from homeassistant.const import ATTR_MODEL
 from homeassistant.const import ATTR_NAME
 from homeassistant.const import ATTR_SW_VERSION
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .const import AREA_SYSTEM
 from .const import DEVICE_DESCRIPTION
+from .const import DOMAIN
 from .const import MANUFACTURER
 from .const import MANUFACTURER_URL
 from .coordinator import CybroDataUpdateCoordinator
+from .coordinator import CybroVarSubscription
+
+
+def plc_device_info(coordinator: CybroDataUpdateCoordinator) -> DeviceInfo:
+    """Return the diagnostics device of a plc, the parent of its other devices."""
+    return DeviceInfo(
+        identifiers={(DOMAIN, f"c{coordinator.cybro.nad}.")},
+        manufacturer=MANUFACTURER,
+        default_name=f"c{coordinator.cybro.nad} diagnostics",
+        suggested_area=AREA_SYSTEM,
+        model=DEVICE_DESCRIPTION,
+        configuration_url=MANUFACTURER_URL,
+    )
+
+
+def rule_device_info(coordinator: CybroDataUpdateCoordinator) -> DeviceInfo:
+    """Return the device of the entities of the user var rules.
+
+    The rules map arbitrary vars, so the device suggests no area.
+    """
+    return DeviceInfo(
+        identifiers={(DOMAIN, f"c{coordinator.cybro.nad}.rules")},
+        manufacturer=MANUFACTURER,
+        default_name=f"c{coordinator.cybro.nad} var rules",
+        model=DEVICE_DESCRIPTION,
+        configuration_url=MANUFACTURER_URL,
+        via_device=(DOMAIN, f"c{coordinator.cybro.nad}."),
+    )
+
+
+@callback
+def async_enabled_vars(
+    hass: HomeAssistant, domain: str, entities: Iterable[CybroEntity]
+) -> list[str]:
+    """Return the plc vars of the entities which will be added enabled."""
+    registry = er.async_get(hass)
+    names: list[str] = []
+    for entity in entities:
+        entity_id = registry.async_get_entity_id(domain, DOMAIN, entity.unique_id)
+        if entity_id is None:
+            enabled = entity.entity_registry_enabled_default
+        else:
+            enabled = not registry.async_get(entity_id).disabled
+        if enabled:
+            names.extend(entity.cybro_vars)
+    return names
 
 
 class CybroEntity(CoordinatorEntity):
-    """Defines a base Cybro entity."""
+    """Defines a base Cybro entity.
+
+    The plc vars of an entity are polled while it is added and enabled.
+    """
 
     coordinator: CybroDataUpdateCoordinator
+    _last_available: bool | None = None
+    _subscription: CybroVarSubscription | None = None
+
+    @property
+    def cybro_vars(self) -> tuple[str, ...]:
+        """Return all plc vars the state of this entity depends on."""
+        return (self._attr_unique_id,)
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the plc vars of this entity."""
+        await super().async_added_to_hass()
+        self._subscription = self.coordinator.async_subscribe(self.cybro_vars)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Release the subscription to the plc vars of this entity."""
+        await super().async_will_remove_from_hass()
+        if self._subscription is not None:
+            self._subscription.release()
+            self._subscription = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if a bound var or the availability changed."""
+        available = self.available
+        if available == self._last_available and not self.coordinator.vars_changed(
+            self.cybro_vars
+        ):
+            self.coordinator.count_state_write(False)
+            return
+        self._last_available = available
+        self.coordinator.count_state_write(True)
+        self.async_write_ha_state()
 
     @property
     def device_info(self):
@@ -0,0 +1,169 @@
+"""Shared poller for all Cybro PLCs behind the same scgi server."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .breaker import CybroCircuitBreaker
+from .const import DATA_HOST_POLLERS
+from .const import LOGGER
+from .const import POLLER_GATHER_DELAY
+from .scgi import CybroScgiClient
+from .scgi import response_vars
+from .scgi import ScgiRequestStats
+from cybro import Cybro
+from cybro import CybroError
+
+
+@callback
+def async_get_host_poller(hass: HomeAssistant, host: str, port: int) -> CybroHostPoller:
+    """Return the poller of a scgi server, create it if needed."""
+    pollers: dict[tuple[str, int], CybroHostPoller] = hass.data.setdefault(
+        DATA_HOST_POLLERS, {}
+    )
+    if (poller := pollers.get((host, port))) is None:
+        poller = pollers[(host, port)] = CybroHostPoller(hass, host, port)
+    return poller
+
+
+class CybroHostPoller:
+    """Reads the vars of all plcs of a scgi server with a single request.
+
+    Reads of all registered coordinators arriving within POLLER_GATHER_DELAY
+    are merged into one request, the response is split per caller. All
+    requests pass the circuit breaker of the server.
+    """
+
+    def __init__(self, hass: HomeAssistant, host: str, port: int) -> None:
+        """Initialize the host poller."""
+        self.hass = hass
+        self.host = host
+        self.port = port
+        self.client = CybroScgiClient(
+            Cybro(host, port, session=async_get_clientsession(hass))
+        )
+        self.breaker = CybroCircuitBreaker(
+            f"{host}:{port}", self.client.async_probe, self._async_breaker_closed
+        )
+        self.coordinators: set[Any] = set()
+        self._pending: dict[str, str] = {}
+        self._waiters: list[
+            tuple[list[str], asyncio.Future, ScgiRequestStats | None]
+        ] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    @callback
+    def async_register(self, coordinator: Any) -> None:
+        """Register a coordinator polling through this poller."""
+        self.coordinators.add(coordinator)
+        self._update_max_concurrent()
+
+    @callback
+    def async_unregister(self, coordinator: Any) -> None:
+        """Unregister a coordinator, remove the poller if it was the last one."""
+        self.coordinators.discard(coordinator)
+        if len(self.coordinators) > 0:
+            self._update_max_concurrent()
+            return
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self.breaker.stop()
+        self.hass.data[DATA_HOST_POLLERS].pop((self.host, self.port), None)
+
+    def _update_max_concurrent(self) -> None:
+        """Apply the smallest request limit of all registered coordinators."""
+        self.client.set_max_concurrent(
+            min(
+                coordinator.max_concurrent_requests for coordinator in self.coordinators
+            )
+        )
+
+    @callback
+    def _async_breaker_closed(self) -> None:
+        """Refresh all plcs as soon as the server is reachable again."""
+        for coordinator in self.coordinators:
+            self.hass.async_create_task(coordinator.async_request_refresh())
+
+    async def async_request(
+        self, data: dict[str, str], stats: ScgiRequestStats | None = None
+    ) -> dict[str, Any] | None:
+        """Send a request unless the circuit breaker of the server is open."""
+        await self.breaker.async_check()
+        try:
+            result = await self.client.request(data, stats)
+        except CybroError:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def async_read(
+        self, names: list[str], stats: ScgiRequestStats | None = None
+    ) -> list[dict[str, Any]]:
+        """Read a list of vars together with the reads of other plcs.
+
+        Returns the var items of the requested vars, the shared request is
+        added to stats.
+        """
+        future: asyncio.Future = self.hass.loop.create_future()
+        self._pending.update(dict.fromkeys(names, ""))
+        self._waiters.append((names, future, stats))
+        if len(self._waiters) >= len(self.coordinators):
+            # all plcs are waiting, no need to wait for more reads
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._schedule_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_later(
+                POLLER_GATHER_DELAY, self._schedule_flush
+            )
+        return await future
+
+    def _schedule_flush(self) -> None:
+        """Start sending the pending reads."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        waiters, self._waiters = self._waiters, []
+        self.hass.async_create_task(self._async_flush(pending, waiters))
+
+    async def _async_flush(
+        self,
+        pending: dict[str, str],
+        waiters: list[tuple[list[str], asyncio.Future, ScgiRequestStats | None]],
+    ) -> None:
+        """Send all pending reads and split the response per caller."""
+        LOGGER.debug(
+            "Reading %s vars of %s callers from %s:%s",
+            len(pending),
+            len(waiters),
+            self.host,
+            self.port,
+        )
+        stats = ScgiRequestStats()
+        try:
+            items = response_vars(await self.async_request(pending, stats))
+            results = {item["name"]: item for item in items}
+            for names, future, waiter_stats in waiters:
+                if future.done():
+                    continue
+                waiter_items = [results[name] for name in names if name in results]
+                if waiter_stats is not None:
+                    waiter_stats.add(stats, len(waiter_items))
+                future.set_result(waiter_items)
+        except Exception as error:
+            # any error of the shared request fails the reads of all callers
+            for _, future, _ in waiters:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            # a cancelled flush must not leave the callers waiting
+            for _, future, _ in waiters:
+                if not future.done():
+                    future.set_exception(
+                        CybroError(f"Read from {self.host}:{self.port} was cancelled")
+                    )
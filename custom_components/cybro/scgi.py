@@ -0,0 +1,285 @@
+"""Helpers for Cybro scgi server requests."""
+from __future__ import annotations
+
+import asyncio
+import random
+import socket
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any
+from urllib.parse import quote
+from xml.parsers import expat
+
+import aiohttp
+import async_timeout
+from yarl import URL
+
+from .const import DEFAULT_MAX_CONCURRENT_REQUESTS
+from .const import SCGI_MAX_URL_LENGTH
+from .const import SCGI_READ_CHUNK_SIZE
+from .const import SCGI_REQUEST_TRIES
+from cybro import Cybro
+from cybro import CybroConnectionError
+from cybro import CybroConnectionTimeoutError
+from cybro import CybroError
+
+PLC_INFO_VARS = (
+    "sys.ip_port",
+    "sys.timestamp",
+    "sys.plc_program_status",
+    "sys.response_time",
+    "sys.bytes_transferred",
+    "sys.comm_error_count",
+    "sys.alc_file",
+)
+# small server var read to probe an unreachable scgi server
+PROBE_VAR = "sys.server_uptime"
+
+
+def response_vars(data: dict[str, Any] | None) -> list[dict[str, Any]]:
+    """Return all var items of a parsed scgi server response.
+
+    A single var is not returned as list by the scgi server,
+    an empty response returns an empty list.
+    """
+    if not data or (items := data.get("var")) is None:
+        return []
+    if isinstance(items, dict):
+        return [items]
+    return items
+
+
+def full_update_vars(nad: int) -> dict[str, str]:
+    """Return the server and plc info vars read on a full update."""
+    names = [
+        "sys.scgi_port_status",
+        "sys.server_uptime",
+        "sys.scgi_request_pending",
+        "sys.scgi_request_count",
+        "sys.push_port_status",
+        "sys.push_count",
+        "sys.push_ack_errors",
+        "sys.push_list_count",
+        "sys.cache_request",
+        "sys.cache_valid",
+        "sys.server_version",
+        "sys.udp_rx_count",
+        "sys.udp_tx_count",
+        "sys.datalogger_status",
+    ]
+    for name in PLC_INFO_VARS:
+        names.append(f"c{nad}.{name}")
+    return dict.fromkeys(names, "")
+
+
+@dataclass
+class ScgiRequestStats:
+    """Number, duration and size of scgi requests."""
+
+    requests: int = 0
+    vars: int = 0
+    # seconds waiting for the scgi server, without the parse time
+    latency: float = 0.0
+    response_bytes: int = 0
+    # seconds spent parsing the response xml
+    parse_time: float = 0.0
+
+    def add(self, other: ScgiRequestStats, plc_vars: int | None = None) -> None:
+        """Add the stats of other requests, optionally with another var count."""
+        self.requests += other.requests
+        self.vars += other.vars if plc_vars is None else plc_vars
+        self.latency += other.latency
+        self.response_bytes += other.response_bytes
+        self.parse_time += other.parse_time
+
+
+def split_query(data: dict[str, str], max_length: int) -> list[dict[str, str]]:
+    """Split the vars of a request into chunks with a bounded query length."""
+    chunks: list[dict[str, str]] = [{}]
+    length = 0
+    for name, value in data.items():
+        # "&name" or "&name=value" with url quoting
+        var_length = len(quote(name)) + 1
+        if value != "":
+            var_length += len(quote(str(value))) + 1
+        if length + var_length > max_length and chunks[-1]:
+            chunks.append({})
+            length = 0
+        chunks[-1][name] = value
+        length += var_length
+    return chunks
+
+
+class CybroScgiClient:
+    """Sends scgi requests like Cybro.request and measures them.
+
+    Requests with a long url are split into chunks, sent concurrently up
+    to a limit and merged into one response. Responses are parsed while
+    they arrive, the network round trip and the xml parsing are timed
+    separately.
+    """
+
+    def __init__(
+        self,
+        cybro: Cybro,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        max_url_length: int = SCGI_MAX_URL_LENGTH,
+    ) -> None:
+        """Initialize the client with the connection settings of cybro."""
+        self.host = cybro.host
+        self.port = cybro.port
+        self.session = cybro.session
+        self.request_timeout = cybro.request_timeout
+        self._url = URL.build(
+            scheme="http", host=cybro.host, port=cybro.port, path=cybro.path
+        )
+        self.max_query_length = max_url_length - len(str(self._url)) - 1
+        self.max_concurrent = max_concurrent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    def set_max_concurrent(self, max_concurrent: int) -> None:
+        """Change the number of requests sent at once, for new requests."""
+        if max_concurrent != self.max_concurrent:
+            self.max_concurrent = max_concurrent
+            self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def request(
+        self, data: dict[str, str], stats: ScgiRequestStats | None = None
+    ) -> dict[str, Any] | None:
+        """Send a request, return the parsed data of the response.
+
+        The vars of all chunks are merged, stats get the wall time of all
+        chunks as latency.
+        """
+        chunks = split_query(data, self.max_query_length)
+        if len(chunks) == 1:
+            return await self._async_request_retried(data, stats)
+
+        chunk_stats = ScgiRequestStats()
+        start = monotonic()
+        results = await asyncio.gather(
+            *(self._async_request_retried(chunk, chunk_stats) for chunk in chunks)
+        )
+        if stats is not None:
+            chunk_stats.latency = monotonic() - start - chunk_stats.parse_time
+            stats.add(chunk_stats)
+        items = [item for result in results for item in response_vars(result)]
+        return {"var": items} if items else None
+
+    async def async_probe(self) -> None:
+        """Read a single server var without retries, raise CybroError on failure."""
+        async with self._semaphore:
+            await self._async_request({PROBE_VAR: ""}, None)
+
+    async def _async_request_retried(
+        self, data: dict[str, str], stats: ScgiRequestStats | None
+    ) -> dict[str, Any] | None:
+        """Send a single request, retry it with a random exponential delay."""
+        for attempt in range(SCGI_REQUEST_TRIES):
+            try:
+                async with self._semaphore:
+                    return await self._async_request(data, stats)
+            except CybroError:
+                if attempt == SCGI_REQUEST_TRIES - 1:
+                    raise
+                await asyncio.sleep(random.uniform(0, 2**attempt))
+        return None
+
+    async def _async_request(
+        self, data: dict[str, str], stats: ScgiRequestStats | None
+    ) -> dict[str, Any] | None:
+        """Send a single request, parse the response while it arrives."""
+        # reads are sent as names without "="
+        url = str(self._url.with_query(data)).replace("=&", "&").removesuffix("=")
+        parser = ScgiResponseParser()
+        size = 0
+        parse_time = 0.0
+        start = monotonic()
+        try:
+            async with async_timeout.timeout(self.request_timeout):
+                response = await self.session.get(
+                    url,
+                    allow_redirects=False,
+                    headers={"Accept": "text/plain, */*"},
+                )
+                if response.status // 100 in (4, 5):
+                    body = await response.read()
+                    raise CybroError(
+                        response.status, {"message": body.decode("utf8", "replace")}
+                    )
+                async for chunk in response.content.iter_chunked(SCGI_READ_CHUNK_SIZE):
+                    size += len(chunk)
+                    parse_start = monotonic()
+                    parser.feed(chunk)
+                    parse_time += monotonic() - parse_start
+        except asyncio.TimeoutError as error:
+            raise CybroConnectionTimeoutError(
+                f"Timeout occurred while connecting to server at {self.host}:{self.port}"
+            ) from error
+        except (aiohttp.ClientError, socket.gaierror) as error:
+            raise CybroConnectionError(
+                f"Error occurred while communicating with server at {self.host}:{self.port}"
+            ) from error
+        received = monotonic()
+        parser.feed(b"", final=True)
+        parse_time += monotonic() - received
+
+        if stats is not None:
+            stats.requests += 1
+            stats.vars += len(parser.items)
+            stats.latency += received - start - parse_time
+            stats.response_bytes += size
+            stats.parse_time += parse_time
+        return {"var": parser.items} if parser.items else None
+
+
+class ScgiResponseParser:
+    """Streaming parser of scgi server responses.
+
+    The response xml is parsed with expat while it arrives, every <var>
+    element becomes a flat item dict with its name, value and description.
+    Like xmltodict, values are stripped and empty values are None.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser."""
+        self.items: list[dict[str, str | None]] = []
+        self._item: dict[str, str | None] | None = None
+        self._field: str | None = None
+        self._text: list[str] = []
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+        self._parser.CharacterDataHandler = self._character_data
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        """Parse the next chunk of the response."""
+        try:
+            self._parser.Parse(data, final)
+        except expat.ExpatError as error:
+            raise CybroError(f"Invalid response from scgi server: {error}") from error
+
+    def _start_element(self, tag: str, attrs: dict[str, str]) -> None:
+        """Start a var item or one of its fields."""
+        if tag == "var":
+            self._item = {}
+        elif self._item is not None:
+            self._field = tag
+            self._text = []
+
+    def _end_element(self, tag: str) -> None:
+        """Finish a var item or one of its fields."""
+        if self._item is None:
+            return
+        if tag == "var":
+            self.items.append(self._item)
+            self._item = None
+        elif tag == self._field:
+            self._item[tag] = "".join(self._text).strip() or None
+            self._field = None
+
+    def _character_data(self, text: str) -> None:
+        """Collect the text of a field."""
+        if self._field is not None:
+            self._text.append(text)
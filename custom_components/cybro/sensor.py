@@ -1,40 +1,74 @@
 """Support for Cybro sensors."""
 from __future__ import annotations
 
+import math
 from datetime import datetime
+from time import monotonic
 
 from homeassistant.components.sensor import SensorDeviceClass
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.components.sensor import STATE_CLASS_TOTAL_INCREASING
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import DATA_BYTES
 from homeassistant.const import ELECTRIC_CURRENT_MILLIAMPERE
 from homeassistant.const import ELECTRIC_POTENTIAL_VOLT
 from homeassistant.const import ENERGY_KILO_WATT_HOUR
 from homeassistant.const import ENERGY_WATT_HOUR
 from homeassistant.const import FREQUENCY_HERTZ
 from homeassistant.const import PERCENTAGE
+from homeassistant.const import Platform
 from homeassistant.const import POWER_WATT
 from homeassistant.const import SPEED_KILOMETERS_PER_HOUR
 from homeassistant.const import TEMP_CELSIUS
 from homeassistant.const import TIME_MILLISECONDS
 from homeassistant.const import TIME_MINUTES
+from homeassistant.core import callback
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
 
+from .aggregation import CybroSampleWindow
+from .aggregation import WindowSummary
 from .const import AREA_ENERGY
-from .const import AREA_SYSTEM
 from .const import AREA_WEATHER
 from .const import ATTR_DESCRIPTION
+from .const import ATTR_MAX
+from .const import ATTR_MIN
+from .const import ATTR_SAMPLES
 from .const import DEVICE_DESCRIPTION
 from .const import DOMAIN
 from .const import LOGGER
 from .const import MANUFACTURER
 from .const import MANUFACTURER_URL
+from .const import POLL_METRIC_DISPATCH_TIME
+from .const import POLL_METRIC_PARSE_TIME
+from .const import POLL_METRIC_REQUEST_LATENCY
+from .const import POLL_METRIC_RESPONSE_BYTES
+from .const import POLL_METRIC_VARS
+from .const import POLL_TIER_FAST
+from .const import POLL_TIER_INTERVALS
+from .const import VAR_CAT_DIAG_POWER_SUPPLY
+from .const import VAR_CAT_DIAG_SCAN_FREQUENCY
+from .const import VAR_CAT_DIAG_SCAN_TIME
+from .const import VAR_CAT_DIAG_UPTIME
+from .const import VAR_CAT_HUMIDITY
+from .const import VAR_CAT_POWER_METER_CURRENT
+from .const import VAR_CAT_POWER_METER_ENERGY
+from .const import VAR_CAT_POWER_METER_ENERGY_WH
+from .const import VAR_CAT_POWER_METER_POWER
+from .const import VAR_CAT_POWER_METER_VOLTAGE
+from .const import VAR_CAT_RULE_SENSOR
+from .const import VAR_CAT_TEMPERATURE
+from .const import VAR_CAT_WEATHER_HUMIDITY
+from .const import VAR_CAT_WEATHER_TEMPERATURE
+from .const import VAR_CAT_WEATHER_WIND_SPEED
 from .coordinator import CybroDataUpdateCoordinator
+from .models import async_enabled_vars
 from .models import CybroEntity
+from .models import plc_device_info
+from .models import rule_device_info
 from cybro import VarType
 
 
@@ -45,41 +79,46 @@ async def async_setup_entry(
 ) -> None:
     """Set up Cybro sensor based on a config entry."""
     coordinator: CybroDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    entities: list[SensorEntity] = []
 
     sys_tags = add_system_tags(coordinator)
     if sys_tags is not None:
-        async_add_entities(sys_tags)
+        entities.extend(sys_tags)
 
     temps = find_temperatures(coordinator)
     if temps is not None:
-        async_add_entities(temps)
+        entities.extend(temps)
 
     # weather = find_weather(coordinator)
     # if weather is not None:
-    #    async_add_entities(weather)
+    #    entities.extend(weather)
 
     power_meter = find_power_meter(coordinator)
     if power_meter is not None:
-        async_add_entities(power_meter)
+        entities.extend(power_meter)
+
+    rule_sensors = find_rule_sensors(coordinator)
+    if rule_sensors is not None:
+        entities.extend(rule_sensors)
+
+    # read all registered vars once, so entities start with a value
+    await coordinator.async_warm_read(
+        async_enabled_vars(hass, Platform.SENSOR, entities)
+    )
+    if len(entities) > 0:
+        async_add_entities(entities)
 
 
 def add_system_tags(
     coordinator: CybroDataUpdateCoordinator,
-) -> list[CybroSensorEntity] | None:
+) -> list[SensorEntity] | None:
     """Find system tags in the plc vars.
     eg: c1000.scan_time and so on
     """
-    res: list[CybroSensorEntity] = []
+    res: list[SensorEntity] = []
     var_prefix = f"c{coordinator.cybro.nad}."
+    dev_info = plc_device_info(coordinator)
 
-    dev_info = DeviceInfo(
-        identifiers={(DOMAIN, var_prefix)},
-        manufacturer=MANUFACTURER,
-        default_name=f"c{coordinator.cybro.nad} diagnostics",
-        suggested_area=AREA_SYSTEM,
-        model=DEVICE_DESCRIPTION,
-        configuration_url=MANUFACTURER_URL,
-    )
     # add system vars
     res.append(
         CybroSensorEntity(
@@ -94,68 +133,72 @@ def add_system_tags(
             dev_info,
         )
     )
-    # find different plc diagnostic vars
-    for key in coordinator.data.plc_info.plc_vars:
-        if key.find(var_prefix) != -1:
-            if key in (f"{var_prefix}scan_time", f"{var_prefix}scan_time_max"):
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        TIME_MILLISECONDS,
-                        VarType.INT,
-                        EntityCategory.DIAGNOSTIC,
-                        None,
-                        1.0,
-                        dev_info,
-                    )
-                )
-            elif key in (f"{var_prefix}cybro_uptime", f"{var_prefix}operating_hours"):
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        TIME_MINUTES,
-                        VarType.INT,
-                        EntityCategory.DIAGNOSTIC,
-                        None,
-                        1.0,
-                        dev_info,
-                    )
-                )
-            elif key in (f"{var_prefix}scan_frequency"):
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        FREQUENCY_HERTZ,
-                        VarType.INT,
-                        EntityCategory.DIAGNOSTIC,
-                        None,
-                        1.0,
-                        dev_info,
-                    )
-                )
-            elif (
-                key.find("iex_power_supply") != -1
-                or key.find("cybro_power_supply") != -1
-            ):
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        ELECTRIC_POTENTIAL_VOLT,
-                        VarType.INT,
-                        EntityCategory.DIAGNOSTIC,
-                        None,
-                        0.1,
-                        dev_info,
-                    )
-                )
+    # add the poll metrics of the integration
+    for metric, unit in (
+        (POLL_METRIC_REQUEST_LATENCY, TIME_MILLISECONDS),
+        (POLL_METRIC_RESPONSE_BYTES, DATA_BYTES),
+        (POLL_METRIC_PARSE_TIME, TIME_MILLISECONDS),
+        (POLL_METRIC_VARS, None),
+        (POLL_METRIC_DISPATCH_TIME, TIME_MILLISECONDS),
+    ):
+        res.append(CybroPollMetricSensorEntity(coordinator, metric, unit, dev_info))
+    # add different plc diagnostic vars
+    for key in coordinator.category_vars(VAR_CAT_DIAG_SCAN_TIME):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                TIME_MILLISECONDS,
+                VarType.INT,
+                EntityCategory.DIAGNOSTIC,
+                None,
+                1.0,
+                dev_info,
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_DIAG_UPTIME):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                TIME_MINUTES,
+                VarType.INT,
+                EntityCategory.DIAGNOSTIC,
+                None,
+                1.0,
+                dev_info,
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_DIAG_SCAN_FREQUENCY):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                FREQUENCY_HERTZ,
+                VarType.INT,
+                EntityCategory.DIAGNOSTIC,
+                None,
+                1.0,
+                dev_info,
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_DIAG_POWER_SUPPLY):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                ELECTRIC_POTENTIAL_VOLT,
+                VarType.INT,
+                EntityCategory.DIAGNOSTIC,
+                None,
+                0.1,
+                dev_info,
+            )
+        )
 
     if len(res) > 0:
         return res
@@ -178,41 +221,34 @@ def find_temperatures(
         model=DEVICE_DESCRIPTION,
         configuration_url=MANUFACTURER_URL,
     )
-    for key in coordinator.data.plc_info.plc_vars:
-        if (
-            key.find(".th") != -1
-            or key.find(".op") != -1
-            or key.find(".ts") != -1
-            or key.find(".fc") != -1
-        ):
-            if key.find("_temperature") != -1:
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        TEMP_CELSIUS,
-                        VarType.FLOAT,
-                        None,
-                        SensorDeviceClass.TEMPERATURE,
-                        0.1,
-                        dev_info,
-                    )
-                )
-            elif key.find("_humidity") != -1:
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        PERCENTAGE,
-                        VarType.FLOAT,
-                        None,
-                        SensorDeviceClass.HUMIDITY,
-                        1.0,
-                        dev_info,
-                    )
-                )
+    for key in coordinator.category_vars(VAR_CAT_TEMPERATURE):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                TEMP_CELSIUS,
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass.TEMPERATURE,
+                0.1,
+                dev_info,
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_HUMIDITY):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                PERCENTAGE,
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass.HUMIDITY,
+                1.0,
+                dev_info,
+            )
+        )
 
     if len(res) > 0:
         return res
@@ -237,50 +273,48 @@ def find_weather(
         configuration_url=MANUFACTURER_URL,
     )
 
-    for key in coordinator.data.plc_info.plc_vars:
-        if key.find(var_prefix) != -1:
-            if key.find("_temperature") != -1:
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        TEMP_CELSIUS,
-                        VarType.FLOAT,
-                        None,
-                        SensorDeviceClass.TEMPERATURE,
-                        0.1,
-                        dev_info,
-                    )
-                )
-            elif key.find("_humidity") != -1:
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        PERCENTAGE,
-                        VarType.FLOAT,
-                        None,
-                        SensorDeviceClass.HUMIDITY,
-                        1.0,
-                        dev_info,
-                    )
-                )
-            elif key.find("_wind_speed") != -1:
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        SPEED_KILOMETERS_PER_HOUR,
-                        VarType.FLOAT,
-                        None,
-                        None,
-                        0.1,
-                        dev_info,
-                    )
-                )
+    for key in coordinator.category_vars(VAR_CAT_WEATHER_TEMPERATURE):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                TEMP_CELSIUS,
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass.TEMPERATURE,
+                0.1,
+                dev_info,
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_WEATHER_HUMIDITY):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                PERCENTAGE,
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass.HUMIDITY,
+                1.0,
+                dev_info,
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_WEATHER_WIND_SPEED):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                SPEED_KILOMETERS_PER_HOUR,
+                VarType.FLOAT,
+                None,
+                None,
+                0.1,
+                dev_info,
+            )
+        )
 
     if len(res) > 0:
         return res
@@ -304,78 +338,107 @@ def find_power_meter(
         model=DEVICE_DESCRIPTION,
         configuration_url=MANUFACTURER_URL,
     )
-    for key in coordinator.data.plc_info.plc_vars:
-        if key.find(var_prefix) != -1:
-            if key.find("_power") != -1:
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        POWER_WATT,
-                        VarType.FLOAT,
-                        None,
-                        SensorDeviceClass.POWER,
-                        1.0,
-                        dev_info,
-                    )
-                )
-            elif key.find("_voltage") != -1:
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        ELECTRIC_POTENTIAL_VOLT,
-                        VarType.FLOAT,
-                        None,
-                        SensorDeviceClass.VOLTAGE,
-                        0.1,
-                        dev_info,
-                    )
-                )
-            elif key.find("_current") != -1:
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        ELECTRIC_CURRENT_MILLIAMPERE,
-                        VarType.FLOAT,
-                        None,
-                        SensorDeviceClass.CURRENT,
-                        1.0,
-                        dev_info,
-                    )
-                )
-            elif key in (f"{var_prefix}_energy", f"{var_prefix}_energy_real"):
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        ENERGY_KILO_WATT_HOUR,
-                        VarType.FLOAT,
-                        None,
-                        SensorDeviceClass.ENERGY,
-                        1.0,
-                        dev_info,
-                    )
-                )
-            elif key.find(f"{var_prefix}_energy_watthours") != -1:
-                res.append(
-                    CybroSensorEntity(
-                        coordinator,
-                        key,
-                        "",
-                        ENERGY_WATT_HOUR,
-                        VarType.FLOAT,
-                        None,
-                        SensorDeviceClass.ENERGY,
-                        1.0,
-                        dev_info,
-                    )
-                )
+    for key in coordinator.category_vars(VAR_CAT_POWER_METER_POWER):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                POWER_WATT,
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass.POWER,
+                1.0,
+                dev_info,
+                aggregation_window=coordinator.aggregation_window(
+                    VAR_CAT_POWER_METER_POWER
+                ),
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_POWER_METER_VOLTAGE):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                ELECTRIC_POTENTIAL_VOLT,
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass.VOLTAGE,
+                0.1,
+                dev_info,
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_POWER_METER_CURRENT):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                ELECTRIC_CURRENT_MILLIAMPERE,
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass.CURRENT,
+                1.0,
+                dev_info,
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_POWER_METER_ENERGY):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                ENERGY_KILO_WATT_HOUR,
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass.ENERGY,
+                1.0,
+                dev_info,
+            )
+        )
+    for key in coordinator.category_vars(VAR_CAT_POWER_METER_ENERGY_WH):
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                ENERGY_WATT_HOUR,
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass.ENERGY,
+                1.0,
+                dev_info,
+            )
+        )
+
+    if len(res) > 0:
+        return res
+    return None
+
+
+def find_rule_sensors(
+    coordinator: CybroDataUpdateCoordinator,
+) -> list[CybroSensorEntity] | None:
+    """Find the plc vars mapped to sensors by the user var rules."""
+    res: list[CybroSensorEntity] = []
+    dev_info = rule_device_info(coordinator)
+    for key in coordinator.category_vars(VAR_CAT_RULE_SENSOR):
+        if (rule := coordinator.var_rules.match(key)) is None:
+            continue
+        res.append(
+            CybroSensorEntity(
+                coordinator,
+                key,
+                "",
+                rule.unit or "",
+                VarType.FLOAT,
+                None,
+                SensorDeviceClass(rule.device_class) if rule.device_class else None,
+                rule.scale,
+                dev_info,
+            )
+        )
 
     if len(res) > 0:
         return res
@@ -385,8 +448,10 @@ def find_power_meter(
 class CybroSensorEntity(CybroEntity, SensorEntity):
     """Defines a Cybro PLC sensor entity."""
 
-    _var_type: VarType = VarType.INT
-    _val_fact: float = 1.0
+    _slot: int
+    _window: CybroSampleWindow | None = None
+    _window_start = -math.inf
+    _summary: WindowSummary | None = None
 
     def __init__(
         self,
@@ -400,8 +465,13 @@ class CybroSensorEntity(CybroEntity, SensorEntity):
         val_fact: float = 1.0,
         dev_info: DeviceInfo = None,
         # attr_icon="mdi:lightbulb",
+        aggregation_window: float = 0,
     ) -> None:
-        """Initialize a Cybro PLC sensor entity."""
+        """Initialize a Cybro PLC sensor entity.
+
+        With an aggregation window [s], the sensor samples its var on every
+        refresh and publishes the mean (with min and max) once per window.
+        """
         super().__init__(coordinator=coordinator)
         if var_name == "":
             return
@@ -417,9 +487,40 @@ class CybroSensorEntity(CybroEntity, SensorEntity):
         if attr_device_class == SensorDeviceClass.ENERGY:
             self._attr_state_class = STATE_CLASS_TOTAL_INCREASING
         LOGGER.debug(self._attr_unique_id)
-        coordinator.data.add_var(self._attr_unique_id, var_type=var_type)
-        self._var_type = var_type
-        self._val_fact = val_fact
+        self._slot = coordinator.register_value(var_name, var_type, val_fact)
+        self._aggregation_window = aggregation_window
+        if aggregation_window > 0:
+            # the fast tier is polled at most this often
+            fast_interval = (
+                POLL_TIER_INTERVALS[POLL_TIER_FAST].total_seconds()
+                * coordinator.poll_scale_bounds[0]
+            )
+            self._window = CybroSampleWindow(
+                math.ceil(aggregation_window / fast_interval) * 2 + 1
+            )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Sample the var and publish the aggregate once per window."""
+        if self._window is None:
+            super()._handle_coordinator_update()
+            return
+        now = monotonic()
+        if (value := self.coordinator.values.get(self._slot)) is not None:
+            self._window.add(now, value)
+        available = self.available
+        if (
+            now - self._window_start < self._aggregation_window
+            and available == self._last_available
+        ):
+            self.coordinator.count_state_write(False)
+            return
+        self._summary = self._window.summary(now)
+        self._window.restart(now)
+        self._window_start = now
+        self._last_available = available
+        self.coordinator.count_state_write(True)
+        self.async_write_ha_state()
 
     @property
     def device_info(self):
@@ -442,15 +543,9 @@ class CybroSensorEntity(CybroEntity, SensorEntity):
     @property
     def native_value(self) -> datetime | StateType:
         """Return the state of the sensor."""
-        res = self.coordinator.data.vars.get(self._attr_unique_id, None)
-        if res is None:
-            return None
-        if self._var_type == VarType.INT:
-            return int(int(res.value) * self._val_fact)
-        if self._var_type == VarType.FLOAT:
-            return float(res.value.replace(",", "")) * self._val_fact
-
-        return res.value
+        if self._window is not None:
+            return None if self._summary is None else round(self._summary.mean, 3)
+        return self.coordinator.values.get(self._slot)
 
     @property
     def unique_id(self):
@@ -464,6 +559,57 @@ class CybroSensorEntity(CybroEntity, SensorEntity):
             desc = self.coordinator.data.vars[self._attr_unique_id].description
         except KeyError:
             desc = self._attr_name
+        if self._summary is not None:
+            return {
+                ATTR_DESCRIPTION: desc,
+                ATTR_MIN: self._summary.minimum,
+                ATTR_MAX: self._summary.maximum,
+                ATTR_SAMPLES: self._summary.samples,
+            }
         return {
             ATTR_DESCRIPTION: desc,
         }
+
+
+class CybroPollMetricSensorEntity(CybroEntity, SensorEntity):
+    """Defines a sensor of a poll metric of the integration."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    # updated on every refresh, so only enabled on demand
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator: CybroDataUpdateCoordinator,
+        metric: str,
+        unit: str | None,
+        dev_info: DeviceInfo,
+    ) -> None:
+        """Initialize a Cybro poll metric sensor entity."""
+        super().__init__(coordinator=coordinator)
+        self._metric = metric
+        self._attr_unique_id = f"c{coordinator.cybro.nad}.poll_{metric}"
+        self._attr_name = self._attr_unique_id
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_info = dev_info
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return the plc diagnostics device."""
+        return self._attr_device_info
+
+    @property
+    def cybro_vars(self) -> tuple[str, ...]:
+        """Return no plc vars, the metric changes on every refresh."""
+        return ()
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value of the metric of the last refresh."""
+        return self.coordinator.poll_metrics.last.get(self._metric)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state on every refresh."""
+        self.coordinator.count_state_write(True)
+        self.async_write_ha_state()
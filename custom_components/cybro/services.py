@@ -0,0 +1,98 @@
+"""Services of the Cybro PLC integration."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import datetime
+
+import voluptuous as vol
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event
+from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .capture import CybroCapture
+from .const import ATTR_DURATION
+from .const import DATA_CAPTURE_STOP_LISTENER
+from .const import DATA_CAPTURES
+from .const import DOMAIN
+from .const import SERVICE_CAPTURE
+
+CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=3600)
+        ),
+    }
+)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+    if hass.services.has_service(DOMAIN, SERVICE_CAPTURE):
+        return
+
+    async def async_capture(call: ServiceCall) -> None:
+        """Capture the scgi traffic of all loaded entries for a while."""
+        captures: dict[tuple[str, int], CybroCapture] = hass.data.setdefault(
+            DATA_CAPTURES, {}
+        )
+        for coordinator in hass.data.get(DOMAIN, {}).values():
+            key = (coordinator.cybro.host, coordinator.cybro.port)
+            if (capture := captures.get(key)) is None:
+                path = hass.config.path(
+                    f"cybro_capture_{key[0]}_{key[1]}_"
+                    f"{dt_util.now():%Y%m%d_%H%M%S}.jsonl.gz"
+                )
+                capture = captures[key] = CybroCapture(hass, *key, path)
+
+                async def async_stop(_: datetime, key: tuple[str, int] = key) -> None:
+                    await async_stop_captures(hass, [key])
+
+                capture.cancel_stop = async_call_later(
+                    hass, call.data[ATTR_DURATION], async_stop
+                )
+            coordinator.async_start_capture(capture)
+
+    async def async_stop_all(_: Event) -> None:
+        """Write out all captures when Home Assistant stops."""
+        hass.data.pop(DATA_CAPTURE_STOP_LISTENER, None)
+        await async_stop_captures(hass)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_CAPTURE, async_capture, schema=CAPTURE_SCHEMA
+    )
+    hass.data[DATA_CAPTURE_STOP_LISTENER] = hass.bus.async_listen_once(
+        EVENT_HOMEASSISTANT_STOP, async_stop_all
+    )
+
+
+async def async_unload_services(hass: HomeAssistant) -> None:
+    """Stop the captures of scgi servers without a loaded entry.
+
+    The services are removed with the last entry.
+    """
+    coordinators = hass.data.get(DOMAIN, {}).values()
+    servers = {
+        (coordinator.cybro.host, coordinator.cybro.port) for coordinator in coordinators
+    }
+    await async_stop_captures(
+        hass,
+        [key for key in hass.data.get(DATA_CAPTURES, {}) if key not in servers],
+    )
+    if len(coordinators) > 0:
+        return
+    hass.services.async_remove(DOMAIN, SERVICE_CAPTURE)
+    if (unsub := hass.data.pop(DATA_CAPTURE_STOP_LISTENER, None)) is not None:
+        unsub()
+
+
+async def async_stop_captures(
+    hass: HomeAssistant, servers: Iterable[tuple[str, int]] | None = None
+) -> None:
+    """Stop the captures of the given scgi servers, of all if None."""
+    captures: dict[tuple[str, int], CybroCapture] = hass.data.get(DATA_CAPTURES, {})
+    for key in list(captures) if servers is None else servers:
+        if (capture := captures.pop(key, None)) is not None:
+            await capture.async_stop()
@@ -0,0 +1,109 @@
+"""Decoded values of Cybro PLC vars."""
+from __future__ import annotations
+
+import math
+from array import array
+
+from homeassistant.helpers.typing import StateType
+
+from cybro import VarType
+
+
+class CybroValueStore:
+    """Holds the decoded values of all registered vars.
+
+    Every registration (var name, type and scaling factor) gets a slot.
+    Numeric values are stored with the scaling applied in an array column
+    indexed by slot, so entities read plain numbers. A var is only decoded
+    when its value changed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty value store."""
+        self._slots: dict[tuple[str, int, float], int] = {}
+        self._var_slots: dict[str, list[int]] = {}
+        self._types: list[int] = []
+        self._facts: list[float] = []
+        # NaN marks an unknown value
+        self.numbers = array("d")
+        self.strings: list[str | None] = []
+
+    def register(
+        self, name: str, var_type: VarType = VarType.STR, fact: float = 1.0
+    ) -> int:
+        """Register a var and return its slot.
+
+        Registering the same var, type and factor again returns the same slot.
+        """
+        key = (name, var_type, fact)
+        if (slot := self._slots.get(key)) is not None:
+            return slot
+        slot = len(self._types)
+        self._slots[key] = slot
+        self._var_slots.setdefault(name, []).append(slot)
+        self._types.append(var_type)
+        self._facts.append(fact)
+        self.numbers.append(math.nan)
+        self.strings.append(None)
+        return slot
+
+    def decode(self, name: str, raw: str | None) -> None:
+        """Decode the raw value of a var into all of its slots."""
+        if (slots := self._var_slots.get(name)) is None:
+            return
+        for slot in slots:
+            if self._types[slot] == VarType.STR:
+                self.strings[slot] = raw
+            else:
+                self.numbers[slot] = self._decode_number(slot, raw)
+
+    def _decode_number(self, slot: int, raw: str | None) -> float:
+        """Return the scaled numeric value of a raw value, NaN if invalid."""
+        var_type = self._types[slot]
+        try:
+            if var_type == VarType.INT:
+                return int(int(raw) * self._facts[slot])
+            if var_type == VarType.FLOAT:
+                return float(raw.replace(",", "")) * self._facts[slot]
+        except (AttributeError, TypeError, ValueError):
+            return math.nan
+        if raw in ("0", "1"):
+            return float(raw == "1")
+        return math.nan
+
+    def within_deadband(
+        self, name: str, raw: str | None, band: float, percent: bool = False
+    ) -> bool:
+        """Return True if a new raw value is within the deadband of a var.
+
+        The band is absolute in the scaled unit of each slot or, if percent
+        is set, relative to the stored value. Only numeric vars with a known
+        value can be within a deadband.
+        """
+        if not (slots := self._var_slots.get(name)):
+            return False
+        for slot in slots:
+            if self._types[slot] not in (VarType.INT, VarType.FLOAT):
+                return False
+            current = self.numbers[slot]
+            if math.isnan(number := self._decode_number(slot, raw)):
+                return False
+            limit = abs(current) * band / 100 if percent else band
+            # NaN compares False, an unknown stored value is never within
+            if not abs(number - current) < limit:
+                return False
+        return True
+
+    def get(self, slot: int) -> StateType | bool:
+        """Return the decoded value of a slot, None if it is unknown."""
+        var_type = self._types[slot]
+        if var_type == VarType.STR:
+            return self.strings[slot]
+        number = self.numbers[slot]
+        if math.isnan(number):
+            return None
+        if var_type == VarType.INT:
+            return int(number)
+        if var_type == VarType.BOOL:
+            return number == 1.0
+        return number
@@ -1,19 +1,15 @@
 """Support for the Cybro weather."""
 from __future__ import annotations
 
-from typing import cast
-
 from homeassistant.components.weather import WeatherEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_UNIT_SYSTEM_METRIC
-from homeassistant.const import SPEED_KILOMETERS_PER_HOUR
+from homeassistant.const import Platform
+from homeassistant.const import PRESSURE_HPA
 from homeassistant.const import TEMP_CELSIUS
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from sqlalchemy import false
-from sqlalchemy import true
 
 from .const import AREA_WEATHER
 from .const import ATTRIBUTION_PLC
@@ -21,7 +17,11 @@ from .const import DEVICE_DESCRIPTION
 from .const import DOMAIN
 from .const import MANUFACTURER
 from .const import MANUFACTURER_URL
+from .const import VAR_CAT_WEATHER_STATION
 from .coordinator import CybroDataUpdateCoordinator
+from .discovery import WEATHER_STATION_VARS
+from .models import async_enabled_vars
+from .models import CybroEntity
 from cybro import VarType
 
 PARALLEL_UPDATES = 1
@@ -35,29 +35,19 @@ async def async_setup_entry(
     coordinator: CybroDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
 
     var_prefix = f"c{coordinator.data.plc_info.nad}.weather_"
-    has_weather: bool = false
-    # search for any weather station var and add it into the read list
-    if coordinator.data.plc_info.plc_vars.__contains__(f"{var_prefix}temperature"):
-        coordinator.data.add_var(f"{var_prefix}temperature", var_type=VarType.INT)
-        has_weather = true
-    if coordinator.data.plc_info.plc_vars.__contains__(f"{var_prefix}humidity"):
-        coordinator.data.add_var(f"{var_prefix}humidity", var_type=VarType.INT)
-        has_weather = true
-    if coordinator.data.plc_info.plc_vars.__contains__(f"{var_prefix}wind_speed"):
-        coordinator.data.add_var(f"{var_prefix}wind_speed", var_type=VarType.INT)
-        has_weather = true
-    if coordinator.data.plc_info.plc_vars.__contains__(f"{var_prefix}wind_direction"):
-        coordinator.data.add_var(f"{var_prefix}wind_direction", var_type=VarType.INT)
-        has_weather = true
-    if coordinator.data.plc_info.plc_vars.__contains__(f"{var_prefix}pressure"):
-        coordinator.data.add_var(f"{var_prefix}pressure", var_type=VarType.INT)
-        has_weather = true
-
-    if has_weather:
-        async_add_entities([CybroWeatherEntity(var_prefix, coordinator)])
-
-
-class CybroWeatherEntity(CoordinatorEntity, WeatherEntity):
+    entities: list[CybroWeatherEntity] = []
+    if len(coordinator.category_vars(VAR_CAT_WEATHER_STATION)) > 0:
+        entities.append(CybroWeatherEntity(var_prefix, coordinator))
+
+    # read all registered vars once, so entities start with a value
+    await coordinator.async_warm_read(
+        async_enabled_vars(hass, Platform.WEATHER, entities)
+    )
+    if len(entities) > 0:
+        async_add_entities(entities)
+
+
+class CybroWeatherEntity(CybroEntity, WeatherEntity):
     """Define an Weather Station entity."""
 
     coordinator: CybroDataUpdateCoordinator
@@ -74,7 +64,7 @@ class CybroWeatherEntity(CoordinatorEntity, WeatherEntity):
         self._attr_unique_id = var_prefix
         self._attr_temperature_unit = TEMP_CELSIUS
         self._attr_attribution = ATTRIBUTION_PLC
-        self._attr_pressure_unit = SPEED_KILOMETERS_PER_HOUR
+        self._attr_pressure_unit = PRESSURE_HPA
         self._attr_device_info = DeviceInfo(
             # entry_type=DeviceEntryType.SERVICE,
             identifiers={(DOMAIN, var_prefix)},
@@ -83,6 +73,31 @@ class CybroWeatherEntity(CoordinatorEntity, WeatherEntity):
             suggested_area=AREA_WEATHER,
             model=DEVICE_DESCRIPTION,
         )
+        self._temperature_slot = coordinator.register_value(
+            f"{var_prefix}temperature", VarType.FLOAT, 0.1
+        )
+        self._pressure_slot = coordinator.register_value(
+            f"{var_prefix}pressure", VarType.FLOAT
+        )
+        self._humidity_slot = coordinator.register_value(
+            f"{var_prefix}humidity", VarType.FLOAT
+        )
+        self._wind_speed_slot = coordinator.register_value(
+            f"{var_prefix}wind_speed", VarType.FLOAT, 0.1
+        )
+        self._wind_bearing_slot = coordinator.register_value(
+            f"{var_prefix}wind_direction", VarType.INT
+        )
+
+    @property
+    def cybro_vars(self) -> tuple[str, ...]:
+        """Return all plc vars the state of this entity depends on."""
+        plc_vars = self.coordinator.data.plc_info.plc_vars
+        return tuple(
+            var
+            for name in WEATHER_STATION_VARS
+            if (var := f"{self._attr_unique_id}{name}") in plc_vars
+        )
 
     @property
     def device_info(self):
@@ -112,63 +127,24 @@ class CybroWeatherEntity(CoordinatorEntity, WeatherEntity):
     @property
     def temperature(self) -> float | None:
         """Return the temperature."""
-        try:
-            return cast(
-                float,
-                self.coordinator.data.vars[
-                    f"{self._attr_unique_id}temperature"
-                ].value_float()
-                * 0.1,
-            )
-        except KeyError:
-            return None
+        return self.coordinator.values.get(self._temperature_slot)
 
     @property
     def pressure(self) -> float | None:
         """Return the pressure."""
-        try:
-            return cast(
-                float,
-                self.coordinator.data.vars[
-                    f"{self._attr_unique_id}pressure"
-                ].value_float(),
-            )
-        except KeyError:
-            return None
+        return self.coordinator.values.get(self._pressure_slot)
 
     @property
     def humidity(self) -> float | None:
         """Return the humidity."""
-        try:
-            return cast(
-                float,
-                self.coordinator.data.vars[
-                    f"{self._attr_unique_id}humidity"
-                ].value_float(),
-            )
-        except KeyError:
-            return None
+        return self.coordinator.values.get(self._humidity_slot)
 
     @property
     def wind_speed(self) -> float | None:
         """Return the wind speed."""
-        try:
-            return cast(
-                float,
-                self.coordinator.data.vars[
-                    f"{self._attr_unique_id}wind_speed"
-                ].value_float()
-                * 0.1,
-            )
-        except KeyError:
-            return None
+        return self.coordinator.values.get(self._wind_speed_slot)
 
     @property
     def wind_bearing(self) -> int | None:
         """Return the wind bearing."""
-        try:
-            return self.coordinator.data.vars[
-                f"{self._attr_unique_id}wind_direction"
-            ].value_int()
-        except KeyError:
-            return None
+        return self.coordinator.values.get(self._wind_bearing_slot)
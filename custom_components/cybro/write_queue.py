@@ -0,0 +1,95 @@
+"""Coalescing write queue for Cybro PLC."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .const import LOGGER
+from .const import WRITE_COALESCE_DELAY
+from .poller import CybroHostPoller
+from .scgi import response_vars
+from cybro import CybroError
+
+
+class CybroWriteQueue:
+    """Collects var writes and sends them with a single scgi request.
+
+    All writes arriving within WRITE_COALESCE_DELAY are merged, all waiting
+    callers are resolved together when the request returned. The writes are
+    sent by the poller of the scgi server, so they fail at once while its
+    circuit breaker is open.
+    """
+
+    def __init__(self, hass: HomeAssistant, poller: CybroHostPoller) -> None:
+        """Initialize the write queue."""
+        self.hass = hass
+        self.poller = poller
+        self._pending: dict[str, str] = {}
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    async def async_write(self, name: str, value: str) -> dict[str, Any]:
+        """Queue a write of a single var.
+
+        Returns the var item from the scgi server response.
+        """
+        future: asyncio.Future = self.hass.loop.create_future()
+        # a later write of the same var overrides the pending value
+        self._pending[name] = value
+        self._waiters.setdefault(name, []).append(future)
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_later(
+                WRITE_COALESCE_DELAY, self._schedule_flush
+            )
+        return await future
+
+    def _schedule_flush(self) -> None:
+        """Start sending the pending writes."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        waiters, self._waiters = self._waiters, {}
+        self.hass.async_create_task(self._async_flush(pending, waiters))
+
+    async def _async_flush(
+        self, pending: dict[str, str], waiters: dict[str, list[asyncio.Future]]
+    ) -> None:
+        """Send all pending writes and resolve the waiting callers."""
+        LOGGER.debug("Writing %s vars with a single request", len(pending))
+        try:
+            items = response_vars(await self.poller.async_request(pending))
+            results = {item["name"]: item for item in items}
+            for name, futures in waiters.items():
+                for future in futures:
+                    if future.done():
+                        continue
+                    if (item := results.get(name)) is None:
+                        future.set_exception(
+                            CybroError(f"No response on write of {name}")
+                        )
+                    else:
+                        future.set_result(item)
+        except Exception as error:
+            # any error of the request fails the writes of all callers
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+        finally:
+            # a cancelled flush must not leave the callers waiting
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(CybroError("Write was cancelled"))
+
+    def async_cancel(self) -> None:
+        """Cancel all pending writes."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for futures in self._waiters.values():
+            for future in futures:
+                future.cancel()
+        self._pending = {}
+        self._waiters = {}
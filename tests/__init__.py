@@ -0,0 +1 @@
+"""Tests for the Cybro PLC integration."""
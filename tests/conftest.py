@@ -0,0 +1,132 @@
+"""Fixtures for the Cybro PLC tests."""
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from custom_components.cybro.const import DOMAIN
+from custom_components.cybro.coordinator import CybroDataUpdateCoordinator
+from custom_components.cybro.scgi import ScgiRequestStats
+from homeassistant.const import CONF_ADDRESS
+from homeassistant.const import CONF_HOST
+from homeassistant.const import CONF_PORT
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+NAD = 1
+
+SERVER_VARS = {
+    "sys.scgi_port_status": "active",
+    "sys.server_uptime": "1",
+    "sys.scgi_request_pending": "0",
+    "sys.scgi_request_count": "0",
+    "sys.push_port_status": "active",
+    "sys.push_count": "0",
+    "sys.push_ack_errors": "0",
+    "sys.push_list_count": "0",
+    "sys.cache_request": "0",
+    "sys.cache_valid": "0",
+    "sys.server_version": "3.1.3",
+    "sys.udp_rx_count": "0",
+    "sys.udp_tx_count": "0",
+    "sys.datalogger_status": "active",
+}
+
+PLC_VARS = {
+    "scan_time": "5",
+    "lc00_qx00": "0",
+    "lc00_qx01": "1",
+    "th00_temperature": "215",
+    "power_meter_power": "1000",
+    "change_count": "0",
+}
+
+
+class FakeScgiServer:
+    """Answers the scgi requests of one plc from a dict of var values.
+
+    Unknown vars are missing in the response, written values are stored
+    unless the var is read only.
+    """
+
+    def __init__(self, nad: int, plc_vars: dict[str, str]) -> None:
+        """Initialize the server with the vars of the plc program."""
+        prefix = f"c{nad}."
+        alc_lines = ["header", "header"]
+        alc_lines += [" " * 37 + "int".ljust(6) + name + " " for name in plc_vars]
+        self.values = dict(SERVER_VARS)
+        self.values.update(
+            {
+                f"{prefix}sys.ip_port": "10.0.0.1:8442",
+                f"{prefix}sys.timestamp": "2022-01-01 00:00:00",
+                f"{prefix}sys.plc_program_status": "ok",
+                f"{prefix}sys.response_time": "5",
+                f"{prefix}sys.bytes_transferred": "0",
+                f"{prefix}sys.comm_error_count": "0",
+                f"{prefix}sys.alc_file": "\n".join(alc_lines),
+            }
+        )
+        self.values.update({prefix + name: value for name, value in plc_vars.items()})
+        self.requests: list[dict[str, str]] = []
+        self.read_only: set[str] = set()
+        self.error: Exception | None = None
+
+    async def request(
+        self, data: dict[str, str], stats: ScgiRequestStats | None = None
+    ) -> dict[str, Any] | None:
+        """Answer a request like the scgi client."""
+        self.requests.append(dict(data))
+        if self.error is not None:
+            raise self.error
+        items = []
+        for name, value in data.items():
+            if value != "" and name in self.values and name not in self.read_only:
+                self.values[name] = value
+            if name in self.values:
+                items.append(
+                    {"name": name, "value": self.values[name], "description": ""}
+                )
+        if stats is not None:
+            stats.requests += 1
+            stats.vars += len(items)
+        return {"var": items} if items else None
+
+    def read_vars(self) -> list[set[str]]:
+        """Return the read var names of every request."""
+        return [
+            {name for name, value in data.items() if value == ""}
+            for data in self.requests
+        ]
+
+
+@pytest.fixture
+def entry_options() -> dict[str, Any]:
+    """Return the options of the config entry, overridden by the tests."""
+    return {}
+
+
+@pytest.fixture
+def scgi() -> FakeScgiServer:
+    """Return the scgi server of the plc."""
+    return FakeScgiServer(NAD, PLC_VARS)
+
+
+@pytest.fixture
+async def coordinator(
+    hass: HomeAssistant, scgi: FakeScgiServer, entry_options: dict[str, Any]
+):
+    """Return the coordinator of a plc after its first full update."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_HOST: "127.0.0.1", CONF_PORT: 4000, CONF_ADDRESS: NAD},
+        options=entry_options,
+    )
+    entry.add_to_hass(hass)
+    coordinator = CybroDataUpdateCoordinator(hass, entry=entry)
+    coordinator.poller.client.request = scgi.request
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    scgi.requests.clear()
+    yield coordinator
+    coordinator.write_queue.async_cancel()
+    coordinator.poller.async_unregister(coordinator)
@@ -0,0 +1,60 @@
+"""Tests for the windowed aggregation of the plc samples."""
+from custom_components.cybro.aggregation import CybroSampleWindow
+from custom_components.cybro.aggregation import WindowSummary
+
+
+def test_time_weighted_mean():
+    """Every sample is weighted by the time until the next one."""
+    window = CybroSampleWindow(10)
+    window.add(0, 10)
+    window.add(1, 20)
+    window.add(4, 0)
+
+    assert window.summary(5) == WindowSummary(0, 14, 20, 3)
+
+
+def test_mean_without_duration():
+    """Samples without a duration get the plain mean."""
+    window = CybroSampleWindow(10)
+    window.add(1, 10)
+    window.add(1, 20)
+
+    assert window.summary(1) == WindowSummary(10, 15, 20, 2)
+
+
+def test_wraparound():
+    """A full window overwrites its oldest samples."""
+    window = CybroSampleWindow(3)
+    for time in range(5):
+        window.add(time, time)
+
+    assert len(window) == 3
+    assert window.summary(5) == WindowSummary(2, 3, 4, 3)
+
+    window.add(5, 8)
+    assert window.summary(6) == WindowSummary(3, 5, 8, 3)
+
+
+def test_empty_window():
+    """An empty window has no summary and stays empty on restart."""
+    window = CybroSampleWindow(0)
+
+    assert window.summary(1) is None
+    window.restart(1)
+    assert len(window) == 0
+
+    window.add(1, 5)
+    window.add(2, 6)
+    assert len(window) == 1
+    assert window.summary(3) == WindowSummary(6, 6, 6, 1)
+
+
+def test_restart():
+    """A new window starts with the last sample of the previous one."""
+    window = CybroSampleWindow(10)
+    window.add(0, 10)
+    window.add(1, 20)
+    window.restart(2)
+    window.add(4, 40)
+
+    assert window.summary(6) == WindowSummary(20, 30, 40, 2)
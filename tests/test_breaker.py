@@ -0,0 +1,175 @@
+"""Tests for the circuit breaker of the scgi servers."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from custom_components.cybro import breaker
+from custom_components.cybro.breaker import CybroCircuitBreaker
+from custom_components.cybro.const import BREAKER_CLOSED
+from custom_components.cybro.const import BREAKER_FAILURE_THRESHOLD
+from custom_components.cybro.const import BREAKER_OPEN
+
+from cybro import CybroConnectionError
+from cybro import CybroError
+
+RESET_TIMEOUT = 0.05
+
+
+@pytest.fixture(autouse=True)
+def short_reset_timeout(monkeypatch):
+    """Probe after a short time."""
+    monkeypatch.setattr(
+        breaker, "BREAKER_RESET_TIMEOUT_MIN", timedelta(seconds=RESET_TIMEOUT)
+    )
+
+
+class Probe:
+    """Counts the probes, fails them while down."""
+
+    def __init__(self, down: bool = True) -> None:
+        self.down = down
+        self.calls = 0
+
+    async def __call__(self) -> None:
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.down:
+            raise CybroError("down")
+
+
+def open_breaker(circuit: CybroCircuitBreaker) -> None:
+    """Record enough failures to open the breaker."""
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        circuit.record_failure()
+
+
+def test_failures_open_the_breaker() -> None:
+    """Failed requests in a row open the breaker, requests fail at once."""
+
+    async def run() -> None:
+        circuit = CybroCircuitBreaker("host:4000", Probe())
+        for _ in range(BREAKER_FAILURE_THRESHOLD - 1):
+            circuit.record_failure()
+        await circuit.async_check()
+        assert circuit.state == BREAKER_CLOSED
+        circuit.record_failure()
+        assert circuit.state == BREAKER_OPEN
+        with pytest.raises(CybroConnectionError):
+            await circuit.async_check()
+        circuit.stop()
+
+    asyncio.run(run())
+
+
+def test_success_resets_the_failures() -> None:
+    """Only failures in a row count."""
+    circuit = CybroCircuitBreaker("host:4000", Probe())
+    for _ in range(BREAKER_FAILURE_THRESHOLD - 1):
+        circuit.record_failure()
+    circuit.record_success()
+    circuit.record_failure()
+    assert circuit.state == BREAKER_CLOSED
+    assert circuit.failures == 1
+
+
+def test_success_cancels_the_probe() -> None:
+    """A request closing the open breaker cancels the scheduled probe."""
+
+    async def run() -> None:
+        probe = Probe()
+        circuit = CybroCircuitBreaker("host:4000", probe)
+        open_breaker(circuit)
+        circuit.record_success()
+        await asyncio.sleep(RESET_TIMEOUT * 3)
+        assert probe.calls == 0
+        assert circuit.state == BREAKER_CLOSED
+        await circuit.async_check()
+
+    asyncio.run(run())
+
+
+def test_probe_closes_the_breaker() -> None:
+    """A successful probe closes the breaker and notifies."""
+
+    async def run() -> None:
+        probe = Probe(down=False)
+        closed = []
+        circuit = CybroCircuitBreaker("host:4000", probe, lambda: closed.append(1))
+        open_breaker(circuit)
+        await asyncio.sleep(RESET_TIMEOUT * 3)
+        assert probe.calls == 1
+        assert circuit.state == BREAKER_CLOSED
+        assert closed == [1]
+        await circuit.async_check()
+
+    asyncio.run(run())
+
+
+def test_failed_probe_doubles_the_reset_timeout() -> None:
+    """A failed probe opens the breaker again for twice as long."""
+
+    async def run() -> None:
+        probe = Probe()
+        circuit = CybroCircuitBreaker("host:4000", probe)
+        open_breaker(circuit)
+        await asyncio.sleep(RESET_TIMEOUT * 1.5)
+        assert probe.calls == 1
+        assert circuit.state == BREAKER_OPEN
+        await asyncio.sleep(RESET_TIMEOUT * 1.2)
+        assert probe.calls == 1
+        await asyncio.sleep(RESET_TIMEOUT * 1.5)
+        assert probe.calls == 2
+        circuit.stop()
+
+    asyncio.run(run())
+
+
+def test_requests_wait_for_the_probe() -> None:
+    """All requests of a half open breaker wait for a single probe."""
+
+    async def run() -> None:
+        started = asyncio.Event()
+        release = asyncio.Event()
+        calls = 0
+
+        async def probe() -> None:
+            nonlocal calls
+            calls += 1
+            started.set()
+            await release.wait()
+
+        circuit = CybroCircuitBreaker("host:4000", probe)
+        open_breaker(circuit)
+        await started.wait()
+        checks = [asyncio.create_task(circuit.async_check()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert not any(check.done() for check in checks)
+        release.set()
+        await asyncio.gather(*checks)
+        assert calls == 1
+        assert circuit.state == BREAKER_CLOSED
+
+    asyncio.run(run())
+
+
+def test_probe_error_opens_the_breaker() -> None:
+    """Any error of the probe opens the breaker again."""
+
+    async def run() -> None:
+        calls = 0
+
+        async def probe() -> None:
+            nonlocal calls
+            calls += 1
+            raise ValueError("not well-formed")
+
+        circuit = CybroCircuitBreaker("host:4000", probe)
+        open_breaker(circuit)
+        await asyncio.sleep(RESET_TIMEOUT * 1.5)
+        assert calls == 1
+        assert circuit.state == BREAKER_OPEN
+        await asyncio.sleep(RESET_TIMEOUT * 2.5)
+        assert calls == 2
+        circuit.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,43 @@
+"""Tests for the options flow of the Cybro PLC integration."""
+import pytest
+from custom_components.cybro.const import CONF_VAR_RULES
+from custom_components.cybro.const import DOMAIN
+from homeassistant.const import CONF_ADDRESS
+from homeassistant.const import CONF_HOST
+from homeassistant.const import CONF_PORT
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integration from custom_components."""
+    yield
+
+
+async def test_options_invalid_var_rules(hass: HomeAssistant) -> None:
+    """The form shows why the var rules are invalid."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_HOST: "127.0.0.1", CONF_PORT: 4000, CONF_ADDRESS: 1},
+    )
+    entry.add_to_hass(hass)
+
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["type"] == FlowResultType.FORM
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={CONF_VAR_RULES: "c*.temp; switch"}
+    )
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {CONF_VAR_RULES: "invalid_var_rules"}
+    assert result["description_placeholders"] == {
+        "rules_error": "Rule 1 has an unsupported platform switch"
+    }
+
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], user_input={CONF_VAR_RULES: "c*.temp; sensor"}
+    )
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert entry.options[CONF_VAR_RULES] == "c*.temp; sensor"
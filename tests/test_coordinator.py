@@ -0,0 +1,380 @@
+"""Tests for the data update coordinator of a plc."""
+import asyncio
+from datetime import timedelta
+from time import monotonic
+
+import pytest
+from custom_components.cybro.const import BREAKER_FAILURE_THRESHOLD
+from custom_components.cybro.const import CONF_CHANGE_COUNTER
+from custom_components.cybro.const import CONF_CHANGE_COUNTER_INTERVAL
+from custom_components.cybro.const import CONF_DEADBAND
+from custom_components.cybro.const import CONF_FORCE_UPDATE_INTERVAL
+from custom_components.cybro.const import CONF_MAX_POLL_INTERVAL
+from custom_components.cybro.const import CONF_MIN_POLL_INTERVAL
+from custom_components.cybro.const import DOMAIN
+from custom_components.cybro.const import PLATFORMS
+from custom_components.cybro.const import RECOVERY_INTERVAL_MIN
+from custom_components.cybro.const import VAR_CAT_TEMPERATURE
+from custom_components.cybro.coordinator import CybroPlcDevice
+from custom_components.cybro.light import find_on_off_lights
+from custom_components.cybro.models import async_enabled_vars
+from custom_components.cybro.sensor import find_temperatures
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from .conftest import SERVER_VARS
+from cybro import CybroConnectionError
+from cybro import VarType
+
+
+class Clock:
+    """Monotonic time of the coordinator, advanced by the tests."""
+
+    def __init__(self) -> None:
+        """Start at the current time."""
+        self.now = monotonic()
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock(coordinator, monkeypatch) -> Clock:
+    """Return the clock of the coordinator."""
+    clock = Clock()
+    monkeypatch.setattr("custom_components.cybro.coordinator.monotonic", clock)
+    return clock
+
+
+async def test_changed_vars(hass: HomeAssistant, coordinator, scgi, clock) -> None:
+    """Only the entities of changed vars write their state."""
+    (temperature,) = find_temperatures(coordinator)
+    light = find_on_off_lights(coordinator)[0]
+    temperature.entity_id = "sensor.c1_th00_temperature"
+    light.entity_id = "light.c1_lc00_qx00"
+    for entity in (temperature, light):
+        entity.hass = hass
+        coordinator.async_subscribe(entity.cybro_vars)
+    await coordinator.async_refresh()
+    temperature._handle_coordinator_update()
+    light._handle_coordinator_update()
+    assert coordinator.state_writes == 2
+
+    scgi.values["c1.th00_temperature"] = "220"
+    clock.now += 60
+    await coordinator.async_refresh()
+    temperature._handle_coordinator_update()
+    light._handle_coordinator_update()
+
+    assert coordinator.changed_vars == {"c1.th00_temperature"}
+    assert coordinator.state_writes == 3
+    assert coordinator.state_writes_skipped == 1
+    assert hass.states.get(temperature.entity_id).state == "22.0"
+
+
+@pytest.mark.parametrize(
+    "entry_options", [{CONF_MIN_POLL_INTERVAL: 10, CONF_MAX_POLL_INTERVAL: 10}]
+)
+async def test_poll_tiers(coordinator, scgi, clock) -> None:
+    """Every var is read at the interval of its poll tier."""
+    fast, normal, slow = "c1.lc00_qx00", "c1.th00_temperature", "c1.scan_time"
+    coordinator.async_subscribe([fast, normal, slow])
+    start = clock.now
+    await coordinator.async_refresh()
+
+    for offset, read_vars in (
+        (1, {fast}),
+        (2, {fast}),
+        (10, {fast, normal}),
+        (11, {fast}),
+        (300, {fast, normal, slow}),
+    ):
+        clock.now = start + offset
+        await coordinator.async_refresh()
+        assert scgi.read_vars()[-1] == read_vars
+
+    assert len(scgi.requests) == 6
+
+
+async def test_optimistic_write(hass: HomeAssistant, coordinator, scgi) -> None:
+    """A written value is applied at once and confirmed by a read back."""
+    name = "c1.lc00_qx00"
+    slot = coordinator.register_value(name, VarType.BOOL)
+    write = hass.async_create_task(coordinator.async_write_var(name, "1"))
+    await asyncio.sleep(0)
+    assert coordinator.values.get(slot) is True
+
+    assert await write == "1"
+    await hass.async_block_till_done()
+    assert scgi.read_vars()[-1] == {name}
+    assert coordinator.values.get(slot) is True
+
+
+async def test_optimistic_write_rejected(
+    hass: HomeAssistant, coordinator, scgi
+) -> None:
+    """The read back rolls back a value the plc did not take."""
+    name = "c1.lc00_qx00"
+    slot = coordinator.register_value(name, VarType.BOOL)
+    scgi.read_only.add(name)
+
+    assert await coordinator.async_write_var(name, "1") == "0"
+    await hass.async_block_till_done()
+    assert coordinator.values.get(slot) is False
+
+
+async def test_optimistic_write_error(hass: HomeAssistant, coordinator, scgi) -> None:
+    """A failed write rolls back the value at once, whatever the error."""
+    name = "c1.lc00_qx00"
+    slot = coordinator.register_value(name, VarType.BOOL)
+    coordinator.async_subscribe([name])
+    await coordinator.async_refresh()
+    scgi.error = ValueError("not well-formed")
+
+    with pytest.raises(ValueError):
+        await coordinator.async_write_var(name, "1")
+    assert coordinator.data.vars[name].value == "0"
+    assert coordinator.values.get(slot) is False
+
+
+@pytest.mark.parametrize(
+    "entry_options", [{CONF_MIN_POLL_INTERVAL: 10, CONF_MAX_POLL_INTERVAL: 10}]
+)
+async def test_ride_out_failures(coordinator, scgi, clock) -> None:
+    """Single failures keep the values and back off, recovery reads incrementally."""
+    name = "c1.lc00_qx00"
+    coordinator.async_subscribe([name])
+    await coordinator.async_refresh()
+    device = coordinator.data
+
+    scgi.error = CybroConnectionError("Connection refused")
+    for failures in (1, 2):
+        clock.now += 10
+        await coordinator.async_refresh()
+        assert coordinator.last_update_success
+        assert coordinator.data is device
+        assert coordinator.changed_vars == set()
+        delay = RECOVERY_INTERVAL_MIN * 2 ** (failures - 1)
+        assert delay / 2 <= coordinator.update_interval <= delay
+
+    scgi.error = None
+    clock.now += 10
+    await coordinator.async_refresh()
+    assert scgi.read_vars()[-1] == {name, "c1.sys.timestamp"}
+    assert coordinator.update_interval == timedelta(seconds=1)
+
+
+async def test_failure_threshold(coordinator, scgi, clock) -> None:
+    """The entities become unavailable after the failure threshold."""
+    coordinator.async_subscribe(["c1.lc00_qx00"])
+    await coordinator.async_refresh()
+
+    scgi.error = CybroConnectionError("Connection refused")
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        clock.now += 10
+        await coordinator.async_refresh()
+
+    assert not coordinator.last_update_success
+    assert coordinator.update_interval <= RECOVERY_INTERVAL_MIN * 4
+
+
+async def test_warm_read(coordinator, scgi, clock) -> None:
+    """The vars of all platforms are read once, the next refresh skips them."""
+    light, temperature = "c1.lc00_qx00", "c1.th00_temperature"
+    await asyncio.gather(
+        coordinator.async_warm_read([light]),
+        coordinator.async_warm_read([temperature]),
+        *(coordinator.async_warm_read([]) for _ in PLATFORMS[2:]),
+    )
+    assert scgi.read_vars() == [{light, temperature}]
+    assert coordinator.data.vars[temperature].value == "215"
+
+    coordinator.async_subscribe([light, temperature])
+    await coordinator.async_refresh()
+    assert len(scgi.requests) == 1
+
+
+async def test_warm_read_failed(coordinator, scgi, clock) -> None:
+    """The vars of a failed warm read are read on the next refresh."""
+    light = "c1.lc00_qx00"
+    scgi.error = CybroConnectionError("Connection refused")
+    await asyncio.gather(
+        coordinator.async_warm_read([light]),
+        *(coordinator.async_warm_read([]) for _ in PLATFORMS[1:]),
+    )
+
+    scgi.error = None
+    coordinator.async_subscribe([light])
+    await coordinator.async_refresh()
+    assert scgi.read_vars()[-1] == {light}
+
+
+async def test_device_vars(coordinator, scgi) -> None:
+    """Every device has vars of its own."""
+    device = CybroPlcDevice(await scgi.request(dict.fromkeys(SERVER_VARS, "")))
+
+    assert device.vars.keys() == SERVER_VARS.keys()
+    assert "c1.sys.timestamp" in coordinator.data.vars
+
+
+@pytest.mark.parametrize(
+    "entry_options",
+    [
+        {
+            CONF_MIN_POLL_INTERVAL: 10,
+            CONF_MAX_POLL_INTERVAL: 10,
+            f"{VAR_CAT_TEMPERATURE}_{CONF_DEADBAND}": 0.5,
+            CONF_FORCE_UPDATE_INTERVAL: 60,
+        }
+    ],
+)
+async def test_deadband(coordinator, scgi, clock) -> None:
+    """Changes within the deadband are published after the force interval."""
+    name = "c1.th00_temperature"
+    slot = coordinator.register_value(name, VarType.FLOAT, 0.1)
+    coordinator.async_subscribe([name])
+    start = clock.now
+    await coordinator.async_refresh()
+    assert coordinator.changed_vars == {name}
+
+    for offset, value, changed in (
+        (10, "217", False),
+        (20, "221", True),
+        (30, "222", False),
+        (70, "223", False),
+        (80, "223", True),
+    ):
+        scgi.values[name] = value
+        clock.now = start + offset
+        await coordinator.async_refresh()
+        assert (coordinator.changed_vars == {name}) is changed
+
+    assert coordinator.values.get(slot) == 22.3
+
+
+@pytest.mark.parametrize(
+    "entry_options",
+    [
+        {
+            CONF_MIN_POLL_INTERVAL: 10,
+            CONF_MAX_POLL_INTERVAL: 10,
+            CONF_CHANGE_COUNTER: "change_count",
+            CONF_CHANGE_COUNTER_INTERVAL: 30,
+        }
+    ],
+)
+async def test_change_counter(coordinator, scgi, clock) -> None:
+    """Due vars are only read if the change counter moved."""
+    light, counter = "c1.lc00_qx00", "c1.change_count"
+    coordinator.async_subscribe([light])
+    start = clock.now
+    await coordinator.async_refresh()
+    assert scgi.read_vars() == [{light, counter}]
+
+    clock.now = start + 1
+    await coordinator.async_refresh()
+    assert scgi.read_vars()[1:] == [{counter}]
+
+    scgi.values[counter] = "1"
+    scgi.values[light] = "1"
+    clock.now = start + 2
+    await coordinator.async_refresh()
+    assert scgi.read_vars()[2:] == [{counter}, {light, counter}]
+    assert coordinator.changed_vars == {light, counter}
+
+    # all vars are read once per change counter interval
+    clock.now = start + 30
+    await coordinator.async_refresh()
+    assert scgi.read_vars()[4:] == [{light, counter}]
+
+
+@pytest.mark.parametrize(
+    "entry_options", [{CONF_MIN_POLL_INTERVAL: 10, CONF_MAX_POLL_INTERVAL: 10}]
+)
+async def test_poll_subscribed_vars(coordinator, scgi, clock) -> None:
+    """Only subscribed vars are polled, new ones are read on the next refresh."""
+    light, temperature = "c1.lc00_qx00", "c1.th00_temperature"
+    subscription = coordinator.async_subscribe([light])
+    start = clock.now
+    await coordinator.async_refresh()
+    assert scgi.read_vars() == [{light}]
+
+    coordinator.async_subscribe([temperature])
+    await coordinator.async_refresh()
+    assert scgi.read_vars()[1:] == [{temperature}]
+
+    subscription.release()
+    clock.now = start + 10
+    await coordinator.async_refresh()
+    assert scgi.read_vars()[2:] == [{temperature}]
+
+
+async def test_enabled_vars(hass: HomeAssistant, coordinator) -> None:
+    """Only the vars of enabled entities are read by the warm read."""
+    first, second = find_on_off_lights(coordinator)[:2]
+    registry = er.async_get(hass)
+    registry.async_get_or_create(
+        "light",
+        DOMAIN,
+        second.unique_id,
+        disabled_by=er.RegistryEntryDisabler.USER,
+    )
+
+    assert async_enabled_vars(hass, "light", [first, second]) == [first.unique_id]
+
+
+@pytest.mark.parametrize(
+    "entry_options", [{CONF_MIN_POLL_INTERVAL: 10, CONF_MAX_POLL_INTERVAL: 10}]
+)
+async def test_subscription_refcount(coordinator, scgi, clock) -> None:
+    """A var is polled while any subscription holds it."""
+    light, temperature = "c1.lc00_qx00", "c1.th00_temperature"
+    first = coordinator.async_subscribe([light, temperature])
+    second = coordinator.async_subscribe([light])
+    start = clock.now
+    await coordinator.async_refresh()
+    assert scgi.read_vars() == [{light, temperature}]
+
+    first.release()
+    first.release()
+    clock.now = start + 10
+    await coordinator.async_refresh()
+    assert scgi.read_vars()[1:] == [{light}]
+
+    second.release()
+    clock.now = start + 20
+    await coordinator.async_refresh()
+    assert len(scgi.requests) == 2
+
+
+async def test_poll_scale_scan_time(coordinator, scgi, clock) -> None:
+    """The fast tier is not polled faster than twice the plc scan time."""
+    scgi.values["c1.scan_time"] = "2000"
+    coordinator.async_subscribe(["c1.lc00_qx00", "c1.scan_time"])
+    await coordinator.async_refresh()
+
+    assert coordinator.poll_scale == 4
+    assert coordinator.update_interval == timedelta(seconds=4)
+
+
+async def test_poll_scale_volatility(coordinator, scgi, clock) -> None:
+    """Polling slows down while the values are idle and speeds up on changes."""
+    name = "c1.lc00_qx00"
+    coordinator.async_subscribe([name])
+    await coordinator.async_refresh()
+    assert coordinator.update_interval == timedelta(seconds=1)
+
+    for _ in range(30):
+        clock.now += coordinator.update_interval.total_seconds()
+        await coordinator.async_refresh()
+    assert coordinator.poll_scale == 6
+    assert coordinator.update_interval == timedelta(seconds=6)
+
+    intervals = []
+    for value in "1010":
+        scgi.values[name] = value
+        clock.now += coordinator.update_interval.total_seconds()
+        await coordinator.async_refresh()
+        intervals.append(coordinator.update_interval.total_seconds())
+    assert intervals == [3, 1.5, 1, 1]
@@ -0,0 +1,85 @@
+"""Tests for the devices of the entities of a plc."""
+import pytest
+from custom_components.cybro.binary_sensor import find_rule_binary_sensors
+from custom_components.cybro.const import AREA_LIGHTS
+from custom_components.cybro.const import CONF_VAR_RULES
+from custom_components.cybro.const import DOMAIN
+from custom_components.cybro.light import find_on_off_lights
+from custom_components.cybro.models import plc_device_info
+from custom_components.cybro.sensor import add_system_tags
+from custom_components.cybro.sensor import find_rule_sensors
+
+from .conftest import FakeScgiServer
+from .conftest import NAD
+from .conftest import PLC_VARS
+
+RULES = "\n".join(
+    (
+        "c*.boiler_temp; sensor; °C; temperature; 0.1",
+        "c*.boiler_alarm; binary_sensor",
+        "c*.garden_*; light",
+    )
+)
+
+
+@pytest.fixture
+def scgi() -> FakeScgiServer:
+    """Return the scgi server of a plc with vars of the var rules.
+
+    The hall light has no light controller.
+    """
+    return FakeScgiServer(
+        NAD,
+        {
+            **PLC_VARS,
+            "boiler_temp": "550",
+            "boiler_alarm": "0",
+            "garden_lamp": "0",
+            "lc_hall_qx": "0",
+        },
+    )
+
+
+@pytest.mark.parametrize("entry_options", [{CONF_VAR_RULES: RULES}])
+async def test_rule_device(coordinator) -> None:
+    """The entities of all var rules share a device below the plc device."""
+    plc_device = plc_device_info(coordinator)
+    entities = [
+        *find_rule_sensors(coordinator),
+        *find_rule_binary_sensors(coordinator),
+        *(
+            light
+            for light in find_on_off_lights(coordinator)
+            if light.unique_id == "c1.garden_lamp"
+        ),
+    ]
+
+    assert [entity.unique_id for entity in entities] == [
+        "c1.boiler_temp",
+        "c1.boiler_alarm",
+        "c1.garden_lamp",
+    ]
+    for entity in entities:
+        device = entity.device_info
+        assert device["identifiers"] == {(DOMAIN, "c1.rules")}
+        assert device["via_device"] == next(iter(plc_device["identifiers"]))
+        assert "suggested_area" not in device
+
+    for entity in add_system_tags(coordinator):
+        assert entity.device_info == plc_device
+
+
+async def test_light_devices(coordinator) -> None:
+    """Lights without a controller share a light device below the plc device."""
+    plc_device = plc_device_info(coordinator)
+    devices = {
+        light.unique_id: light.device_info for light in find_on_off_lights(coordinator)
+    }
+
+    assert devices["c1.lc00_qx00"] is devices["c1.lc00_qx01"]
+    assert devices["c1.lc00_qx00"]["identifiers"] == {(DOMAIN, "c1.lc00")}
+    hall = devices["c1.lc_hall_qx"]
+    assert hall["identifiers"] == {(DOMAIN, "c1.lights")}
+    assert hall["suggested_area"] == AREA_LIGHTS
+    for device in devices.values():
+        assert device["via_device"] == next(iter(plc_device["identifiers"]))
@@ -0,0 +1,121 @@
+"""Tests for the discovery of the plc vars."""
+import pytest
+from custom_components.cybro.const import VAR_CAT_LIGHT
+from custom_components.cybro.const import VAR_CAT_POWER_METER_POWER
+from custom_components.cybro.const import VAR_CAT_RULE_BINARY_SENSOR
+from custom_components.cybro.const import VAR_CAT_RULE_LIGHT
+from custom_components.cybro.const import VAR_CAT_RULE_SENSOR
+from custom_components.cybro.const import VAR_CAT_TEMPERATURE
+from custom_components.cybro.discovery import classify_plc_vars
+from custom_components.cybro.discovery import parse_var_rules
+from custom_components.cybro.discovery import VarRule
+from custom_components.cybro.discovery import VarRuleMatcher
+
+RULES = """
+# boiler temperatures
+c*.boiler_temp_??; sensor; °C; temperature; 0.1
+re:c1000\\.alarm_\\d+; binary_sensor; ; problem
+
+c1000.lamp*; light
+"""
+
+
+def test_parse_var_rules() -> None:
+    """Rules are parsed with their optional fields."""
+    assert parse_var_rules(RULES) == [
+        VarRule("c*.boiler_temp_??", "sensor", "°C", "temperature", 0.1),
+        VarRule("re:c1000\\.alarm_\\d+", "binary_sensor", None, "problem", 1.0),
+        VarRule("c1000.lamp*", "light", None, None, 1.0),
+    ]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "c1000.x",
+        "; sensor",
+        "c1000.x; sensor; W; power; 1; extra",
+        "c1000.x; weather",
+        "c1000.x; sensor; W; no_such_class",
+        "c1000.x; sensor; W; power; large",
+        "re:c1000.(; sensor",
+        "re:(a)\\1; sensor",
+        "re:(?P<x>a); sensor\nre:(?P<x>b); sensor",
+    ],
+)
+def test_parse_invalid_var_rules(text: str) -> None:
+    """Invalid rules and rules which can not be combined raise ValueError."""
+    with pytest.raises(ValueError):
+        parse_var_rules(text)
+
+
+def test_matcher_first_rule_wins() -> None:
+    """A name is matched by the first matching rule, on the full name."""
+    matcher = VarRuleMatcher(
+        parse_var_rules("c1000.x_*; sensor; W\nc1000.*; binary_sensor\n")
+    )
+    assert matcher.match("c1000.x_power").platform == "sensor"
+    assert matcher.match("c1000.y").platform == "binary_sensor"
+    assert matcher.match("c1001.x_power") is None
+    assert matcher.match("xc1000.y") is None
+
+
+def test_matcher_glob_is_not_a_regex() -> None:
+    """Glob patterns only know * and ?."""
+    matcher = VarRuleMatcher(parse_var_rules("c1000.a+b?; sensor"))
+    assert matcher.match("c1000.a+bc") is not None
+    assert matcher.match("c1000.aabc") is None
+
+
+def test_matcher_rule_groups() -> None:
+    """Groups within a rule regex do not confuse the rule lookup."""
+    matcher = VarRuleMatcher(
+        parse_var_rules("re:c1000\\.(a|b)(?P<n>\\d); sensor\nre:c1000\\.(c); light")
+    )
+    assert matcher.match("c1000.b1").platform == "sensor"
+    assert matcher.match("c1000.c").platform == "light"
+
+
+def test_matcher_without_rules() -> None:
+    """No rules match no names."""
+    assert VarRuleMatcher([]).match("c1000.x") is None
+
+
+def test_classify_plc_vars() -> None:
+    """Vars are sorted into categories in the order of the plc vars."""
+    index = classify_plc_vars(
+        [
+            "c1000.lc00_qx01",
+            "c1000.th00_temperature",
+            "c1000.lc00_qx00",
+            "c1000.power_meter_power",
+            "c1000.other",
+        ],
+        1000,
+    )
+    assert index == {
+        VAR_CAT_LIGHT: ["c1000.lc00_qx01", "c1000.lc00_qx00"],
+        VAR_CAT_TEMPERATURE: ["c1000.th00_temperature"],
+        VAR_CAT_POWER_METER_POWER: ["c1000.power_meter_power"],
+    }
+
+
+def test_classify_plc_vars_with_rules() -> None:
+    """Vars matching a rule only go into the rule category."""
+    index = classify_plc_vars(
+        [
+            "c1000.boiler_temp_01",
+            "c1000.alarm_3",
+            "c1000.lamp_hall",
+            "c1000.lc00_qx00",
+            "c1000.th00_temperature",
+        ],
+        1000,
+        VarRuleMatcher(parse_var_rules(RULES + "c1000.th00_*; sensor")),
+    )
+    assert index == {
+        VAR_CAT_RULE_SENSOR: ["c1000.boiler_temp_01", "c1000.th00_temperature"],
+        VAR_CAT_RULE_BINARY_SENSOR: ["c1000.alarm_3"],
+        VAR_CAT_RULE_LIGHT: ["c1000.lamp_hall"],
+        VAR_CAT_LIGHT: ["c1000.lc00_qx00"],
+    }
@@ -0,0 +1,83 @@
+"""Tests for the shared poller of the scgi servers."""
+import asyncio
+
+import pytest
+from custom_components.cybro.poller import async_get_host_poller
+from homeassistant.core import HomeAssistant
+
+from cybro import CybroError
+
+
+class Plc:
+    """Stands in for the coordinator of a plc."""
+
+    max_concurrent_requests = 4
+
+
+@pytest.fixture
+def poller(hass: HomeAssistant):
+    """Return a poller with two registered plcs."""
+    poller = async_get_host_poller(hass, "127.0.0.1", 4000)
+    plcs = [Plc(), Plc()]
+    for plc in plcs:
+        poller.async_register(plc)
+    yield poller
+    for plc in plcs:
+        poller.async_unregister(plc)
+
+
+async def test_read_together(hass: HomeAssistant, poller) -> None:
+    """The reads of all plcs are sent with one request and split per caller."""
+    requests = []
+
+    async def request(data, stats=None):
+        requests.append(data)
+        return {"var": [{"name": name, "value": "1"} for name in data]}
+
+    poller.client.request = request
+    first, second = await asyncio.gather(
+        poller.async_read(["c1.a"]), poller.async_read(["c2.a", "c2.b"])
+    )
+
+    assert requests == [{"c1.a": "", "c2.a": "", "c2.b": ""}]
+    assert [item["name"] for item in first] == ["c1.a"]
+    assert [item["name"] for item in second] == ["c2.a", "c2.b"]
+
+
+async def test_read_error(hass: HomeAssistant, poller) -> None:
+    """Any error of the shared request fails the reads of all callers."""
+
+    async def request(data, stats=None):
+        raise ValueError("not well-formed")
+
+    poller.client.request = request
+    results = await asyncio.gather(
+        poller.async_read(["c1.a"]),
+        poller.async_read(["c2.a"]),
+        return_exceptions=True,
+    )
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+async def test_read_cancelled(hass: HomeAssistant, poller) -> None:
+    """A cancelled shared request fails the reads of all callers."""
+    started = asyncio.Event()
+
+    async def request(data, stats=None):
+        started.set()
+        await asyncio.sleep(10)
+
+    poller.client.request = request
+    reads = asyncio.gather(
+        poller.async_read(["c1.a"]),
+        poller.async_read(["c2.a"]),
+        return_exceptions=True,
+    )
+    await started.wait()
+    for task in asyncio.all_tasks():
+        if task.get_coro().__name__ == "_async_flush":
+            task.cancel()
+    results = await reads
+
+    assert [type(result) for result in results] == [CybroError, CybroError]
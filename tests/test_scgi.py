@@ -0,0 +1,84 @@
+"""Tests for the scgi client helpers."""
+import pytest
+from custom_components.cybro.scgi import response_vars
+from custom_components.cybro.scgi import ScgiResponseParser
+from custom_components.cybro.scgi import split_query
+
+from cybro import CybroError
+
+RESPONSE = b"""<?xml version="1.0" encoding="ISO-8859-1"?>
+<data>
+  <var>
+    <name>c1.temp</name>
+    <value> 21.5 </value>
+    <description>Room temperature</description>
+  </var>
+  <var>
+    <name>c1.text</name>
+    <value></value>
+  </var>
+</data>
+"""
+
+
+def test_parse_response():
+    """Every var element becomes a flat item with stripped values."""
+    parser = ScgiResponseParser()
+    parser.feed(RESPONSE, True)
+
+    assert parser.items == [
+        {"name": "c1.temp", "value": "21.5", "description": "Room temperature"},
+        {"name": "c1.text", "value": None},
+    ]
+
+
+def test_parse_response_chunks():
+    """A response split at any byte parses like the whole response."""
+    parser = ScgiResponseParser()
+    for byte in RESPONSE:
+        parser.feed(bytes([byte]))
+    parser.feed(b"", True)
+
+    assert [item["name"] for item in parser.items] == ["c1.temp", "c1.text"]
+
+
+def test_parse_invalid_response():
+    """An invalid response raises a CybroError."""
+    parser = ScgiResponseParser()
+    with pytest.raises(CybroError):
+        parser.feed(b"<data><var></data>", True)
+
+
+def test_response_vars():
+    """A single var is returned as list, an empty response as empty list."""
+    item = {"name": "c1.temp", "value": "1"}
+
+    assert response_vars(None) == []
+    assert response_vars({}) == []
+    assert response_vars({"var": item}) == [item]
+    assert response_vars({"var": [item, item]}) == [item, item]
+
+
+def test_split_query():
+    """Vars are split into chunks with a bounded query length, in order."""
+    data = {f"c1.var{index}": "" for index in range(10)}
+    chunks = split_query(data, 20)
+
+    assert len(chunks) == 5
+    assert [name for chunk in chunks for name in chunk] == list(data)
+    for chunk in chunks:
+        assert sum(len(name) + 1 for name in chunk) <= 20
+
+
+def test_split_query_values():
+    """Written values count with their url quoting."""
+    chunks = split_query({"c1.a": "1 2", "c1.b": "3"}, 15)
+
+    assert chunks == [{"c1.a": "1 2"}, {"c1.b": "3"}]
+
+
+def test_split_query_long_var():
+    """A var longer than the max length gets a chunk of its own."""
+    chunks = split_query({"c1.short": "", "c1.very_long_var_name": ""}, 12)
+
+    assert chunks == [{"c1.short": ""}, {"c1.very_long_var_name": ""}]
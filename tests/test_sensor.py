@@ -0,0 +1,43 @@
+"""Tests for the sensors of the Cybro PLC integration."""
+import pytest
+from custom_components.cybro.const import ATTR_MAX
+from custom_components.cybro.const import ATTR_MIN
+from custom_components.cybro.const import ATTR_SAMPLES
+from custom_components.cybro.const import CONF_AGGREGATION_WINDOW
+from custom_components.cybro.const import VAR_CAT_POWER_METER_POWER
+from custom_components.cybro.sensor import find_power_meter
+from homeassistant.core import HomeAssistant
+
+
+@pytest.mark.parametrize(
+    "entry_options",
+    [{f"{VAR_CAT_POWER_METER_POWER}_{CONF_AGGREGATION_WINDOW}": 10}],
+)
+async def test_aggregated_state(hass: HomeAssistant, coordinator, monkeypatch) -> None:
+    """An aggregated sensor writes the time weighted mean once per window."""
+    (sensor,) = [
+        sensor
+        for sensor in find_power_meter(coordinator)
+        if sensor.unique_id == "c1.power_meter_power"
+    ]
+    sensor.hass = hass
+    sensor.entity_id = "sensor.c1_power_meter_power"
+
+    def sample(time: float, value: str) -> None:
+        monkeypatch.setattr("custom_components.cybro.sensor.monotonic", lambda: time)
+        coordinator.values.decode("c1.power_meter_power", value)
+        sensor._handle_coordinator_update()
+
+    sample(100, "100")
+    assert hass.states.get(sensor.entity_id).state == "100.0"
+
+    sample(102, "200")
+    sample(108, "100")
+    assert hass.states.get(sensor.entity_id).state == "100.0"
+
+    sample(110, "300")
+    state = hass.states.get(sensor.entity_id)
+    assert state.state == "160.0"
+    assert state.attributes[ATTR_MIN] == 100
+    assert state.attributes[ATTR_MAX] == 300
+    assert state.attributes[ATTR_SAMPLES] == 4
@@ -0,0 +1,56 @@
+"""Tests for the services of the Cybro PLC integration."""
+import pytest
+from custom_components.cybro.capture import read_capture
+from custom_components.cybro.const import DATA_CAPTURES
+from custom_components.cybro.const import DOMAIN
+from custom_components.cybro.const import SERVICE_CAPTURE
+from custom_components.cybro.services import async_setup_services
+from custom_components.cybro.services import async_unload_services
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant
+
+
+@pytest.fixture
+async def capture(hass: HomeAssistant, coordinator, scgi, tmp_path):
+    """Start a capture of the scgi traffic of the plc."""
+    hass.config.config_dir = str(tmp_path)
+    hass.data.setdefault(DOMAIN, {})[coordinator.entry_id] = coordinator
+    async_setup_services(hass)
+    await hass.services.async_call(
+        DOMAIN, SERVICE_CAPTURE, {"duration": 60}, blocking=True
+    )
+    capture = hass.data[DATA_CAPTURES][("127.0.0.1", 4000)]
+    await coordinator.async_refresh()
+    assert capture.records == 1
+    yield capture
+    hass.data[DOMAIN].pop(coordinator.entry_id, None)
+    await async_unload_services(hass)
+
+
+async def test_capture_stopped_on_stop(
+    hass: HomeAssistant, coordinator, scgi, capture
+) -> None:
+    """Stopping Home Assistant writes out the capture and restores the clients."""
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+    await hass.async_block_till_done()
+
+    assert hass.data[DATA_CAPTURES] == {}
+    assert coordinator.poller.client.request == scgi.request
+    assert "request" not in vars(coordinator.cybro)
+    header, records = read_capture(capture.path)
+    assert header["port"] == 4000
+    assert len(records) == 1
+
+
+async def test_capture_stopped_on_unload(
+    hass: HomeAssistant, coordinator, scgi, capture
+) -> None:
+    """Unloading the last entry stops the captures and removes the services."""
+    del hass.data[DOMAIN][coordinator.entry_id]
+    await async_unload_services(hass)
+
+    assert hass.data[DATA_CAPTURES] == {}
+    assert not hass.services.has_service(DOMAIN, SERVICE_CAPTURE)
+    assert coordinator.poller.client.request == scgi.request
+    _, records = read_capture(capture.path)
+    assert len(records) == 1
@@ -0,0 +1,73 @@
+"""Tests for the value store of the decoded plc vars."""
+from custom_components.cybro.values import CybroValueStore
+
+from cybro import VarType
+
+
+def test_register_same_slot():
+    """Registering the same var, type and factor returns the same slot."""
+    store = CybroValueStore()
+    slot = store.register("c1.temp", VarType.FLOAT, 0.1)
+
+    assert store.register("c1.temp", VarType.FLOAT, 0.1) == slot
+    assert store.register("c1.temp", VarType.INT) != slot
+    assert store.get(slot) is None
+
+
+def test_decode_types():
+    """A raw value is decoded into every slot of its var with their types."""
+    store = CybroValueStore()
+    str_slot = store.register("c1.var")
+    int_slot = store.register("c1.var", VarType.INT, 10)
+    float_slot = store.register("c1.var", VarType.FLOAT, 0.1)
+    bool_slot = store.register("c1.var", VarType.BOOL)
+
+    store.decode("c1.var", "1")
+    assert store.get(str_slot) == "1"
+    assert store.get(int_slot) == 10
+    assert store.get(float_slot) == 0.1
+    assert store.get(bool_slot) is True
+
+    store.decode("c1.var", "1,234.5")
+    assert store.get(str_slot) == "1,234.5"
+    assert store.get(int_slot) is None
+    assert store.get(float_slot) == 123.45
+    assert store.get(bool_slot) is None
+
+
+def test_decode_unknown():
+    """Missing or unregistered values decode to None."""
+    store = CybroValueStore()
+    slot = store.register("c1.var", VarType.FLOAT)
+
+    store.decode("c1.var", "2.5")
+    store.decode("c1.other", "1")
+    assert store.get(slot) == 2.5
+
+    store.decode("c1.var", None)
+    assert store.get(slot) is None
+
+
+def test_within_deadband():
+    """Changes smaller than the deadband of all slots are within."""
+    store = CybroValueStore()
+    store.register("c1.power", VarType.FLOAT)
+
+    assert not store.within_deadband("c1.power", "100", 5)
+    store.decode("c1.power", "100")
+    assert store.within_deadband("c1.power", "104", 5)
+    assert not store.within_deadband("c1.power", "105", 5)
+    assert store.within_deadband("c1.power", "109", 10, percent=True)
+    assert not store.within_deadband("c1.power", "111", 10, percent=True)
+    assert not store.within_deadband("c1.power", "n/a", 5)
+    assert not store.within_deadband("c1.other", "100", 5)
+
+
+def test_within_deadband_str():
+    """String vars are never within a deadband."""
+    store = CybroValueStore()
+    store.register("c1.power", VarType.FLOAT)
+    store.register("c1.power")
+    store.decode("c1.power", "100")
+
+    assert not store.within_deadband("c1.power", "100", 5)
@@ -0,0 +1,90 @@
+"""Tests for the coalescing write queue."""
+import asyncio
+
+import pytest
+from custom_components.cybro.const import BREAKER_FAILURE_THRESHOLD
+from custom_components.cybro.poller import async_get_host_poller
+from custom_components.cybro.write_queue import CybroWriteQueue
+from homeassistant.core import HomeAssistant
+
+from cybro import CybroConnectionError
+from cybro import CybroError
+
+
+class FakePoller:
+    """Answers writes like the scgi server, records the requests."""
+
+    def __init__(self) -> None:
+        self.requests: list[dict[str, str]] = []
+        self.error: Exception | None = None
+
+    async def async_request(self, data: dict[str, str], stats=None) -> dict:
+        self.requests.append(data)
+        if self.error is not None:
+            raise self.error
+        return {"var": [{"name": name, "value": value} for name, value in data.items()]}
+
+
+@pytest.fixture
+def poller() -> FakePoller:
+    """Return a fake poller."""
+    return FakePoller()
+
+
+async def test_writes_coalesced(hass: HomeAssistant, poller: FakePoller) -> None:
+    """Concurrent writes are sent with one request, the last value wins."""
+    queue = CybroWriteQueue(hass, poller)
+    results = await asyncio.gather(
+        queue.async_write("c1.a", "1"),
+        queue.async_write("c1.b", "1"),
+        queue.async_write("c1.a", "0"),
+    )
+
+    assert poller.requests == [{"c1.a": "0", "c1.b": "1"}]
+    assert [item["value"] for item in results] == ["0", "1", "0"]
+
+
+async def test_write_error(hass: HomeAssistant, poller: FakePoller) -> None:
+    """Any error of the request fails the writes of all callers."""
+    poller.error = ValueError("not well-formed")
+    queue = CybroWriteQueue(hass, poller)
+    results = await asyncio.gather(
+        queue.async_write("c1.a", "1"),
+        queue.async_write("c1.b", "1"),
+        return_exceptions=True,
+    )
+
+    assert results == [poller.error, poller.error]
+
+
+async def test_write_no_response(hass: HomeAssistant, poller: FakePoller) -> None:
+    """A write missing in the response fails."""
+    queue = CybroWriteQueue(hass, poller)
+
+    async def async_request(data: dict[str, str], stats=None) -> None:
+        return None
+
+    poller.async_request = async_request
+    with pytest.raises(CybroError):
+        await queue.async_write("c1.a", "1")
+
+
+async def test_write_breaker_open(hass: HomeAssistant) -> None:
+    """Writes fail at once while the circuit breaker of the server is open."""
+    host_poller = async_get_host_poller(hass, "127.0.0.1", 4000)
+    requests = []
+
+    async def request(data, stats=None):
+        requests.append(data)
+
+    host_poller.client.request = request
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        host_poller.breaker.record_failure()
+    queue = CybroWriteQueue(hass, host_poller)
+    try:
+        with pytest.raises(CybroConnectionError):
+            await queue.async_write("c1.a", "1")
+    finally:
+        host_poller.breaker.stop()
+
+    assert requests == []